@@ -1,10 +1,14 @@
+import os
+import sys
+
 import cv2
-import numpy as np
-import pandas as pd
 
-# Load CSV data
-csv_file = 'output.csv'  # Path to your CSV file
-data = pd.read_csv(csv_file)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from kolamtools.pointfile import load_points, newest_points_path
+
+# Load coordinate data: the memory-mapped .kpts beside the CSV when it is newer, else the CSV
+points_file = newest_points_path('output.csv')  # Path to your coordinate file
+data = load_points(points_file)
 
 # Initialize video capture
 cap = cv2.VideoCapture(0)  # Change to the appropriate video source if needed
@@ -1,13 +1,16 @@
+import os
+import sys
+
 import cv2
-import numpy as np
-import pandas as pd
 
-# Load CSV data
-csv_file = 'output.csv'  # Path to your CSV file
-data = pd.read_csv(csv_file)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from kolamtools.pointfile import load_points, newest_points_path
+from kolamtools.render import Recipe, render_video
+from kolamtools.replay import open_capture
 
-# Initialize video capture
-cap = cv2.VideoCapture(0)  # Change to the appropriate video source if needed
+# Load coordinate data: the memory-mapped .kpts beside the CSV when it is newer, else the CSV
+points_file = newest_points_path('output.csv')  # Path to your coordinate file
+data = load_points(points_file)
 
 # Initialize circle parameters
 circle_radius = 10
@@ -22,6 +25,17 @@ output_file = 'output.mp4'
 output_fps = 30.0  # Frames per second
 output_size = (1280, 720)  # Output video size
 
+# Render a recording offline instead, in parallel chunks far faster than real time:
+#     python camployresize.py recording.mp4 --render
+if '--render' in sys.argv[2:]:
+    recipe = Recipe(points_file, circle_radius, circle_color, circle_thickness, size=output_size)
+    output, frames = render_video(sys.argv[1], output_file, recipe)
+    print(f'Rendered {frames} frames into {output}')
+    sys.exit(0)
+
+# Initialize video capture: a camera index, or a video or image folder to replay
+cap = open_capture(sys.argv[1] if len(sys.argv) > 1 else 0)
+
 # Define the codec for video writing
 fourcc = cv2.VideoWriter_fourcc(*'mp4v')
 out = cv2.VideoWriter(output_file, fourcc, output_fps, output_size)
@@ -1,85 +1,55 @@
+import os
+import sys
+
 import cv2
-import numpy as np
-import pandas as pd
 
-# Load CSV data
-csv_file = 'output.csv'  # Path to your CSV file
-data = pd.read_csv(csv_file)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from kolamtools.guide import Guide
+from kolamtools.overlay import Overlay
+from kolamtools.pipeline import Pipeline
+from kolamtools.pointfile import load_points, newest_points_path
+from kolamtools.replay import open_capture
+
+# Load coordinate data: the memory-mapped .kpts beside the CSV when it is newer, else the CSV
+points_file = newest_points_path('output.csv')  # Path to your coordinate file
+data = load_points(points_file)
 
-# Initialize video capture
-cap = cv2.VideoCapture(0)  # Change to the appropriate video source if needed
+# Initialize video capture: a camera index, or a video or image folder to replay
+cap = open_capture(sys.argv[1] if len(sys.argv) > 1 else 0)
 
 # Initialize circle parameters
 circle_radius = 10
 circle_thickness = -1  # Filled circle
 circle_color = (0, 0, 255)  # Red color (BGR format)
 
-# Initialize current row index
-current_row = 0
-
-# Initialize moving variables
-move_frames = 30  # Number of frames to move from one point to another
-move_count = 0
-start_point = None
-end_point = None
-delta_x = 0
-delta_y = 0
-
-while True:
-    # Read frame from video stream
-    ret, frame = cap.read()
-    if not ret:
-        break
-    
-    # Get current X, Y coordinates from the CSV data
-    x, y = data.values[current_row]
-
-    if start_point is None:
-        start_point = (x, y)
-        end_point = (x, y)
-        move_count = move_frames
-    else:
-        if move_count >= move_frames:
-            move_count = 0
-            start_point = end_point
-            current_row += 1
-            if current_row >= len(data):
-                current_row = 0
-            end_point = tuple(data.values[current_row])
-            delta_x = (end_point[0] - start_point[0]) / move_frames
-            delta_y = (end_point[1] - start_point[1]) / move_frames
-        else:
-            move_count += 1
-            start_point = (start_point[0] + delta_x, start_point[1] + delta_y)
+# All points are drawn once into an overlay layer, then copied onto each frame
+overlay = Overlay(data, circle_radius, circle_color, -1)
+
+# The moving point follows the kolam at a steady speed in real time, whatever the frame rate
+guide_speed = 100  # Pixels per second along the kolam
+guide = Guide(data, guide_speed)
+
 
+def process(frame):
     # Plot all points as small red circles
-    for point in data.values:
-        cv2.circle(frame, (int(point[0]), int(point[1])), circle_radius, (0, 0, 255), -1)
+    overlay.composite(frame)
 
     # Draw thick blue circle for the moving point
-    cv2.circle(frame, (int(start_point[0]), int(start_point[1])), circle_radius + 5, (255, 0, 0), circle_thickness)
-
-    # Show the frame
-    cv2.imshow('Video Stream', frame)
-    
-    # Wait for key press
-    key = cv2.waitKey(1) & 0xFF
-    
+    x, y = guide.position()
+    cv2.circle(frame, (int(x), int(y)), circle_radius + 5, (255, 0, 0), circle_thickness)
+
+    # Shown by the pipeline
+    return frame
+
+
+def on_key(key):
     # Check if 'n' key is pressed to move the point
     if key == ord('n'):
-        current_row += 1
-        if current_row >= len(data):
-            current_row = 0
+        guide.seek_point(guide.point_index() + 1)
 
-        move_count = 0
-        start_point = None
-        end_point = None
 
-    # Break the loop if 'q' key is pressed
-    if key == ord('q'):
-        break
+# Capture and drawing run on their own threads; 'q' quits
+Pipeline(cap, process, 'Video Stream').run(on_key)
 
-# Release video capture and close windows
-cap.release()
+# Close windows (the pipeline releases the capture)
 cv2.destroyAllWindows()
-
@@ -1,6 +1,11 @@
+import os
+import sys
+
 import cv2
 import numpy as np
-import csv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from kolamtools.pointfile import save_points
 
 def convert_image_to_binary(image_path):
     # Read the image
@@ -11,7 +16,7 @@ def convert_image_to_binary(image_path):
 
     return binary_image
 
-def export_coordinates(binary_image, output_csv, max_points=10000):
+def export_coordinates(binary_image, output_file, max_points=10000):
     # Find black pixel coordinates
     black_pixels = np.where(binary_image == 0)
 
@@ -20,22 +25,18 @@ def export_coordinates(binary_image, output_csv, max_points=10000):
         indices = np.random.choice(len(black_pixels[0]), max_points, replace=False)
         black_pixels = (black_pixels[0][indices], black_pixels[1][indices])
 
-    # Write coordinates to CSV
-    with open(output_csv, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(['x', 'y'])
-        for x, y in zip(black_pixels[1], black_pixels[0]):
-            writer.writerow([x, y])
+    # Write coordinates as .kpts (or .csv / .npy, by extension)
+    save_points(output_file, np.column_stack([black_pixels[1], black_pixels[0]]))
 
 # Path to input image
 image_path = '/home/josva/camera-kollamms-turtle/camera kolam very latest -latest-correct-code-colour-kolam-kolamsingleknot/imgonline-com-ua-Negative-p0AFfgSh8rvAM.jpg'
 
-# Path to output CSV file
-output_csv = 'output_coordinates.csv'
+# Path to output coordinate file
+output_file = 'output_coordinates.kpts'
 
 # Convert image to binary
 binary_image = convert_image_to_binary(image_path)
 
-# Export coordinates to CSV
-export_coordinates(binary_image, output_csv)
+# Export coordinates
+export_coordinates(binary_image, output_file)
 
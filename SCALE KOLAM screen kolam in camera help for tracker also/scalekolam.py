@@ -1,21 +1,20 @@
-import pandas as pd
+import os
+import sys
 
-# Path to the input CSV file
-input_csv_file = 'output_coordinates.csv'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from kolamtools.pointfile import newest_points_path
+from kolamtools.transform import scale, transform_file
 
-# Path to the output CSV file
-output_csv_file = 'output.csv'
+# Path to the input coordinates: the .kpts beside the CSV when it is newer, else the CSV
+input_file = newest_points_path('output_coordinates.csv')
+
+# Path to the output coordinate file
+output_file = 'output.kpts'
 
 # Number to divide the X and Y coordinates by
 divisor = 22
 
-# Read the input CSV file
-data = pd.read_csv(input_csv_file)
-
-# Divide the X and Y coordinates by the divisor, round to integers, and convert to int data type
-data['x'] = (data['x'] / divisor).round().astype(int)
-data['y'] = (data['y'] / divisor).round().astype(int)
-
-# Save the updated data to the output CSV file
-data.to_csv(output_csv_file, index=False)
-
+# Divide the X and Y coordinates by the divisor and round to whole pixels,
+# keeping each pixel once; the input is streamed in chunks
+read, written = transform_file(input_file, {output_file: scale(1 / divisor)})
+print(f'Kept {written[output_file]} of {read} points')
@@ -1,6 +1,7 @@
-import csv
 import cv2
 
+from kolamtools.pointfile import save_points
+
 def extract_coordinates(image_path, color):
     # Load the image
     image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
@@ -25,19 +26,17 @@ def extract_coordinates(image_path, color):
     
     return points
 
-def export_to_csv(points, output_path):
-    with open(output_path, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(['X', 'Y'])
-        writer.writerows(points)
+def export_points(points, output_path):
+    # .kpts by default; .csv or .npy by extension
+    save_points(output_path, points)
 
 # Example usage
 image_path = '/home/josva/kollamms turtle/kolamsingleknot/binary_image.png'
 color_choice = input("Enter color choice (white/black): ")
-output_path = 'output.csv'
+output_path = 'output.kpts'
 
 points = extract_coordinates(image_path, color_choice)
-export_to_csv(points, output_path)
+export_points(points, output_path)
 
 print(f"Extracted {len(points)} coordinates and exported to '{output_path}'.")
 
@@ -1,57 +1,69 @@
+import sys
+
 import cv2
-import numpy as np
-import pandas as pd
 
-# Load CSV data
-csv_file = 'output.csv'  # Path to your CSV file
-data = pd.read_csv(csv_file)
+from kolamtools.anchor import AnchoredOverlay, Undistorter, load_calibration, plane_for
+from kolamtools.overlay import Overlay
+from kolamtools.pipeline import Pipeline
+from kolamtools.pointfile import load_points, newest_points_path
+from kolamtools.replay import open_capture
+
+# Load coordinate data: the memory-mapped .kpts beside the CSV when it is newer, else the CSV
+points_file = newest_points_path('output.csv')  # Path to your coordinate file
+data = load_points(points_file)
 
-# Initialize video capture
-cap = cv2.VideoCapture(0)  # Change to the appropriate video source if needed
+# Initialize video capture: a camera index, or a video or image folder to replay
+cap = open_capture(sys.argv[1] if len(sys.argv) > 1 else 0)
 
 # Initialize circle parameters
 circle_radius = 10
 circle_thickness = 2
 circle_color = (0, 0, 255)  # Red color (BGR format)
 
+# Pin the kolam to the paper: the points (plus padding) are stretched over the
+# sheet found in the camera frame, and follow it when the camera or paper moves.
+# Nothing is drawn until a sheet (or the markers) is found, so it is off by default
+anchor_to_surface = False
+use_markers = False  # Anchor to printed ArUco markers 0-3 instead of the sheet's edges
+calibration_file = None  # e.g. 'camera.npz' from cv2.calibrateCamera, to undistort the lens
+
+# All points are drawn once into an overlay layer, then copied onto each frame
+if anchor_to_surface:
+    offset, plane_size = plane_for(data.values)
+    undistort = Undistorter(*load_calibration(calibration_file)) if calibration_file else None
+    overlay = AnchoredOverlay(Overlay(data, circle_radius, circle_color, circle_thickness, offset=offset),
+                              plane_size, use_markers, undistort=undistort)
+else:
+    overlay = Overlay(data, circle_radius, circle_color, circle_thickness)
+
 # Initialize current row index
 current_row = 0
 
-while True:
-    # Read frame from video stream
-    ret, frame = cap.read()
-    if not ret:
-        break
-    
-    # Get current X, Y coordinates from the CSV data
-    for x, y in data.values:
-        # Draw big red circle at the specified coordinates
-        cv2.circle(frame, (x, y), circle_radius, circle_color, circle_thickness)
-
-    # Show the frame
-    cv2.imshow('Video Stream', frame)
-    
-    # Wait for key press
-    key = cv2.waitKey(1) & 0xFF
-    
+# Show the stream in a large window; the window scales it, not a per-frame resize
+cv2.namedWindow('Video Stream', cv2.WINDOW_NORMAL)
+cv2.resizeWindow('Video Stream', 2860, 1720)
+
+
+def process(frame):
+    # Draw the red circles at every coordinate
+    return overlay.composite(frame)
+
+
+def on_key(key):
+    global current_row
+
     # Check if 'n' key is pressed to move the point
     if key == ord('n'):
         # Increase current row index
         current_row += 1
-        
+
         # Reset current row index if it exceeds the number of rows in the CSV file
         if current_row >= len(data):
             current_row = 0
 
-    # Break the loop if 'q' key is pressed
-    if key == ord('q'):
-        break
-
-    # Resize the screen
-    frame = cv2.resize(frame, (2860, 1720))
 
+# Capture and drawing run on their own threads; 'q' quits
+Pipeline(cap, process, 'Video Stream').run(on_key)
 
-# Release video capture and close windows
-cap.release()
+# Close windows (the pipeline releases the capture)
 cv2.destroyAllWindows()
-
@@ -1,8 +1,32 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, g, abort, has_request_context
 from flask_cors import CORS
+from PIL import Image
+import hmac
+import io
 import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
 from backend.kolam_generator import KolamGenerator
 from backend.authentic_kolam_generator import AuthenticKolamGenerator
+from backend.live_session import LiveSessionManager
+from backend.render_context import RenderContext, MemoryBudgetExceeded, checkpoint, current_context, render_context
+from backend.profiler import SamplingProfiler, ProfilerBusy, format_collapsed
+from backend.admission import CostAwareLimiter, Overloaded
+from backend.lsystem import POLYLINE_COMMAND_BYTES
+from backend.coordinates import (UPLOAD_FORMATS, CoordinateError, coordinates_from_json, parse_coordinates,
+                                 validate_points)
+from backend.vectorize import (DEFAULT_MAX_SIDE, VectorizeError, predict_bytes, strokes_to_geometry,
+                               strokes_to_svg, vectorize_image)
+from backend import metrics
+
+# The arc-length sampler and coordinate formats are shared with the tools in the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from kolamtools.arclength import GeometryError, sample_geometry, svg_geometry
+from kolamtools.pointfile import save_points
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -11,157 +35,526 @@ CORS(app)  # Enable CORS for all routes
 kolam_gen = KolamGenerator()
 auth_kolam_gen = AuthenticKolamGenerator()
 
+# Admin token for /debug endpoints; they are disabled when it is unset
+ADMIN_TOKEN = os.environ.get('KOLAM_ADMIN_TOKEN')
+MAX_PROFILE_SECONDS = 60
+
+# Per-request memory budget for a single render
+MEMORY_BUDGET_BYTES = int(os.environ.get('KOLAM_MEMORY_BUDGET_MB', 4096)) * 2**20
+
+# Admission control for /api/generate-kolam; cost is predicted render memory in MB
+render_limiter = CostAwareLimiter(
+    capacity=int(os.environ.get('KOLAM_RENDER_CAPACITY_MB', 8192)),
+    max_queue=int(os.environ.get('KOLAM_RENDER_QUEUE', 32)),
+    max_wait=float(os.environ.get('KOLAM_RENDER_MAX_WAIT', 10))
+)
+# Highest level used when predicting cost, so absurd inputs can't stall admission
+MAX_PREDICTED_LEVEL = 20
+
+# Requests with lod=preview are reduced until their predicted render memory fits this
+PREVIEW_BUDGET_MB = float(os.environ.get('KOLAM_PREVIEW_BUDGET_MB', 64))
+PREVIEW_MAX_POINTS = 1024
+
+# Coordinate exports: content type per format, and the most points one request may produce
+EXPORT_CONTENT_TYPES = {'kpts': 'application/octet-stream', 'csv': 'text/csv', 'npy': 'application/x-npy'}
+MAX_EXPORT_POINTS = int(os.environ.get('KOLAM_MAX_EXPORT_POINTS', 5_000_000))
+profiler = SamplingProfiler()
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.metrics_endpoint = request.endpoint or 'unknown'
+    metrics.http_in_flight.inc(endpoint=g.metrics_endpoint)
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = g.get('metrics_endpoint', 'unknown')
+    metrics.http_requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    if 'request_started' in g:
+        elapsed = time.perf_counter() - g.request_started
+        metrics.http_latency.observe(elapsed, endpoint=endpoint)
+        response.headers['Server-Timing'] = _server_timing(elapsed)
+    return response
+
+def _server_timing(elapsed):
+    """Server-Timing header value with the render stage breakdown, in milliseconds"""
+    entries = []
+    if 'render_context' in g:
+        for name, seconds in g.render_context.stage_breakdown(g.render_seconds).items():
+            entries.append(f'{name};dur={seconds * 1000:.2f}')
+        entries.append(f'render;dur={g.render_seconds * 1000:.2f}')
+    for name, seconds in g.get('stage_timings', {}).items():
+        entries.append(f'{name};dur={seconds * 1000:.2f}')
+    entries.append(f'total;dur={elapsed * 1000:.2f}')
+    return ', '.join(entries)
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    if 'metrics_endpoint' in g:
+        metrics.http_in_flight.dec(endpoint=g.metrics_endpoint)
+
 @app.route('/')
 def index():
     """Serve the main HTML page"""
     return render_template('index.html')
 
+def _generate_svg(data):
+    """Render the design described by `data`, returning the SVG and echoed parameters.
+    Returns None for an unknown design type."""
+    # Live sessions render inside their own context; plain requests get a fresh one
+    context = current_context() or RenderContext()
+    if context.memory_budget is None:
+        context.memory_budget = MEMORY_BUDGET_BYTES
+    with render_context(context):
+        started = time.perf_counter()
+        result = _dispatch_design(data)
+        elapsed = time.perf_counter() - started
+    
+    if result is not None:
+        svg_content, parameters = result
+        metrics.observe_render(parameters['design_type'], context, elapsed, len(svg_content))
+        if has_request_context():
+            g.render_context = context
+            g.render_seconds = elapsed
+    return result
+
+def _dispatch_design(data):
+    """Call the generator method for the requested design type"""
+    # Extract parameters
+    design_type = data.get('design_type', 'suzhi')
+    dot_size = int(data.get('dot_size', 10))
+    iterations = int(data.get('iterations', 6))
+    width = int(data.get('width', 800))
+    height = int(data.get('height', 600))
+    
+    # Generate SVG based on design type
+    if design_type == 'suzhi':
+        svg_content = kolam_gen.generate_suzhi_kolam_svg(
+            dot_size=dot_size, 
+            iterations=iterations, 
+            width=width, 
+            height=height
+        )
+    elif design_type == 'kambi':
+        rhombus_size = int(data.get('rhombus_size', 5))
+        svg_content = kolam_gen.generate_kambi_kolam_svg(
+            dot_size=dot_size, 
+            rhombus_size=rhombus_size, 
+            width=width, 
+            height=height
+        )
+    elif design_type == 'fourcolor':
+        svg_content = kolam_gen.generate_fourcolor_kolam_svg(
+            dot_size=dot_size, 
+            iterations=iterations, 
+            width=width, 
+            height=height
+        )
+    elif design_type == 'island':
+        svg_content = kolam_gen.generate_island_kolam_svg(
+            dot_size=dot_size, 
+            iterations=iterations, 
+            width=width, 
+            height=height
+        )
+    elif design_type == 'sikku':
+        svg_content = kolam_gen.generate_sikku_kolam_svg(
+            dot_size=dot_size, 
+            iterations=iterations, 
+            width=width, 
+            height=height
+        )
+    elif design_type == 'special':
+        svg_content = kolam_gen.generate_special_kolam_svg(
+            dot_size=dot_size, 
+            iterations=iterations, 
+            width=width, 
+            height=height
+        )
+    elif design_type == 'group':
+        polygon_sides = int(data.get('polygon_sides', 6))
+        svg_content = kolam_gen.generate_group_kolam_svg(
+            dot_size=dot_size, 
+            iterations=iterations, 
+            polygon_sides=polygon_sides,
+            width=width, 
+            height=height
+        )
+    elif design_type == 'traditional':
+        grid_size = int(data.get('grid_size', 7))
+        pattern_type = data.get('pattern_type', 'lotus')
+        svg_content = kolam_gen.generate_traditional_rangoli_svg(
+            dot_size=dot_size, 
+            iterations=iterations, 
+            grid_size=grid_size,
+            pattern_type=pattern_type,
+            width=width, 
+            height=height
+        )
+    elif design_type == 'single_knot':
+        svg_content = auth_kolam_gen.generate_single_knot_kolam_svg(
+            dot_size=dot_size,
+            iterations=iterations,
+            width=width,
+            height=height
+        )
+    elif design_type == 'rhombus':
+        rhombus_size = int(data.get('rhombus_size', 5))
+        svg_content = auth_kolam_gen.generate_rhombus_kolam_svg(
+            dot_size=dot_size,
+            rhombus_size=rhombus_size,
+            width=width,
+            height=height
+        )
+    elif design_type == 'polygon_inscribed':
+        polygon_vertices = int(data.get('polygon_vertices', 6))
+        polygon_size = int(data.get('polygon_size', 100))
+        svg_content = auth_kolam_gen.generate_polygon_inscribed_kolam_svg(
+            dot_size=dot_size,
+            polygon_vertices=polygon_vertices,
+            polygon_size=polygon_size,
+            iterations=iterations,
+            width=width,
+            height=height
+        )
+    elif design_type == 'circle_inscribed':
+        circle_radius = int(data.get('circle_radius', 100))
+        svg_content = auth_kolam_gen.generate_circle_inscribed_kolam_svg(
+            dot_size=dot_size,
+            circle_radius=circle_radius,
+            iterations=iterations,
+            width=width,
+            height=height
+        )
+    elif design_type == 'combined':
+        svg_content = auth_kolam_gen.generate_suzhi_sikku_kambi_combined_svg(
+            dot_size=dot_size,
+            iterations=iterations,
+            width=width,
+            height=height
+        )
+    elif design_type == 'custom':
+        # Uploads arrive as an array already; JSON requests carry {x, y} dicts
+        points = data.get('points')
+        if points is None:
+            points = coordinates_from_json(data.get('coordinates', []))
+        svg_content = kolam_gen.generate_custom_kolam_svg(
+            coordinates=points, 
+            width=width, 
+            height=height,
+            simplify=_simplify_tolerance(data.get('simplify', 0) or 0)
+        )
+    else:
+        return None
+    
+    return svg_content, {
+        'design_type': design_type,
+        'dot_size': dot_size,
+        'iterations': iterations,
+        'width': width,
+        'height': height
+    }
+
+def _level_key(design_type):
+    """Parameter carrying the L-System level for a design"""
+    return 'rhombus_size' if design_type in ('kambi', 'rhombus') else 'iterations'
+
+def _predict_cost(data):
+    """Predicted render memory in MB, capped at what the memory budget would let through"""
+    design_type = data.get('design_type', 'suzhi')
+    key = _level_key(design_type)
+    level = int(data.get(key, 5 if key == 'rhombus_size' else 6))
+    level = min(max(level, 0), MAX_PREDICTED_LEVEL)
+    
+    if design_type == 'custom':
+        points = data['points'] if 'points' in data else data.get('coordinates', [])
+        estimate = len(points) * POLYLINE_COMMAND_BYTES
+    elif design_type in kolam_gen.kolam_systems:
+        estimate = kolam_gen.estimate_render_bytes(design_type, level)
+    else:
+        estimate = auth_kolam_gen.estimate_render_bytes(design_type, level)
+    
+    return min(estimate, MEMORY_BUDGET_BYTES) / 2**20
+
+def _apply_lod(data):
+    """Reduce `data` to a cheap preview when the client sends lod=preview.
+    Returns the parameters to render and the level of detail actually served."""
+    if data.get('lod') != 'preview':
+        return data, 'full'
+    
+    data = dict(data)
+    design_type = data.get('design_type', 'suzhi')
+    if design_type == 'custom':
+        coordinates = data.get('coordinates', [])
+        if len(coordinates) <= PREVIEW_MAX_POINTS:
+            return data, 'full'
+        step = -(-len(coordinates) // PREVIEW_MAX_POINTS)
+        data['coordinates'] = coordinates[::step] + coordinates[-1:]
+        return data, 'preview'
+    
+    key = _level_key(design_type)
+    level = min(int(data.get(key, 5 if key == 'rhombus_size' else 6)), MAX_PREDICTED_LEVEL)
+    reduced = level
+    while reduced > 1 and _predict_cost(dict(data, **{key: reduced})) > PREVIEW_BUDGET_MB:
+        reduced -= 1
+    if reduced == level:
+        # Already cheap: the preview is the full render
+        return data, 'full'
+    data[key] = reduced
+    return data, 'preview'
+
 @app.route('/api/generate-kolam', methods=['POST'])
 def generate_kolam():
     """Generate Kolam design based on user inputs"""
     try:
-        data = request.get_json()
+        data, lod = _apply_lod(request.get_json())
         
-        # Extract parameters
-        design_type = data.get('design_type', 'suzhi')
-        dot_size = int(data.get('dot_size', 10))
-        iterations = int(data.get('iterations', 6))
-        width = int(data.get('width', 800))
-        height = int(data.get('height', 600))
+        try:
+            result = _render_admitted(data)
+        except Overloaded as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
         
-        # Generate SVG based on design type
-        if design_type == 'suzhi':
-            svg_content = kolam_gen.generate_suzhi_kolam_svg(
-                dot_size=dot_size, 
-                iterations=iterations, 
-                width=width, 
-                height=height
-            )
-        elif design_type == 'kambi':
-            rhombus_size = int(data.get('rhombus_size', 5))
-            svg_content = kolam_gen.generate_kambi_kolam_svg(
-                dot_size=dot_size, 
-                rhombus_size=rhombus_size, 
-                width=width, 
-                height=height
-            )
-        elif design_type == 'fourcolor':
-            svg_content = kolam_gen.generate_fourcolor_kolam_svg(
-                dot_size=dot_size, 
-                iterations=iterations, 
-                width=width, 
-                height=height
-            )
-        elif design_type == 'island':
-            svg_content = kolam_gen.generate_island_kolam_svg(
-                dot_size=dot_size, 
-                iterations=iterations, 
-                width=width, 
-                height=height
-            )
-        elif design_type == 'sikku':
-            svg_content = kolam_gen.generate_sikku_kolam_svg(
-                dot_size=dot_size, 
-                iterations=iterations, 
-                width=width, 
-                height=height
-            )
-        elif design_type == 'special':
-            svg_content = kolam_gen.generate_special_kolam_svg(
-                dot_size=dot_size, 
-                iterations=iterations, 
-                width=width, 
-                height=height
-            )
-        elif design_type == 'group':
-            polygon_sides = int(data.get('polygon_sides', 6))
-            svg_content = kolam_gen.generate_group_kolam_svg(
-                dot_size=dot_size, 
-                iterations=iterations, 
-                polygon_sides=polygon_sides,
-                width=width, 
-                height=height
-            )
-        elif design_type == 'traditional':
-            grid_size = int(data.get('grid_size', 7))
-            pattern_type = data.get('pattern_type', 'lotus')
-            svg_content = kolam_gen.generate_traditional_rangoli_svg(
-                dot_size=dot_size, 
-                iterations=iterations, 
-                grid_size=grid_size,
-                pattern_type=pattern_type,
-                width=width, 
-                height=height
-            )
-        elif design_type == 'single_knot':
-            svg_content = auth_kolam_gen.generate_single_knot_kolam_svg(
-                dot_size=dot_size,
-                iterations=iterations,
-                width=width,
-                height=height
-            )
-        elif design_type == 'rhombus':
-            rhombus_size = int(data.get('rhombus_size', 5))
-            svg_content = auth_kolam_gen.generate_rhombus_kolam_svg(
-                dot_size=dot_size,
-                rhombus_size=rhombus_size,
-                width=width,
-                height=height
-            )
-        elif design_type == 'polygon_inscribed':
-            polygon_vertices = int(data.get('polygon_vertices', 6))
-            polygon_size = int(data.get('polygon_size', 100))
-            svg_content = auth_kolam_gen.generate_polygon_inscribed_kolam_svg(
-                dot_size=dot_size,
-                polygon_vertices=polygon_vertices,
-                polygon_size=polygon_size,
-                iterations=iterations,
-                width=width,
-                height=height
-            )
-        elif design_type == 'circle_inscribed':
-            circle_radius = int(data.get('circle_radius', 100))
-            svg_content = auth_kolam_gen.generate_circle_inscribed_kolam_svg(
-                dot_size=dot_size,
-                circle_radius=circle_radius,
-                iterations=iterations,
-                width=width,
-                height=height
-            )
-        elif design_type == 'combined':
-            svg_content = auth_kolam_gen.generate_suzhi_sikku_kambi_combined_svg(
-                dot_size=dot_size,
-                iterations=iterations,
-                width=width,
-                height=height
-            )
-        elif design_type == 'custom':
-            coordinates = data.get('coordinates', [])
-            # Convert coordinates to list of tuples
-            coord_list = [(coord['x'], coord['y']) for coord in coordinates]
-            svg_content = kolam_gen.generate_custom_kolam_svg(
-                coordinates=coord_list, 
-                width=width, 
-                height=height
-            )
-        else:
+        if result is None:
             return jsonify({'error': 'Invalid design type'}), 400
+        svg_content, parameters = result
         
         return jsonify({
             'success': True,
             'svg': svg_content,
-            'parameters': {
-                'design_type': design_type,
-                'dot_size': dot_size,
-                'iterations': iterations,
-                'width': width,
-                'height': height
-            }
+            'parameters': parameters,
+            'lod': lod
+        })
+    
+    except CoordinateError as e:
+        return jsonify({'valid': False, 'errors': [str(e)]}), 400
+    except MemoryBudgetExceeded as e:
+        return jsonify(_memory_budget_error(e)), 413
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _render_admitted(data):
+    """Render `data` once admission control lets it through; raises Overloaded when shed"""
+    try:
+        with render_limiter.admit(_predict_cost(data)):
+            return _generate_svg(data)
+    except Overloaded as e:
+        metrics.shed_requests.inc(reason=e.reason)
+        raise
+
+# File extensions and content types recognised by the coordinate upload
+UPLOAD_EXTENSIONS = {'.csv': 'csv', '.txt': 'csv', '.npy': 'npy', '.f32': 'f32', '.f64': 'f64'}
+UPLOAD_CONTENT_TYPES = {'text/csv': 'csv', 'text/plain': 'csv', 'application/x-npy': 'npy'}
+
+def _upload_format(filename, content_type):
+    """Coordinate format implied by an upload's file name or content type"""
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension in UPLOAD_EXTENSIONS:
+        return UPLOAD_EXTENSIONS[extension]
+    return UPLOAD_CONTENT_TYPES.get((content_type or '').split(';')[0].strip())
+
+def _simplify_tolerance(value):
+    """`simplify` as a float; raises CoordinateError unless it is a finite number of pixels, 0 or more"""
+    try:
+        simplify = float(value)
+    except (TypeError, ValueError):
+        simplify = math.nan
+    if not math.isfinite(simplify) or simplify < 0:
+        raise CoordinateError('simplify must be a finite number of pixels, 0 or more')
+    return simplify
+
+@app.route('/api/custom-kolam/upload', methods=['POST'])
+def upload_custom_kolam():
+    """Render a custom Kolam from an uploaded CSV, .npy or raw float32/float64 coordinate file"""
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            payload, fmt = upload.read(), _upload_format(upload.filename, upload.mimetype)
+        else:
+            payload, fmt = request.get_data(), _upload_format('', request.content_type)
+        fmt = request.args.get('format', fmt)
+        if fmt not in UPLOAD_FORMATS:
+            return jsonify({'error': f'Specify ?format= as one of: {", ".join(UPLOAD_FORMATS)}'}), 400
+        
+        try:
+            width = int(request.args.get('width', 800))
+            height = int(request.args.get('height', 600))
+        except ValueError:
+            return jsonify({'error': 'width and height must be integers'}), 400
+        try:
+            simplify = _simplify_tolerance(request.args.get('simplify', 0))
+        except CoordinateError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        try:
+            points = parse_coordinates(payload, fmt)
+        except CoordinateError as e:
+            return jsonify({'valid': False, 'errors': [str(e)]}), 400
+        
+        errors = _validate_parameters({'width': width, 'height': height})
+        if not errors:
+            errors = validate_points(points, width, height)
+        if errors:
+            return jsonify({'valid': False, 'errors': errors}), 400
+        
+        data = {'design_type': 'custom', 'width': width, 'height': height,
+                'points': points, 'simplify': simplify}
+        try:
+            svg_content, parameters = _render_admitted(data)
+        except Overloaded as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
+        
+        parameters.update({
+            'points': len(points),
+            'rendered_points': g.render_context.polyline_points,
+            'simplify': simplify
+        })
+        return jsonify({
+            'success': True,
+            'svg': svg_content,
+            'parameters': parameters
+        })
+    
+    except MemoryBudgetExceeded as e:
+        return jsonify(_memory_budget_error(e)), 413
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/vectorize', methods=['POST'])
+def vectorize():
+    """Trace an uploaded kolam photo or scan into simplified strokes, as SVG or geometry"""
+    try:
+        upload = request.files.get('image')
+        payload = upload.read() if upload is not None else request.get_data()
+        if not payload:
+            return jsonify({'error': 'Upload an image as the "image" field or the request body'}), 400
+        
+        output = request.args.get('output', 'svg')
+        invert = request.args.get('invert', 'auto')
+        if output not in ('svg', 'geometry') or invert not in ('auto', 'true', 'false'):
+            return jsonify({'error': 'output must be svg or geometry; invert must be auto, true or false'}), 400
+        invert = {'auto': None, 'true': True, 'false': False}[invert]
+        try:
+            max_side = min(max(int(request.args.get('max_side', DEFAULT_MAX_SIDE)), 64), 8192)
+            threshold = request.args.get('threshold')
+            threshold = int(threshold) if threshold is not None else None
+            simplify = float(request.args.get('simplify', 1.0))
+            min_length = float(request.args.get('min_length', 8.0))
+        except ValueError:
+            return jsonify({'error': 'max_side and threshold must be integers; simplify and min_length numbers'}), 400
+        
+        try:
+            with Image.open(io.BytesIO(payload)) as probe:
+                size = probe.size
+        except OSError:
+            return jsonify({'error': 'Unreadable image'}), 400
+        
+        cost = min(predict_bytes(*size, max_side=max_side), MEMORY_BUDGET_BYTES) / 2**20
+        try:
+            with render_limiter.admit(cost):
+                result = vectorize_image(payload, max_side=max_side, threshold=threshold, invert=invert,
+                                         simplify=simplify, min_length=min_length)
+                body = {'success': True, 'stats': result['stats']}
+                if output == 'svg':
+                    started = time.perf_counter()
+                    body['svg'] = strokes_to_svg(result)
+                    result['timings']['serialize'] = time.perf_counter() - started
+                else:
+                    body['geometry'] = strokes_to_geometry(result)
+        except Overloaded as e:
+            metrics.shed_requests.inc(reason=e.reason)
+            return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
+        except VectorizeError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        g.stage_timings = result['timings']
+        return jsonify(body)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/coordinates', methods=['POST'])
+def export_coordinates():
+    """Sample a design at a fixed arc-length spacing and return it as a tracker coordinate file"""
+    try:
+        data = request.get_json() or {}
+        fmt = request.args.get('format', 'kpts')
+        if fmt not in EXPORT_CONTENT_TYPES:
+            return jsonify({'error': f'format must be one of: {", ".join(EXPORT_CONTENT_TYPES)}'}), 400
+        try:
+            spacing = float(request.args.get('spacing', 2.0))
+        except ValueError:
+            spacing = 0
+        if not spacing > 0:
+            return jsonify({'error': 'spacing must be a positive number'}), 400
+        rounded = request.args.get('round', 'false') == 'true'
+        
+        try:
+            result = _render_admitted(data)
+        except Overloaded as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
+        if result is None:
+            return jsonify({'error': 'Invalid design type'}), 400
+        svg_content, parameters = result
+        
+        started = time.perf_counter()
+        try:
+            points, strokes = sample_geometry(svg_geometry(svg_content), spacing, MAX_EXPORT_POINTS)
+        except GeometryError as e:
+            return jsonify({'error': str(e)}), 400
+        sampled = time.perf_counter()
+        if rounded:
+            points = np.rint(points).astype(np.int32)
+        buffer = io.BytesIO()
+        save_points(buffer, {'x': points[:, 0], 'y': points[:, 1], 'path': strokes}, fmt)
+        g.stage_timings = {'sample': sampled - started, 'encode': time.perf_counter() - sampled}
+        
+        filename = f"{parameters['design_type']}.{fmt}"
+        return Response(buffer.getvalue(), content_type=EXPORT_CONTENT_TYPES[fmt], headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Point-Count': str(len(points))
         })
     
+    except MemoryBudgetExceeded as e:
+        return jsonify(_memory_budget_error(e)), 413
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _memory_budget_error(e):
+    """Response body for a render rejected by the memory budget"""
+    return {
+        'error': str(e),
+        'estimated_bytes': e.estimated_bytes,
+        'budget_bytes': e.budget_bytes,
+        'suggested_max_level': e.suggested_max_level
+    }
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Expose render and request metrics in Prometheus text format"""
+    return Response(metrics.registry.exposition(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """Sample every thread of this worker for ?seconds=N and return collapsed stacks"""
+    supplied = request.headers.get('X-Admin-Token', '')
+    if not ADMIN_TOKEN or not hmac.compare_digest(supplied, ADMIN_TOKEN):
+        abort(404)
+    
+    try:
+        seconds = float(request.args.get('seconds', 10))
+    except ValueError:
+        return jsonify({'error': 'seconds must be a number'}), 400
+    if seconds <= 0 or seconds > MAX_PROFILE_SECONDS:
+        return jsonify({'error': f'seconds must be between 0 and {MAX_PROFILE_SECONDS}'}), 400
+    
+    try:
+        counts = profiler.profile(seconds)
+    except ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 409
+    
+    return Response(format_collapsed(counts), mimetype='text/plain',
+                    headers={'X-Profile-Worker-Pid': str(os.getpid())})
+
 @app.route('/api/design-types', methods=['GET'])
 def get_design_types():
     """Get available design types"""
@@ -254,72 +647,76 @@ def get_design_types():
         ]
     })
 
+def _validate_parameters(data):
+    """Return a list of validation errors for the request parameters"""
+    design_type = data.get('design_type')
+    
+    errors = []
+    
+    # Common validations
+    dot_size = data.get('dot_size', 10)
+    if not isinstance(dot_size, int) or dot_size < 1 or dot_size > 50:
+        errors.append('Dot size must be between 1 and 50')
+    
+    width = data.get('width', 800)
+    height = data.get('height', 600)
+    if not isinstance(width, int) or width < 100 or width > 2000:
+        errors.append('Width must be between 100 and 2000')
+    if not isinstance(height, int) or height < 100 or height > 2000:
+        errors.append('Height must be between 100 and 2000')
+    
+    # Design-specific validations
+    if design_type in ['suzhi', 'fourcolor', 'island', 'sikku', 'special']:
+        iterations = data.get('iterations', 6)
+        if not isinstance(iterations, int) or iterations < 1 or iterations > 10:
+            errors.append('Iterations must be between 1 and 10')
+    
+    elif design_type == 'kambi':
+        rhombus_size = data.get('rhombus_size', 5)
+        if not isinstance(rhombus_size, int) or rhombus_size < 1 or rhombus_size > 15:
+            errors.append('Rhombus size must be between 1 and 15')
+            
+    elif design_type == 'group':
+        iterations = data.get('iterations', 4)
+        if not isinstance(iterations, int) or iterations < 1 or iterations > 8:
+            errors.append('Iterations must be between 1 and 8')
+        polygon_sides = data.get('polygon_sides', 6)
+        if not isinstance(polygon_sides, int) or polygon_sides < 3 or polygon_sides > 12:
+            errors.append('Polygon sides must be between 3 and 12')
+            
+    elif design_type == 'traditional':
+        iterations = data.get('iterations', 4)
+        if not isinstance(iterations, int) or iterations < 1 or iterations > 6:
+            errors.append('Iterations must be between 1 and 6')
+        grid_size = data.get('grid_size', 7)
+        if not isinstance(grid_size, int) or grid_size < 3 or grid_size > 15:
+            errors.append('Grid size must be between 3 and 15')
+        pattern_type = data.get('pattern_type', 'lotus')
+        if pattern_type not in ['lotus', 'peacock', 'flower', 'geometric']:
+            errors.append('Pattern type must be one of: lotus, peacock, flower, geometric')
+    
+    elif design_type == 'custom':
+        coordinates = data.get('coordinates', [])
+        if not isinstance(coordinates, list):
+            errors.append('At least 2 coordinate points are required for custom design')
+        else:
+            try:
+                errors.extend(validate_points(coordinates_from_json(coordinates), width, height))
+            except CoordinateError as e:
+                errors.append(str(e))
+        try:
+            _simplify_tolerance(data.get('simplify', 0) or 0)
+        except CoordinateError as e:
+            errors.append(str(e))
+    
+    return errors
+
 @app.route('/api/validate-parameters', methods=['POST'])
 def validate_parameters():
     """Validate input parameters"""
     try:
         data = request.get_json()
-        design_type = data.get('design_type')
-        
-        errors = []
-        
-        # Common validations
-        dot_size = data.get('dot_size', 10)
-        if not isinstance(dot_size, int) or dot_size < 1 or dot_size > 50:
-            errors.append('Dot size must be between 1 and 50')
-        
-        width = data.get('width', 800)
-        height = data.get('height', 600)
-        if not isinstance(width, int) or width < 100 or width > 2000:
-            errors.append('Width must be between 100 and 2000')
-        if not isinstance(height, int) or height < 100 or height > 2000:
-            errors.append('Height must be between 100 and 2000')
-        
-        # Design-specific validations
-        if design_type in ['suzhi', 'fourcolor', 'island', 'sikku', 'special']:
-            iterations = data.get('iterations', 6)
-            if not isinstance(iterations, int) or iterations < 1 or iterations > 10:
-                errors.append('Iterations must be between 1 and 10')
-        
-        elif design_type == 'kambi':
-            rhombus_size = data.get('rhombus_size', 5)
-            if not isinstance(rhombus_size, int) or rhombus_size < 1 or rhombus_size > 15:
-                errors.append('Rhombus size must be between 1 and 15')
-                
-        elif design_type == 'group':
-            iterations = data.get('iterations', 4)
-            if not isinstance(iterations, int) or iterations < 1 or iterations > 8:
-                errors.append('Iterations must be between 1 and 8')
-            polygon_sides = data.get('polygon_sides', 6)
-            if not isinstance(polygon_sides, int) or polygon_sides < 3 or polygon_sides > 12:
-                errors.append('Polygon sides must be between 3 and 12')
-                
-        elif design_type == 'traditional':
-            iterations = data.get('iterations', 4)
-            if not isinstance(iterations, int) or iterations < 1 or iterations > 6:
-                errors.append('Iterations must be between 1 and 6')
-            grid_size = data.get('grid_size', 7)
-            if not isinstance(grid_size, int) or grid_size < 3 or grid_size > 15:
-                errors.append('Grid size must be between 3 and 15')
-            pattern_type = data.get('pattern_type', 'lotus')
-            if pattern_type not in ['lotus', 'peacock', 'flower', 'geometric']:
-                errors.append('Pattern type must be one of: lotus, peacock, flower, geometric')
-        
-        elif design_type == 'custom':
-            coordinates = data.get('coordinates', [])
-            if not isinstance(coordinates, list) or len(coordinates) < 2:
-                errors.append('At least 2 coordinate points are required for custom design')
-            
-            for i, coord in enumerate(coordinates):
-                if not isinstance(coord, dict) or 'x' not in coord or 'y' not in coord:
-                    errors.append(f'Invalid coordinate at position {i+1}')
-                    break
-                try:
-                    x, y = int(coord['x']), int(coord['y'])
-                    if x < 0 or x > width or y < 0 or y > height:
-                        errors.append(f'Coordinate {i+1} is outside canvas bounds')
-                except (ValueError, TypeError):
-                    errors.append(f'Coordinate {i+1} must have numeric x and y values')
+        errors = _validate_parameters(data)
         
         return jsonify({
             'valid': len(errors) == 0,
@@ -329,5 +726,83 @@ def validate_parameters():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _render_live(data):
+    """Validate and render one live-session update"""
+    errors = _validate_parameters(data)
+    if errors:
+        return {'valid': False, 'errors': errors}
+    
+    # Live renders share the limiter with /api/generate-kolam. Each session
+    # renders on one worker that only ever takes the newest parameters, so
+    # a session holds at most one place in the queue; a render superseded
+    # while it waited is dropped before it starts.
+    try:
+        with render_limiter.admit(_predict_cost(data)):
+            checkpoint()
+            result = _generate_svg(data)
+    except Overloaded as e:
+        metrics.shed_requests.inc(reason=e.reason)
+        return {'error': str(e), 'retry_after': e.retry_after}
+    except MemoryBudgetExceeded as e:
+        return _memory_budget_error(e)
+    if result is None:
+        return {'error': 'Invalid design type'}
+    svg_content, parameters = result
+    
+    return {
+        'success': True,
+        'svg': svg_content,
+        'parameters': parameters
+    }
+
+live_sessions = LiveSessionManager(render=_render_live)
+
+@app.route('/api/live/session', methods=['POST'])
+def create_live_session():
+    """Start a live-parameter session"""
+    session = live_sessions.create()
+    return jsonify({'session_id': session.session_id})
+
+@app.route('/api/live/<session_id>', methods=['DELETE'])
+def close_live_session(session_id):
+    """End a live-parameter session"""
+    if not live_sessions.close(session_id):
+        return jsonify({'error': 'Unknown session'}), 404
+    return jsonify({'success': True})
+
+@app.route('/api/live/<session_id>/parameters', methods=['POST'])
+def update_live_parameters(session_id):
+    """Submit new parameters; stale renders for this session are cancelled"""
+    session = live_sessions.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown session'}), 404
+    
+    version = session.submit(request.get_json())
+    return jsonify({'version': version})
+
+@app.route('/api/live/<session_id>/events', methods=['GET'])
+def live_events(session_id):
+    """Server-sent event stream carrying the newest render for a session"""
+    session = live_sessions.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown session'}), 404
+    
+    last_version = int(request.headers.get('Last-Event-ID', 0) or 0)
+    
+    def stream():
+        version = last_version
+        yield 'retry: 1000\n\n'
+        while not session.closed:
+            result = session.wait_for_result(version, timeout=15)
+            if result is None:
+                # Keep-alive comment so proxies don't drop the idle stream
+                yield ': keep-alive\n\n'
+                continue
+            version, payload = result
+            yield f'id: {version}\nevent: result\ndata: {json.dumps(payload)}\n\n'
+    
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
@@ -0,0 +1,125 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    def __init__(self, retry_after: int, reason: str):
+        self.retry_after = retry_after
+        self.reason = reason
+        super().__init__(f'Server is busy ({reason}); retry in {retry_after}s')
+
+
+class _Waiter:
+    __slots__ = ('cost', 'seq', 'evicted')
+
+    def __init__(self, cost: float, seq: int):
+        self.cost = cost
+        self.seq = seq
+        self.evicted = False
+
+    def __lt__(self, other: '_Waiter') -> bool:
+        return (self.cost, self.seq) < (other.cost, other.seq)
+
+
+class CostAwareLimiter:
+    """
+    Admission control that bounds the total predicted cost of in-flight work.
+
+    Requests that fit are admitted immediately unless a cheaper request is
+    already waiting. Waiters are served cheapest first, so small designs jump
+    ahead of big renders. When the bounded queue is full, a cheaper arrival
+    evicts the most expensive waiter; otherwise it is shed. Waiters give up
+    after `max_wait` seconds.
+    """
+
+    def __init__(self, capacity: float, max_queue: int = 32, max_wait: float = 10.0):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self._cond = threading.Condition()
+        self._in_use = 0.0
+        self._waiters = []
+        self._seq = itertools.count()
+        # Smoothed duration of admitted requests, for Retry-After hints
+        self._avg_seconds = 1.0
+
+    @contextmanager
+    def admit(self, cost: float):
+        """Hold `cost` units of capacity for the duration of the block"""
+        # Anything bigger than the whole capacity runs alone
+        cost = min(max(cost, 0.0), self.capacity)
+        self._acquire(cost)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(cost, time.monotonic() - started)
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                'in_use': self._in_use,
+                'capacity': self.capacity,
+                'queued': len(self._waiters),
+                'queued_cost': sum(waiter.cost for waiter in self._waiters)
+            }
+
+    def _fits(self, cost: float) -> bool:
+        return self._in_use + cost <= self.capacity
+
+    def _acquire(self, cost: float):
+        with self._cond:
+            if self._fits(cost) and (not self._waiters or cost <= self._waiters[0].cost):
+                self._in_use += cost
+                return
+
+            if len(self._waiters) >= self.max_queue:
+                costliest = max(self._waiters)
+                if costliest.cost <= cost:
+                    raise Overloaded(self._retry_after(), 'queue full')
+                # Make room for the cheaper request
+                costliest.evicted = True
+                self._remove_waiter(costliest)
+
+            waiter = _Waiter(cost, next(self._seq))
+            heapq.heappush(self._waiters, waiter)
+            deadline = time.monotonic() + self.max_wait
+
+            while True:
+                if waiter.evicted:
+                    raise Overloaded(self._retry_after(), 'displaced by cheaper requests')
+                # Only the cheapest waiter may proceed; if it doesn't fit, nothing costlier does
+                if self._waiters[0] is waiter and self._fits(cost):
+                    heapq.heappop(self._waiters)
+                    self._in_use += cost
+                    self._cond.notify_all()
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._remove_waiter(waiter)
+                    raise Overloaded(self._retry_after(), 'queue timeout')
+                self._cond.wait(remaining)
+
+    def _release(self, cost: float, seconds: float):
+        with self._cond:
+            self._in_use = max(self._in_use - cost, 0.0)
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * seconds
+            self._cond.notify_all()
+
+    def _remove_waiter(self, waiter: _Waiter):
+        self._waiters.remove(waiter)
+        heapq.heapify(self._waiters)
+        self._cond.notify_all()
+
+    def _retry_after(self) -> int:
+        """Rough time for the admitted and queued work to drain, in whole seconds"""
+        backlog = self._in_use + sum(waiter.cost for waiter in self._waiters)
+        seconds = backlog / self.capacity * self._avg_seconds
+        return min(max(int(math.ceil(seconds)), 1), 60)
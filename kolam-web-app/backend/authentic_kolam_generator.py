@@ -3,6 +3,8 @@ import math
 import random
 import numpy as np
 from typing import Dict, List, Tuple
+from .lsystem import ELEMENT_BYTES, estimate_render_bytes, expand_lsystem, reserve_lsystem_memory, symbol_counts
+from .render_context import CHECKPOINT_INTERVAL, checkpoint, serialize_drawing
 
 class AuthenticKolamGenerator:
     """
@@ -18,6 +20,13 @@ class AuthenticKolamGenerator:
         }
         self.angle = 45
         
+        # Drawing cost per symbol for designs that draw the whole L-System;
+        # the inscribed and combined designs only draw its first few symbols
+        self.symbol_bytes = {
+            "single_knot": {"F": ELEMENT_BYTES, "A": ELEMENT_BYTES, "B": 3 * ELEMENT_BYTES},
+            "rhombus": {"F": ELEMENT_BYTES, "A": ELEMENT_BYTES, "B": 2 * ELEMENT_BYTES}
+        }
+        
         # Color schemes from the original files
         self.color_schemes = {
             "traditional": ["black"],
@@ -27,10 +36,12 @@ class AuthenticKolamGenerator:
     
     def expand_lsystem_string(self, axiom: str, rules: Dict[str, str], iterations: int) -> str:
         """Expand L-System string exactly as in original SIH code"""
-        result = axiom
-        for _ in range(iterations):
-            result = "".join([rules.get(ch, ch) for ch in result])
-        return result
+        return expand_lsystem(axiom, rules, iterations)
+    
+    def estimate_render_bytes(self, design_type: str, iterations: int) -> int:
+        """Predicted peak bytes to render `design_type` at `iterations`"""
+        counts = symbol_counts(self.default_axiom, self.default_rules, iterations)[-1]
+        return estimate_render_bytes(counts, self.symbol_bytes.get(design_type, {}))
     
     def generate_single_knot_kolam_svg(self, dot_size: int = 20, iterations: int = 4,
                                      width: int = 800, height: int = 600) -> str:
@@ -41,6 +52,8 @@ class AuthenticKolamGenerator:
         axiom = "FBFBFBFB"
         rules = {"A": "AFBFA", "B": "AFBFBFBFA"}
         
+        reserve_lsystem_memory(axiom, rules, iterations, self.symbol_bytes["single_knot"])
+        
         # Expand the L-System
         lsystem_string = self.expand_lsystem_string(axiom, rules, iterations)
         
@@ -56,7 +69,10 @@ class AuthenticKolamGenerator:
         colors = {"F": "green", "A": "blue", "B": "red"}
         
         # Process each symbol in the L-System string
-        for symbol in lsystem_string:
+        for i, symbol in enumerate(lsystem_string):
+            if i % CHECKPOINT_INTERVAL == 0:
+                checkpoint()
+            
             color = colors.get(symbol, "black")
             
             if symbol == "F":
@@ -125,7 +141,7 @@ class AuthenticKolamGenerator:
                                stroke=color, stroke_width=4))
                 x, y = new_x, new_y
         
-        return dwg.tostring()
+        return serialize_drawing(dwg)
     
     def generate_rhombus_kolam_svg(self, dot_size: int = 20, rhombus_size: int = 5,
                                  width: int = 800, height: int = 600) -> str:
@@ -136,6 +152,7 @@ class AuthenticKolamGenerator:
         rules = {"A": "AFBFA", "B": "AFBFBFBFA"}
         iterations = rhombus_size  # Use rhombus_size as iterations like original
         
+        reserve_lsystem_memory(axiom, rules, iterations, self.symbol_bytes["rhombus"])
         lsystem_string = self.expand_lsystem_string(axiom, rules, iterations)
         
         dwg = svgwrite.Drawing(size=(width, height))
@@ -160,7 +177,10 @@ class AuthenticKolamGenerator:
                           stroke_width=2, opacity=0.5))
         
         # Process L-System within rhombus
-        for symbol in lsystem_string:
+        for i, symbol in enumerate(lsystem_string):
+            if i % CHECKPOINT_INTERVAL == 0:
+                checkpoint()
+            
             if symbol == "F":
                 new_x = x + dot_size * math.cos(math.radians(direction))
                 new_y = y + dot_size * math.sin(math.radians(direction))
@@ -199,7 +219,7 @@ class AuthenticKolamGenerator:
                 direction += 270
                 direction %= 360
         
-        return dwg.tostring()
+        return serialize_drawing(dwg)
     
     def generate_polygon_inscribed_kolam_svg(self, dot_size: int = 20, polygon_vertices: int = 6,
                                            polygon_size: int = 100, iterations: int = 4,
@@ -210,6 +230,8 @@ class AuthenticKolamGenerator:
         axiom = "FBFBFBFB"
         rules = {"A": "AFBFA", "B": "AFBFBFBFA"}
         
+        # Only the first few symbols are drawn, so just the expansion counts
+        reserve_lsystem_memory(axiom, rules, iterations)
         lsystem_string = self.expand_lsystem_string(axiom, rules, iterations)
         
         dwg = svgwrite.Drawing(size=(width, height))
@@ -244,7 +266,7 @@ class AuthenticKolamGenerator:
             self._draw_mini_kolam(dwg, lsystem_string, kolam_x, kolam_y, 
                                 dot_size // 2, colors[i % len(colors)])
         
-        return dwg.tostring()
+        return serialize_drawing(dwg)
     
     def _draw_mini_kolam(self, dwg, lsystem_string: str, start_x: float, start_y: float, 
                         size: int, color: str):
@@ -277,6 +299,8 @@ class AuthenticKolamGenerator:
         axiom = "FBFBFBFB"
         rules = {"A": "AFBFA", "B": "AFBFBFBFA"}
         
+        # Only the first few symbols are drawn, so just the expansion counts
+        reserve_lsystem_memory(axiom, rules, iterations)
         lsystem_string = self.expand_lsystem_string(axiom, rules, iterations)
         
         dwg = svgwrite.Drawing(size=(width, height))
@@ -308,7 +332,7 @@ class AuthenticKolamGenerator:
                     self._draw_mini_kolam(dwg, lsystem_string, kolam_x, kolam_y, 
                                         max(5, dot_size // (i + 2)), f'hsl({j * 45}, 70%, 50%)')
         
-        return dwg.tostring()
+        return serialize_drawing(dwg)
     
     def generate_suzhi_sikku_kambi_combined_svg(self, dot_size: int = 20, iterations: int = 4,
                                               width: int = 800, height: int = 600) -> str:
@@ -318,6 +342,8 @@ class AuthenticKolamGenerator:
         axiom = "FBFBFBFB"
         rules = {"A": "AFBFA", "B": "AFBFBFBFA"}
         
+        # Only the first few symbols are drawn, so just the expansion counts
+        reserve_lsystem_memory(axiom, rules, iterations)
         lsystem_string = self.expand_lsystem_string(axiom, rules, iterations)
         
         dwg = svgwrite.Drawing(size=(width, height))
@@ -379,7 +405,7 @@ class AuthenticKolamGenerator:
                     direction += 270
                     direction %= 360
         
-        return dwg.tostring()
+        return serialize_drawing(dwg)
     
     def generate_coordinate_based_kolam_svg(self, coordinates: List[Tuple[int, int]], 
                                           width: int = 800, height: int = 600,
@@ -391,7 +417,7 @@ class AuthenticKolamGenerator:
         dwg.add(dwg.rect(insert=(0, 0), size=('100%', '100%'), fill='white'))
         
         if not coordinates:
-            return dwg.tostring()
+            return serialize_drawing(dwg)
         
         if connect_type == "sequential":
             # Connect points in sequence
@@ -414,4 +440,4 @@ class AuthenticKolamGenerator:
                 
                 dwg.add(dwg.path(d=path_data, stroke='black', stroke_width=2, fill='none'))
         
-        return dwg.tostring()
+        return serialize_drawing(dwg)
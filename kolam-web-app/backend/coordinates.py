@@ -0,0 +1,229 @@
+import io
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+# Upload formats: CSV text, NumPy .npy, or raw little-endian float32/float64 x,y pairs
+UPLOAD_FORMATS = ('csv', 'npy', 'f32', 'f64')
+MAX_UPLOAD_POINTS = 5_000_000
+
+# Points per initial span when simplifying; boundaries between spans are always kept
+RDP_CHUNK = 128
+
+# Validation messages listed individually before they are summarized
+MAX_REPORTED_ERRORS = 10
+
+
+class CoordinateError(ValueError):
+    """Raised for coordinate data that can't be read as x,y points"""
+
+
+def parse_coordinates(payload: bytes, fmt: str) -> np.ndarray:
+    """Parse an uploaded coordinate file into an (N, 2) float64 array"""
+    if fmt == 'csv':
+        points = _parse_csv(payload)
+    elif fmt == 'npy':
+        try:
+            points = np.load(io.BytesIO(payload), allow_pickle=False)
+        except ValueError as e:
+            raise CoordinateError(f'Unreadable .npy file: {e}')
+    elif fmt in ('f32', 'f64'):
+        itemsize = 4 if fmt == 'f32' else 8
+        if len(payload) % (2 * itemsize):
+            raise CoordinateError(f'Binary {fmt} data must be whole x,y pairs of {itemsize}-byte floats')
+        points = np.frombuffer(payload, dtype=f'<f{itemsize}')
+    else:
+        raise CoordinateError(f'Unknown format {fmt!r}; expected one of {", ".join(UPLOAD_FORMATS)}')
+
+    if points.ndim == 1 and points.size % 2 == 0:
+        points = points.reshape(-1, 2)
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise CoordinateError(f'Expected x,y pairs, got an array of shape {points.shape}')
+    if len(points) > MAX_UPLOAD_POINTS:
+        raise CoordinateError(f'At most {MAX_UPLOAD_POINTS} points can be uploaded')
+    try:
+        return points.astype(np.float64, copy=False)
+    except (TypeError, ValueError):
+        raise CoordinateError('Coordinates must be numeric')
+
+
+def _parse_csv(payload: bytes) -> np.ndarray:
+    """x,y columns by name when there is a header, otherwise the first two columns"""
+    first_line = payload[:payload.find(b'\n')] if b'\n' in payload else payload
+    try:
+        [float(value) for value in first_line.split(b',')]
+        header = None
+    except ValueError:
+        header = 0
+
+    try:
+        frame = pd.read_csv(io.BytesIO(payload), header=header, skipinitialspace=True)
+    except (ValueError, pd.errors.ParserError) as e:
+        raise CoordinateError(f'Unreadable CSV: {e}')
+    if header == 0:
+        frame.columns = [str(name).strip().lower() for name in frame.columns]
+    columns = ['x', 'y'] if {'x', 'y'} <= set(frame.columns) else list(frame.columns[:2])
+    if len(columns) < 2:
+        raise CoordinateError('CSV needs x and y columns')
+    try:
+        return frame[columns].to_numpy(dtype=np.float64)
+    except (TypeError, ValueError):
+        raise CoordinateError('CSV x and y columns must be numeric')
+
+
+def coordinates_from_json(coordinates) -> np.ndarray:
+    """Convert the JSON list of {x, y} dicts into an (N, 2) float64 array"""
+    if not isinstance(coordinates, list):
+        raise CoordinateError('Coordinates must be a list of {x, y} points')
+    if not coordinates:
+        return np.empty((0, 2))
+    try:
+        return np.array([(coord['x'], coord['y']) for coord in coordinates], dtype=np.float64)
+    except (KeyError, TypeError, ValueError):
+        pass
+
+    # Slow path only to name the first bad entry
+    for i, coord in enumerate(coordinates):
+        if not isinstance(coord, dict) or 'x' not in coord or 'y' not in coord:
+            raise CoordinateError(f'Invalid coordinate at position {i+1}')
+        try:
+            float(coord['x']), float(coord['y'])
+        except (ValueError, TypeError):
+            raise CoordinateError(f'Coordinate {i+1} must have numeric x and y values')
+    raise CoordinateError('Coordinates must be numeric')
+
+
+def validate_points(points: np.ndarray, width: int, height: int) -> List[str]:
+    """Validation errors for a coordinate array, listing the first few offenders"""
+    errors = []
+    if len(points) < 2:
+        errors.append('At least 2 coordinate points are required for custom design')
+
+    finite = np.isfinite(points).all(axis=1)
+    for i in np.flatnonzero(~finite)[:1]:
+        errors.append(f'Coordinate {i+1} must have numeric x and y values')
+
+    outside = finite & ((points[:, 0] < 0) | (points[:, 0] > width) |
+                        (points[:, 1] < 0) | (points[:, 1] > height))
+    indices = np.flatnonzero(outside)
+    for i in indices[:MAX_REPORTED_ERRORS]:
+        errors.append(f'Coordinate {i+1} is outside canvas bounds')
+    if len(indices) > MAX_REPORTED_ERRORS:
+        errors.append(f'{len(indices) - MAX_REPORTED_ERRORS} more coordinates are outside canvas bounds')
+    return errors
+
+
+def simplify_polyline(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Simplify a polyline to within about `tolerance` pixels.
+
+    Points are first snapped to a grid of half the tolerance and consecutive
+    duplicates dropped, which collapses dense pixel-traced runs in one
+    vectorized pass; Ramer-Douglas-Peucker then removes points closer than
+    `tolerance` to the chord of their span.
+    """
+    return points[simplify_indices(points, tolerance)]
+
+
+def simplify_indices(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Indices into `points` of the points simplify_polyline keeps, in order"""
+    if tolerance <= 0 or len(points) < 3:
+        return np.arange(len(points))
+
+    cell = tolerance / 2
+    snapped = np.round(points / cell)
+    changed = np.ones(len(points), dtype=bool)
+    changed[1:] = (snapped[1:] != snapped[:-1]).any(axis=1)
+    changed[-1] = True
+    survivors = np.flatnonzero(changed)
+    points = points[survivors]
+    if len(points) < 3:
+        return survivors
+
+    # Ramer-Douglas-Peucker one recursion level at a time: the interior points
+    # of every unfinished span are measured in one vectorized pass, so the
+    # Python loop runs once per level rather than once per span. Spans start
+    # as fixed-size chunks, which bounds the depth on noisy input at the cost
+    # of keeping the chunk boundaries.
+    xs = np.ascontiguousarray(points[:, 0])
+    ys = np.ascontiguousarray(points[:, 1])
+    keep = np.zeros(len(points), dtype=bool)
+    keep[::RDP_CHUNK] = True
+    keep[-1] = True
+    pending = ~keep
+    while True:
+        index = np.flatnonzero(pending)
+        if not len(index):
+            break
+        kept = np.flatnonzero(keep)
+        # Kept points bounding each pending point's span
+        following = np.cumsum(keep)[index]
+        start, end = kept[following - 1], kept[following]
+        chord_x, chord_y = xs[end] - xs[start], ys[end] - ys[start]
+        offset_x, offset_y = xs[index] - xs[start], ys[index] - ys[start]
+        length = np.hypot(chord_x, chord_y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            distance = np.abs(chord_x * offset_y - chord_y * offset_x) / length
+        closed = length == 0
+        if closed.any():
+            distance[closed] = np.hypot(offset_x[closed], offset_y[closed])
+
+        # Interior points of one span are contiguous in `index`
+        first = np.flatnonzero(np.r_[True, following[1:] != following[:-1]])
+        counts = np.diff(np.r_[first, len(index)])
+        farthest = np.maximum.reduceat(distance, first)
+        span = np.repeat(np.arange(len(first)), counts)
+        candidates = np.flatnonzero(distance == farthest[span])
+        leading = np.r_[True, span[candidates[1:]] != span[candidates[:-1]]]
+        split = index[candidates[leading]]
+
+        splitting = farthest > tolerance
+        keep[split[splitting]] = True
+        pending[index[~np.repeat(splitting, counts)]] = False
+        pending[split[splitting]] = False
+    return survivors[keep]
+
+
+# Widest integer coordinate written by polyline_path_data
+_MAX_DIGITS = 9
+
+
+def polyline_path_data(points: np.ndarray, close: bool = False) -> str:
+    """
+    SVG path data "M x y L x y ... [Z]" for a polyline at whole-pixel precision,
+    assembled as one byte array instead of one formatted string per point.
+    """
+    values = np.rint(points)
+    if not len(values):
+        return ''
+    if values.min() < 0 or values.max() >= 10 ** _MAX_DIGITS:
+        # Negative or huge coordinates are rare enough to format the slow way
+        flat = values.astype(np.int64).ravel().tolist()
+        data = 'M %d %d' % (flat[0], flat[1]) + (' L %d %d' * (len(values) - 1)) % tuple(flat[2:])
+        return data + ' Z' if close else data
+
+    # One row per point, "L x y " with digits right-aligned in fixed-width
+    # fields; a mask marks the bytes that belong in the output
+    digits = len(str(int(values.max())))
+    width = 2 + 2 * (digits + 1)
+    rows = np.empty((len(values), width), dtype=np.uint8)
+    mask = np.ones((len(values), width), dtype=bool)
+    rows[:, 0], rows[:, 1] = ord('L'), ord(' ')
+    for column in (0, 1):
+        number = np.ascontiguousarray(values[:, column], dtype=np.int32)
+        end = 2 + (column + 1) * (digits + 1) - 1
+        rows[:, end] = ord(' ')
+        length = np.ones(len(number), dtype=np.int32)
+        for place in range(digits):
+            if place:
+                length += number > 0
+            number, digit = np.divmod(number, 10)
+            rows[:, end - 1 - place] = digit
+            rows[:, end - 1 - place] += ord('0')
+        for place in range(1, digits):
+            mask[:, end - 1 - place] = place < length
+
+    rows[0, 0] = ord('M')
+    data = rows[mask].tobytes().decode('ascii').rstrip()
+    return data + ' Z' if close else data
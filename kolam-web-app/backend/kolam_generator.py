@@ -3,6 +3,11 @@ import math
 import random
 import numpy as np
 from typing import Dict, List, Tuple
+from .coordinates import polyline_path_data, simplify_polyline
+from .lsystem import (PATH_SYMBOL_BYTES, estimate_render_bytes, expand_lsystem, reserve_lsystem_memory,
+                      reserve_polyline_memory, symbol_counts)
+from .render_context import (CHECKPOINT_INTERVAL, checkpoint, record_polyline_points, record_segments,
+                             serialize_drawing)
 
 class KolamGenerator:
     def __init__(self):
@@ -89,10 +94,19 @@ class KolamGenerator:
         
     def expand_lsystem_string(self, axiom: str, rules: Dict[str, str], iterations: int) -> str:
         """Expand the L-System string based on rules and iterations"""
-        result = axiom
-        for _ in range(iterations):
-            result = "".join([rules.get(ch, ch) for ch in result])
-        return result
+        return expand_lsystem(axiom, rules, iterations)
+    
+    def _symbol_bytes(self, system: dict) -> Dict[str, int]:
+        """Drawing cost per symbol; polygon and traditional designs draw a fixed pattern"""
+        if system.get("polygon", False) or system.get("traditional", False):
+            return {}
+        return PATH_SYMBOL_BYTES
+    
+    def estimate_render_bytes(self, design_type: str, iterations: int) -> int:
+        """Predicted peak bytes to render `design_type` at `iterations`"""
+        system = self.kolam_systems.get(design_type, self.kolam_systems["suzhi"])
+        counts = symbol_counts(system["axiom"], system["rules"], iterations)[-1]
+        return estimate_render_bytes(counts, self._symbol_bytes(system))
     
     def generate_lsystem_svg(self, design_type: str, dot_size: int = 10, iterations: int = 6, 
                              width: int = 800, height: int = 600, **kwargs) -> str:
@@ -110,6 +124,8 @@ class KolamGenerator:
         rhombus_size = kwargs.get("rhombus_size", 5)
         polygon_sides = kwargs.get("polygon_sides", 6)
         
+        reserve_lsystem_memory(axiom, rules, iterations, self._symbol_bytes(system))
+        
         # Generate the L-system string
         lsystem_string = self.expand_lsystem_string(axiom, rules, iterations)
         
@@ -142,7 +158,10 @@ class KolamGenerator:
         current_color = stroke_color
         current_path = path_data
         
-        for symbol in lsystem_string:
+        for i, symbol in enumerate(lsystem_string):
+            if i % CHECKPOINT_INTERVAL == 0:
+                checkpoint()
+            
             # For multicolor designs, randomly change colors
             if multicolor and random.random() > 0.7:
                 # Save the current path if it exists
@@ -212,6 +231,9 @@ class KolamGenerator:
                 direction += 270
                 direction %= 360
         
+        # Path commands: one per F and A, a line plus an arc per B
+        record_segments(lsystem_string.count("F") + lsystem_string.count("A") + 2 * lsystem_string.count("B"))
+        
         # Save the last path
         if current_path != path_data:
             if current_color not in color_paths:
@@ -229,7 +251,7 @@ class KolamGenerator:
             path = dwg.path(d=current_path, stroke=stroke_color, stroke_width='2', fill='none')
             dwg.add(path)
         
-        return dwg.tostring()
+        return serialize_drawing(dwg)
         
     def _generate_polygon_kolam_svg(self, width: int, height: int, sides: int, dot_size: int, iterations: int) -> str:
         """Generate a polygon-based Kolam design as SVG"""
@@ -264,7 +286,7 @@ class KolamGenerator:
         for x, y in points:
             dwg.add(dwg.circle(center=(x, y), r=dot_size/2, fill='blue'))
         
-        return dwg.tostring()
+        return serialize_drawing(dwg)
         
     def _generate_traditional_rangoli_svg(self, width: int, height: int, dot_size: int, iterations: int, **kwargs) -> str:
         """Generate a traditional Rangoli/Kolam design with intricate patterns"""
@@ -301,7 +323,7 @@ class KolamGenerator:
         else:
             self._draw_geometric_pattern(dwg, dots, spacing, dot_size, iterations)
         
-        return dwg.tostring()
+        return serialize_drawing(dwg)
     
     def _draw_lotus_pattern(self, dwg, center_x: int, center_y: int, radius: int, iterations: int):
         """Draw a lotus-like pattern"""
@@ -447,28 +469,31 @@ class KolamGenerator:
         return self.generate_lsystem_svg("kambi", dot_size, iterations=rhombus_size, 
                                        width=width, height=height, rhombus_size=rhombus_size)
     
-    def generate_custom_kolam_svg(self, coordinates: List[Tuple[int, int]], 
-                                 width: int = 800, height: int = 600) -> str:
-        """Generate custom Kolam from coordinate points"""
-        dwg = svgwrite.Drawing(size=(width, height))
+    def generate_custom_kolam_svg(self, coordinates, width: int = 800, height: int = 600,
+                                 simplify: float = 0.0) -> str:
+        """Generate custom Kolam from coordinate points: (x, y) pairs or an (N, 2) array,
+        optionally simplified to within `simplify` pixels"""
+        # The path data is built in one vectorized pass; svgwrite's per-command
+        # validation would cost far more than drawing it
+        dwg = svgwrite.Drawing(size=(width, height), debug=False)
         dwg.add(dwg.rect(insert=(0, 0), size=('100%', '100%'), fill='white'))
         
-        if not coordinates:
-            return dwg.tostring()
+        points = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        if not len(points):
+            return serialize_drawing(dwg)
         
-        # Create path from coordinates
-        path_data = f"M {coordinates[0][0]} {coordinates[0][1]}"
-        for x, y in coordinates[1:]:
-            path_data += f" L {x} {y}"
+        reserve_polyline_memory(len(points))
+        points = simplify_polyline(points, simplify)
         
         # Close the path if needed
-        if len(coordinates) > 2:
-            path_data += " Z"
+        path_data = polyline_path_data(points, close=len(points) > 2)
+        record_segments(len(points) - 1)
+        record_polyline_points(len(points))
         
         path = dwg.path(d=path_data, stroke='red', stroke_width='2', fill='none')
         dwg.add(path)
         
-        return dwg.tostring()
+        return serialize_drawing(dwg)
         
     def generate_fourcolor_kolam_svg(self, dot_size: int = 10, iterations: int = 6,
                                     width: int = 800, height: int = 600) -> str:
@@ -0,0 +1,156 @@
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+
+from .render_context import ExpansionCache, RenderCancelled, RenderContext, render_context
+
+
+class LiveSession:
+    """
+    Interactive render session for one browser tab.
+
+    Parameter updates are coalesced: the worker only ever renders the newest
+    submitted parameters, a render is cancelled as soon as a newer update
+    arrives, and only the result for the newest version is published.
+    """
+
+    def __init__(self, session_id: str, render: Callable[[dict], dict]):
+        self.session_id = session_id
+        self.expansion_cache = ExpansionCache()
+        self.last_active = time.monotonic()
+        self.closed = False
+
+        self._render = render
+        self._cond = threading.Condition()
+        self._version = 0
+        self._pending: Optional[Tuple[int, dict]] = None
+        self._latest: Optional[Tuple[int, dict]] = None
+
+        self._worker = threading.Thread(target=self._run, name=f'live-{session_id[:8]}',
+                                        daemon=True)
+        self._worker.start()
+
+    def submit(self, params: dict) -> int:
+        """Queue new parameters, superseding anything not yet rendered"""
+        with self._cond:
+            self._version += 1
+            self._pending = (self._version, params)
+            self.last_active = time.monotonic()
+            self._cond.notify_all()
+            return self._version
+
+    def wait_for_result(self, after_version: int, timeout: float) -> Optional[Tuple[int, dict]]:
+        """Block until a result newer than `after_version` is published. A client
+        waiting here (an open event stream) counts as activity, so it isn't reaped."""
+        with self._cond:
+            self.last_active = time.monotonic()
+            self._cond.wait_for(
+                lambda: self.closed or (self._latest is not None and self._latest[0] > after_version),
+                timeout
+            )
+            self.last_active = time.monotonic()
+            if self._latest is not None and self._latest[0] > after_version:
+                return self._latest
+            return None
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def _is_stale(self, version: int) -> bool:
+        return self.closed or self._version != version
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self.closed or self._pending is not None)
+                if self.closed:
+                    return
+                version, params = self._pending
+                self._pending = None
+
+            context = RenderContext(cancel_check=lambda: self._is_stale(version),
+                                    expansion_cache=self.expansion_cache)
+            try:
+                with render_context(context):
+                    payload = self._render(params)
+            except RenderCancelled:
+                continue
+            except Exception as e:
+                payload = {'error': str(e)}
+
+            with self._cond:
+                # A newer version may have arrived after the last checkpoint
+                if version == self._version:
+                    self._latest = (version, payload)
+                    self._cond.notify_all()
+
+
+class LiveSessionManager:
+    """
+    Registry of live sessions with idle expiry. Idle sessions are reaped on
+    every create and lookup, and by a background timer every
+    `reap_interval` seconds, so abandoned sessions don't wait for traffic.
+    """
+
+    def __init__(self, render: Callable[[dict], dict], idle_timeout: float = 300,
+                 max_sessions: int = 64, reap_interval: Optional[float] = None):
+        self.render = render
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.reap_interval = reap_interval if reap_interval is not None else idle_timeout / 4
+        self._sessions: Dict[str, LiveSession] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        self._reaper = threading.Thread(target=self._reap_periodically, name='live-reaper', daemon=True)
+        self._reaper.start()
+
+    def create(self) -> LiveSession:
+        with self._lock:
+            self._reap_idle()
+            if len(self._sessions) >= self.max_sessions:
+                oldest = min(self._sessions.values(), key=lambda s: s.last_active)
+                self._remove(oldest.session_id)
+            session = LiveSession(uuid.uuid4().hex, self.render)
+            self._sessions[session.session_id] = session
+            return session
+
+    def get(self, session_id: str) -> Optional[LiveSession]:
+        with self._lock:
+            self._reap_idle()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_active = time.monotonic()
+            return session
+
+    def close(self, session_id: str) -> bool:
+        with self._lock:
+            return self._remove(session_id)
+
+    def shutdown(self):
+        """Stop the reaper and close every session"""
+        self._stopped.set()
+        with self._lock:
+            for session_id in list(self._sessions):
+                self._remove(session_id)
+
+    def _reap_periodically(self):
+        while not self._stopped.wait(self.reap_interval):
+            with self._lock:
+                self._reap_idle()
+
+    def _remove(self, session_id: str) -> bool:
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def _reap_idle(self):
+        now = time.monotonic()
+        for session_id, session in list(self._sessions.items()):
+            if now - session.last_active > self.idle_timeout:
+                self._remove(session_id)
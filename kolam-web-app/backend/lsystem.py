@@ -0,0 +1,97 @@
+from typing import Dict, List, Optional
+
+from .render_context import charge_memory, checkpoint, current_context, expansion_key, stage
+
+# Approximate peak bytes per symbol of the final string while expanding:
+# the string itself plus the intermediate list of replacements.
+EXPANSION_BYTES_PER_SYMBOL = 10
+
+# Peak bytes per symbol while drawing and serializing, measured with tracemalloc.
+# Single-path designs pay for svgwrite validating the whole path data on tostring();
+# element-per-segment designs pay per svgwrite element (about 1.5 KB each).
+PATH_SYMBOL_BYTES = {"F": 48 * 1024, "A": 76 * 1024, "B": 116 * 1024}
+ELEMENT_BYTES = 1536
+
+# Peak bytes per point of a coordinate polyline, whose path data is built
+# without svgwrite's validator (about 74 measured, plus headroom)
+POLYLINE_COMMAND_BYTES = 96
+
+
+def expand_lsystem(axiom: str, rules: Dict[str, str], iterations: int) -> str:
+    """
+    Expand an L-System string, reusing the active render context's expansion
+    cache when there is one and accounting the work as the expand stage.
+    """
+    context = current_context()
+    cache = context.expansion_cache if context is not None else None
+    key = expansion_key(axiom, rules, iterations)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            context.cache_hits += 1
+            context.expanded_symbols += len(cached)
+            return cached
+        context.cache_misses += 1
+
+    with stage('expand'):
+        result = axiom
+        for _ in range(iterations):
+            checkpoint()
+            result = "".join([rules.get(ch, ch) for ch in result])
+
+    if context is not None:
+        context.expanded_symbols += len(result)
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
+def symbol_counts(axiom: str, rules: Dict[str, str], iterations: int) -> List[Dict[str, int]]:
+    """Symbol counts after 0..iterations expansions, without building the strings"""
+    counts = {}
+    for ch in axiom:
+        counts[ch] = counts.get(ch, 0) + 1
+
+    history = [counts]
+    for _ in range(iterations):
+        expanded = {}
+        for ch, n in counts.items():
+            for out in rules.get(ch, ch):
+                expanded[out] = expanded.get(out, 0) + n
+        counts = expanded
+        history.append(counts)
+    return history
+
+
+def estimate_render_bytes(counts: Dict[str, int], symbol_bytes: Dict[str, int]) -> int:
+    """Peak bytes to expand to `counts` and draw it at `symbol_bytes` per symbol"""
+    expansion = EXPANSION_BYTES_PER_SYMBOL * sum(counts.values())
+    drawing = sum(counts.get(ch, 0) * cost for ch, cost in symbol_bytes.items())
+    return expansion + drawing
+
+
+def reserve_lsystem_memory(axiom: str, rules: Dict[str, str], iterations: int,
+                           symbol_bytes: Optional[Dict[str, int]] = None):
+    """
+    Charge the active render's memory budget for expanding and drawing an
+    L-System at `iterations`, before anything is allocated. On failure the
+    error suggests the largest level that would have fit.
+    """
+    context = current_context()
+    if context is None or context.memory_budget is None:
+        return
+
+    symbol_bytes = symbol_bytes or {}
+    history = symbol_counts(axiom, rules, iterations)
+    estimates = [estimate_render_bytes(counts, symbol_bytes) for counts in history]
+
+    def suggest_level(remaining: int) -> Optional[int]:
+        fitting = [level for level, estimate in enumerate(estimates) if estimate <= remaining]
+        return max(fitting) if fitting and max(fitting) > 0 else None
+
+    context.charge(estimates[iterations], suggest_level)
+
+
+def reserve_polyline_memory(points: int):
+    """Charge the active render's memory budget for a single SVG polyline path"""
+    charge_memory(points * POLYLINE_COMMAND_BYTES)
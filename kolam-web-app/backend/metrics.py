@@ -0,0 +1,188 @@
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+# Bucket layouts shared by the kolam metrics
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = tuple(4 ** i for i in range(3, 15))  # 64 .. ~268M
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    metric_type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in items]
+
+    def exposition(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} {self.metric_type}']
+        lines.extend(self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    metric_type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    metric_type = 'gauge'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(float(bound))}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f'{self.name}_bucket{labels} {count}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def exposition(self) -> str:
+        return '\n'.join(metric.exposition() for metric in self._metrics) + '\n'
+
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    'kolam_http_requests_total', 'HTTP requests handled', ('endpoint', 'method', 'status'))
+http_in_flight = registry.gauge(
+    'kolam_http_requests_in_flight', 'HTTP requests currently being handled', ('endpoint',))
+http_latency = registry.histogram(
+    'kolam_http_request_duration_seconds', 'HTTP request latency', ('endpoint',))
+
+render_latency = registry.histogram(
+    'kolam_render_duration_seconds', 'Total render time per design', ('design_type',))
+render_stage_latency = registry.histogram(
+    'kolam_render_stage_duration_seconds', 'Render time per design and stage',
+    ('design_type', 'stage'))
+expanded_symbols = registry.histogram(
+    'kolam_expanded_symbols', 'Length of the expanded L-System string per render',
+    ('design_type',), SIZE_BUCKETS)
+emitted_segments = registry.histogram(
+    'kolam_emitted_segments', 'Drawn segments (SVG elements and path commands) per render',
+    ('design_type',), SIZE_BUCKETS)
+svg_bytes = registry.histogram(
+    'kolam_svg_bytes', 'Serialized SVG size per render', ('design_type',), SIZE_BUCKETS)
+expansion_cache_lookups = registry.counter(
+    'kolam_expansion_cache_lookups_total',
+    'Expansion cache lookups by result; hit ratio = hit / (hit + miss)', ('design_type', 'result'))
+
+shed_requests = registry.counter(
+    'kolam_shed_requests_total', 'Render requests rejected by admission control', ('reason',))
+
+
+def observe_render(design_type: str, context, seconds: float, output_bytes: int):
+    """Record one finished render from its render context"""
+    render_latency.observe(seconds, design_type=design_type)
+
+    for name, stage_seconds in context.stage_breakdown(seconds).items():
+        render_stage_latency.observe(stage_seconds, design_type=design_type, stage=name)
+
+    expanded_symbols.observe(context.expanded_symbols, design_type=design_type)
+    emitted_segments.observe(context.segments, design_type=design_type)
+    svg_bytes.observe(output_bytes, design_type=design_type)
+    if context.cache_hits:
+        expansion_cache_lookups.inc(context.cache_hits, design_type=design_type, result='hit')
+    if context.cache_misses:
+        expansion_cache_lookups.inc(context.cache_misses, design_type=design_type, result='miss')
@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Hashable, Optional
+
+# Generators poll the active context once every this many symbols
+CHECKPOINT_INTERVAL = 1024
+
+
+class RenderCancelled(Exception):
+    """Raised inside a generator when its render has been superseded"""
+
+
+class MemoryBudgetExceeded(Exception):
+    """Raised before a render allocates more than its per-request memory budget"""
+
+    def __init__(self, estimated_bytes: int, budget_bytes: int,
+                 suggested_max_level: Optional[int] = None):
+        self.estimated_bytes = estimated_bytes
+        self.budget_bytes = budget_bytes
+        self.suggested_max_level = suggested_max_level
+        message = (f'Design needs about {estimated_bytes // 2**20} MB, over the '
+                   f'{budget_bytes // 2**20} MB per-request memory budget')
+        if suggested_max_level is not None:
+            message += f'; try a level of {suggested_max_level} or less'
+        super().__init__(message)
+
+
+class ExpansionCache:
+    """Small LRU cache of expanded L-System strings"""
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: str):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RenderContext:
+    """State for one render, visible to the generators through the current thread"""
+
+    def __init__(self, cancel_check: Optional[Callable[[], bool]] = None,
+                 expansion_cache: Optional[ExpansionCache] = None,
+                 memory_budget: Optional[int] = None):
+        self.cancel_check = cancel_check
+        self.expansion_cache = expansion_cache
+        self.memory_budget = memory_budget
+        self.charged_bytes = 0
+        
+        # Instrumentation filled in by the generators
+        self.stage_seconds = {}
+        self.expanded_symbols = 0
+        self.segments = 0
+        self.polyline_points = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def add_stage_time(self, name: str, seconds: float):
+        self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+
+    def charge(self, nbytes: int, suggest_level: Optional[Callable[[int], Optional[int]]] = None):
+        """
+        Account `nbytes` against the memory budget before allocating them.
+        `suggest_level` maps the remaining budget to the largest level that fits.
+        """
+        if self.memory_budget is not None and self.charged_bytes + nbytes > self.memory_budget:
+            remaining = self.memory_budget - self.charged_bytes
+            suggested = suggest_level(remaining) if suggest_level is not None else None
+            raise MemoryBudgetExceeded(self.charged_bytes + nbytes, self.memory_budget, suggested)
+        self.charged_bytes += nbytes
+
+    def stage_breakdown(self, total_seconds: float) -> dict:
+        """Per-stage seconds; whatever wasn't expansion or serialization was interpretation"""
+        stages = dict(self.stage_seconds)
+        stages['interpret'] = max(total_seconds - stages.get('expand', 0.0)
+                                  - stages.get('serialize', 0.0), 0.0)
+        return stages
+
+    def checkpoint(self):
+        """Abort the render if whoever started it no longer wants the result"""
+        if self.cancel_check is not None and self.cancel_check():
+            raise RenderCancelled()
+
+
+_local = threading.local()
+
+
+def current_context() -> Optional[RenderContext]:
+    """Return the render context active on this thread, if any"""
+    return getattr(_local, 'context', None)
+
+
+@contextmanager
+def render_context(context: RenderContext):
+    """Make `context` the active render context for the duration of the block"""
+    previous = getattr(_local, 'context', None)
+    _local.context = context
+    try:
+        yield context
+    finally:
+        _local.context = previous
+
+
+def checkpoint():
+    """Cancellation point for generator loops; a no-op outside a render context"""
+    context = getattr(_local, 'context', None)
+    if context is not None:
+        context.checkpoint()
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as a named render stage of the active context"""
+    context = getattr(_local, 'context', None)
+    if context is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        context.add_stage_time(name, time.perf_counter() - started)
+
+
+def record_segments(count: int):
+    """Count drawn segments that don't map to their own SVG element (path commands)"""
+    context = getattr(_local, 'context', None)
+    if context is not None:
+        context.segments += count
+
+
+def record_polyline_points(count: int):
+    """Count the points a coordinate polyline kept after simplification"""
+    context = getattr(_local, 'context', None)
+    if context is not None:
+        context.polyline_points += count
+
+
+def charge_memory(nbytes: int, suggest_level: Optional[Callable[[int], Optional[int]]] = None):
+    """Charge the active render's memory budget; a no-op outside a render context"""
+    context = getattr(_local, 'context', None)
+    if context is not None:
+        context.charge(nbytes, suggest_level)
+
+
+def serialize_drawing(dwg) -> str:
+    """Serialize an svgwrite drawing as the serialize stage of the active context"""
+    with stage('serialize'):
+        svg = dwg.tostring()
+    context = getattr(_local, 'context', None)
+    if context is not None:
+        # Every element except <defs> and the background rect is a drawn segment
+        context.segments += max(len(dwg.elements) - 2, 0)
+    return svg
+
+
+def expansion_key(axiom: str, rules: dict, iterations: int) -> Hashable:
+    """Cache key for an L-System expansion"""
+    return (axiom, tuple(sorted(rules.items())), iterations)
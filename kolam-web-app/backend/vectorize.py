@@ -0,0 +1,402 @@
+import io
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import svgwrite
+from PIL import Image
+
+from .coordinates import polyline_path_data, simplify_indices
+
+# Longest side of the image the strokes are traced at; photos are reduced
+# to this while decoding, which is most of what keeps a 12 MP photo fast
+DEFAULT_MAX_SIDE = 1600
+MAX_IMAGE_PIXELS = 50_000_000
+
+# A run of simplified segments becomes one circular arc when its traced
+# pixels all lie within the simplify tolerance of a circle. Arcs span at
+# least ARC_MIN_SEGMENTS segments and sweep at most ARC_MAX_SWEEP degrees,
+# so a closed loop is drawn as two arcs rather than one degenerate one.
+ARC_MIN_SEGMENTS = 2
+ARC_MAX_SWEEP = 300.0
+
+# Neighbour offsets P2..P9 of the Zhang-Suen thinning, clockwise from north,
+# as (row, column) steps
+_NEIGHBOURS = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+
+
+class VectorizeError(ValueError):
+    """Raised for uploads that can't be decoded or traced"""
+
+
+def _thinning_tables():
+    """Deletion lookup tables of the two Zhang-Suen sub-iterations, indexed by
+    the 8-neighbourhood packed as bits P2..P9"""
+    codes = np.arange(256)
+    bits = (codes[:, None] >> np.arange(8)) & 1
+    p2, p3, p4, p5, p6, p7, p8, p9 = bits.T
+    count = bits.sum(axis=1)
+    transitions = ((bits == 0) & (np.roll(bits, -1, axis=1) == 1)).sum(axis=1)
+    base = (count >= 2) & (count <= 6) & (transitions == 1)
+    first = base & (p2 * p4 * p6 == 0) & (p4 * p6 * p8 == 0)
+    second = base & (p2 * p4 * p8 == 0) & (p2 * p6 * p8 == 0)
+    return first, second
+
+
+_THIN_FIRST, _THIN_SECOND = _thinning_tables()
+
+
+def load_grayscale(payload: bytes, max_side: int = DEFAULT_MAX_SIDE):
+    """Decode an image reduced to at most `max_side` pixels on its longest side.
+    Returns the grayscale array and the original (width, height)."""
+    try:
+        image = Image.open(io.BytesIO(payload))
+    except (OSError, Image.DecompressionBombError) as e:
+        raise VectorizeError(f'Unreadable image: {e}')
+
+    original_size = image.size
+    if original_size[0] * original_size[1] > MAX_IMAGE_PIXELS:
+        raise VectorizeError(f'Images over {MAX_IMAGE_PIXELS // 1_000_000} MP are not supported')
+
+    # JPEG can decode straight to a reduced size via DCT scaling
+    image.draft('L', (max_side, max_side))
+    image = image.convert('L')
+    if max(image.size) > max_side:
+        scale = max_side / max(image.size)
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                             Image.BOX)
+    return np.asarray(image), original_size
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Threshold that best separates the two brightness classes of `gray`"""
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    if np.count_nonzero(histogram) < 2:
+        raise VectorizeError('The image is a single shade, so it has no strokes to trace')
+    levels = np.arange(256)
+    weight = np.cumsum(histogram)
+    mean = np.cumsum(histogram * levels)
+    total_weight, total_mean = weight[-1], mean[-1]
+    background = weight
+    foreground = total_weight - weight
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (total_mean * background - mean * total_weight) ** 2 / (background * foreground)
+    return int(np.nanargmax(between[:-1]))
+
+
+def binarize(gray: np.ndarray, threshold: Optional[int] = None, invert: Optional[bool] = None) -> np.ndarray:
+    """
+    Foreground mask of the strokes. Without a threshold Otsu's method picks
+    one; without `invert` the smaller class is taken as the strokes, which
+    covers both chalk on a dark floor and ink on paper.
+    """
+    if threshold is None:
+        threshold = otsu_threshold(gray)
+    mask = gray > threshold
+    if invert is None:
+        invert = mask.mean() > 0.5
+    return ~mask if invert else mask
+
+
+def skeletonize(mask: np.ndarray) -> np.ndarray:
+    """
+    Zhang-Suen thinning to one-pixel-wide strokes. Each pass looks only at the
+    remaining foreground pixels, packs their neighbourhoods into a byte and
+    decides deletions with a lookup table.
+    """
+    height, width = mask.shape
+    stride = width + 2
+    padded = np.zeros((height + 2) * stride, dtype=np.uint8)
+    padded.reshape(height + 2, stride)[1:-1, 1:-1] = mask
+    offsets = np.array([dy * stride + dx for dy, dx in _NEIGHBOURS])
+    weights = (1 << np.arange(8)).astype(np.uint8)
+
+    pixels = np.flatnonzero(padded)
+    changed = True
+    while changed:
+        changed = False
+        for table in (_THIN_FIRST, _THIN_SECOND):
+            codes = padded[pixels[:, None] + offsets] @ weights if len(pixels) else np.empty(0, np.uint8)
+            delete = table[codes]
+            if delete.any():
+                padded[pixels[delete]] = 0
+                pixels = pixels[~delete]
+                changed = True
+    return padded.reshape(height + 2, stride)[1:-1, 1:-1].astype(bool)
+
+
+def trace_strokes(skeleton: np.ndarray) -> List[Dict]:
+    """
+    Split a skeleton into strokes between endpoints and junctions, plus closed
+    loops. Diagonal links are ignored where an orthogonal path already joins
+    the two pixels, so staircases don't read as junctions.
+
+    Returns dicts with `points` as (N, 2) arrays of (column, row) and
+    `closed`, `start_degree` and `end_degree`.
+    """
+    height, width = skeleton.shape
+    stride = width + 2
+    padded = np.zeros((height + 2) * stride, dtype=bool)
+    padded.reshape(height + 2, stride)[1:-1, 1:-1] = skeleton
+    pixels = np.flatnonzero(padded)
+    if not len(pixels):
+        return []
+
+    node = np.full(padded.shape, -1, dtype=np.int64)
+    node[pixels] = np.arange(len(pixels))
+
+    links = []
+    for dy, dx in _NEIGHBOURS:
+        other = node[pixels + dy * stride + dx]
+        if dy and dx:
+            # Skip the diagonal when either orthogonal corner pixel is set
+            shortcut = padded[pixels + dy * stride] | padded[pixels + dx]
+            other = np.where(shortcut, -1, other)
+        links.append(other)
+    links = np.stack(links, axis=1)
+    degree = (links >= 0).sum(axis=1)
+
+    neighbours = [row[row >= 0].tolist() for row in links]
+    degree_list = degree.tolist()
+    visited = np.zeros(len(pixels), dtype=bool)
+    strokes = []
+
+    def walk(start, step):
+        path = [start, step]
+        previous, current = start, step
+        while degree_list[current] == 2 and not visited[current]:
+            visited[current] = True
+            following = neighbours[current]
+            nxt = following[0] if following[0] != previous else following[1]
+            previous, current = current, nxt
+            path.append(current)
+            if current == start:
+                break
+        return path
+
+    # Strokes leaving endpoints and junctions
+    seen_links = set()
+    for start in np.flatnonzero(degree != 2).tolist():
+        visited[start] = True
+        for step in neighbours[start]:
+            if degree_list[step] != 2:
+                key = (min(start, step), max(start, step))
+                if key in seen_links:
+                    continue
+                seen_links.add(key)
+                strokes.append(([start, step], False))
+            elif not visited[step]:
+                path = walk(start, step)
+                strokes.append((path, False))
+
+    # What remains are closed loops of degree-2 pixels
+    for start in np.flatnonzero(~visited).tolist():
+        if visited[start]:
+            continue
+        visited[start] = True
+        path = walk(start, neighbours[start][0])
+        strokes.append((path, True))
+
+    rows, columns = np.divmod(pixels, stride)
+    result = []
+    for path, closed in strokes:
+        path = np.array(path)
+        result.append({
+            'points': np.column_stack([columns[path] - 1, rows[path] - 1]).astype(np.float64),
+            'closed': closed,
+            'start_degree': degree_list[path[0]],
+            'end_degree': degree_list[path[-1]]
+        })
+    return result
+
+
+def _fit_arc(run: np.ndarray, tolerance: float) -> Optional[Tuple[np.ndarray, float, float]]:
+    """
+    Centre, radius and sweep in degrees of the circular arc from the first
+    to the last point of `run` that best fits the points between, or None
+    when they aren't an arc within `tolerance`: off the circle, turning back,
+    sweeping too far, or close enough to their chord that a line does.
+    """
+    chord = run[-1] - run[0]
+    length = float(np.hypot(*chord))
+    if not length:
+        return None
+    normal = np.array([-chord[1], chord[0]]) / length
+    offsets = run - (run[0] + run[-1]) / 2
+    across = offsets @ normal
+    if np.abs(across).max() <= tolerance:
+        return None
+    # The centre lies on the chord's bisector, at `t` along its normal; the
+    # algebraic circle residual |p - centre|^2 - radius^2 is linear in t
+    t = float(((offsets * offsets).sum(axis=1) - length * length / 4) @ across / (2 * across @ across))
+    centre = (run[0] + run[-1]) / 2 + t * normal
+    radius = float(np.hypot(length / 2, t))
+    offsets = run - centre
+    if np.abs(np.hypot(offsets[:, 0], offsets[:, 1]) - radius).max() > tolerance:
+        return None
+    angles = np.arctan2(offsets[:, 1], offsets[:, 0])
+    steps = (np.diff(angles) + np.pi) % (2 * np.pi) - np.pi
+    sweep = float(steps.sum())
+    # Pixel staircases may step back by up to the tolerance along the circle
+    if (steps * np.sign(sweep)).min() < -tolerance / radius or abs(np.degrees(sweep)) > ARC_MAX_SWEEP:
+        return None
+    return centre, radius, float(np.degrees(sweep))
+
+
+def fit_arcs(points: np.ndarray, vertices: np.ndarray, tolerance: float) -> Tuple[np.ndarray, List[Dict]]:
+    """
+    Replace runs of the simplified polyline through points[vertices] by
+    circular arcs where the traced pixels between them fit one. Greedy: from
+    each vertex the run is extended while it still fits. Returns the
+    remaining vertices and the arcs, each with the index of the segment it
+    replaces (from vertex `segment` to the next), centre, radius and sweep.
+    """
+    if tolerance <= 0 or len(vertices) <= ARC_MIN_SEGMENTS:
+        return points[vertices], []
+    kept, arcs = [vertices[0]], []
+    i, last = 0, len(vertices) - 1
+    while i < last:
+        best, j = None, i + ARC_MIN_SEGMENTS
+        while j <= last:
+            arc = _fit_arc(points[vertices[i]:vertices[j] + 1], tolerance)
+            if arc is None:
+                break
+            best, j = (j, arc), j + 1
+        if best is None:
+            i += 1
+        else:
+            i, (centre, radius, sweep) = best
+            arcs.append({'segment': len(kept) - 1, 'center': centre, 'radius': radius, 'sweep': sweep})
+        kept.append(vertices[i])
+    return points[kept], arcs
+
+
+def _stroke_length(points: np.ndarray) -> float:
+    return float(np.hypot(*np.diff(points, axis=0).T).sum()) if len(points) > 1 else 0.0
+
+
+def vectorize_image(payload: bytes, max_side: int = DEFAULT_MAX_SIDE, threshold: Optional[int] = None,
+                    invert: Optional[bool] = None, simplify: float = 1.0, min_length: float = 8.0) -> Dict:
+    """
+    Trace a kolam photo or scan into ordered, simplified strokes in the
+    coordinates of the original image. `simplify` and `min_length` are in
+    pixels of the reduced working image; spurs and specks shorter than
+    `min_length` are dropped, links between junctions are kept.
+    """
+    timings = {}
+    started = time.perf_counter()
+    gray, (width, height) = load_grayscale(payload, max_side)
+    timings['decode'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    mask = binarize(gray, threshold, invert)
+    timings['binarize'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    skeleton = skeletonize(mask)
+    timings['skeletonize'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    traced = trace_strokes(skeleton)
+    timings['trace'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scale = width / gray.shape[1]
+    strokes = []
+    for stroke in traced:
+        points = stroke['points']
+        bridges_junctions = stroke['start_degree'] > 2 and stroke['end_degree'] > 2
+        if not bridges_junctions and _stroke_length(points) < min_length:
+            continue
+        # A loop is simplified as an open path that starts and ends at the same pixel
+        points, arcs = fit_arcs(points, simplify_indices(points, simplify), simplify)
+        if stroke['closed'] and not (arcs and arcs[-1]['segment'] == len(points) - 2):
+            # The closing Z draws the last segment, unless it is an arc
+            points = points[:-1]
+        for arc in arcs:
+            arc['center'] = (arc['center'] + 0.5) * scale
+            arc['radius'] *= scale
+        strokes.append({'points': (points + 0.5) * scale, 'arcs': arcs, 'closed': stroke['closed']})
+    timings['simplify'] = time.perf_counter() - started
+
+    # Mean stroke thickness: inked area over skeleton length
+    skeleton_pixels = int(skeleton.sum())
+    thickness = float(mask.sum()) / skeleton_pixels * scale if skeleton_pixels else scale
+
+    return {
+        'width': width,
+        'height': height,
+        'stroke_width': round(thickness, 2),
+        'strokes': strokes,
+        'stats': {
+            'working_size': [gray.shape[1], gray.shape[0]],
+            'skeleton_pixels': skeleton_pixels,
+            'strokes': len(strokes),
+            'points': sum(len(stroke['points']) for stroke in strokes),
+            'arcs': sum(len(stroke['arcs']) for stroke in strokes)
+        },
+        'timings': timings
+    }
+
+
+def stroke_path_data(stroke: Dict) -> str:
+    """SVG path data of a traced stroke: its lines as L and its arcs as A commands"""
+    if not stroke['arcs']:
+        return polyline_path_data(stroke['points'], close=stroke['closed'])
+    arcs = {arc['segment']: arc for arc in stroke['arcs']}
+    ends = np.rint(stroke['points']).astype(np.int64).tolist()
+    commands = ['M %d %d' % tuple(ends[0])]
+    for segment, (x, y) in enumerate(ends[1:]):
+        arc = arcs.get(segment)
+        if arc is None:
+            commands.append('L %d %d' % (x, y))
+            continue
+        # Renderers place the centre from the endpoints and the radius, which
+        # near half a turn moves far for a small change in either; the radius
+        # is taken from the rounded endpoints to keep it on the fitted centre
+        radius = np.hypot(*(np.array([ends[segment], (x, y)]) - arc['center']).T).mean()
+        # Flags: the long way round past 180 degrees, and clockwise on screen
+        # (increasing angle with y pointing down) for a positive sweep
+        commands.append('A %.2f %.2f 0 %d %d %d %d' % (radius, radius, abs(arc['sweep']) > 180,
+                                                       arc['sweep'] > 0, x, y))
+    if stroke['closed']:
+        commands.append('Z')
+    return ' '.join(commands)
+
+
+def strokes_to_svg(result: Dict, stroke_color: str = 'black', background: str = 'white') -> str:
+    """SVG of traced strokes at the size of the original image"""
+    dwg = svgwrite.Drawing(size=(result['width'], result['height']), debug=False)
+    dwg.viewbox(0, 0, result['width'], result['height'])
+    dwg.add(dwg.rect(insert=(0, 0), size=('100%', '100%'), fill=background))
+    group = dwg.add(dwg.g(fill='none', stroke=stroke_color, stroke_width=result['stroke_width'],
+                          stroke_linecap='round', stroke_linejoin='round'))
+    for stroke in result['strokes']:
+        if len(stroke['points']):
+            group.add(dwg.path(d=stroke_path_data(stroke)))
+    return dwg.tostring()
+
+
+def strokes_to_geometry(result: Dict, decimals: int = 1) -> Dict:
+    """JSON-friendly strokes: point lists rounded to `decimals`. Segment `segment`
+    of a stroke, from points[segment] to the next point, is an arc when listed
+    in its `arcs`; sweeps are in degrees, positive clockwise on screen."""
+    return {
+        'width': result['width'],
+        'height': result['height'],
+        'stroke_width': result['stroke_width'],
+        'strokes': [{'points': np.round(stroke['points'], decimals).tolist(),
+                     'arcs': [{'segment': arc['segment'], 'center': np.round(arc['center'], decimals).tolist(),
+                               'radius': round(arc['radius'], decimals), 'sweep': round(arc['sweep'], decimals)}
+                              for arc in stroke['arcs']],
+                     'closed': stroke['closed']}
+                    for stroke in result['strokes']]
+    }
+
+
+def predict_bytes(width: int, height: int, max_side: int = DEFAULT_MAX_SIDE) -> int:
+    """Rough peak memory to vectorize a `width` x `height` image"""
+    scale = min(1.0, max_side / max(width, height, 1))
+    working = width * height * scale * scale
+    # Decoded image before reduction, then padded masks, index arrays and lookups
+    return int(width * height + working * 40)
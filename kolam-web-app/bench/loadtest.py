@@ -0,0 +1,346 @@
+"""
+Load-test harness for the Kolam web app.
+
+Starts app.py locally (or targets --url), replays a weighted mix of
+generate-kolam, validate-parameters and design-types calls from a pool of
+closed-loop virtual users, and reports throughput, latency percentiles,
+error rate and server RSS over time, summed over the server process and
+its children. Results are saved as JSON so runs can be compared across
+versions with --compare.
+
+    python bench/loadtest.py --users 16 --duration 60 --label baseline
+    python bench/loadtest.py --users 16 --duration 60 --compare bench/results/baseline.json
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(APP_DIR, 'bench', 'results')
+
+# Level ranges per design: small levels dominate real traffic, big ones are rare
+DESIGN_LEVELS = {
+    'suzhi': [2, 3, 4, 5],
+    'fourcolor': [2, 3, 4, 5],
+    'island': [2, 3, 4],
+    'sikku': [3, 5, 7],
+    'special': [3, 5, 7],
+    'group': [2, 4, 6],
+    'traditional': [2, 4, 6],
+    'single_knot': [2, 3, 4, 5],
+    'polygon_inscribed': [2, 3, 4],
+    'circle_inscribed': [2, 3, 4],
+    'combined': [2, 3, 4],
+    'kambi': [2, 3, 4],
+    'rhombus': [2, 3, 4, 5],
+    'custom': [8, 64, 512],
+}
+LEVEL_WEIGHTS = [8, 4, 2, 1]
+
+DEFAULT_MIX = {
+    'generate-kolam': 0.6,
+    'validate-parameters': 0.3,
+    'design-types': 0.1,
+}
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _children(pid):
+    """PIDs of the direct children of `pid`, from every thread's children list"""
+    children = []
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def _read_rss_kb(pid):
+    """RSS of `pid` and all its descendants, such as a pre-forking server's workers"""
+    total, found, pending = 0, False, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+                        found = True
+                        break
+        except OSError:
+            continue
+        pending.extend(_children(current))
+    return total if found else None
+
+
+def random_design(rng, design_types=None):
+    """Random design parameters drawn from the weighted level ranges"""
+    design_type = rng.choice(design_types or list(DESIGN_LEVELS))
+    levels = DESIGN_LEVELS[design_type]
+    level = rng.choices(levels, weights=LEVEL_WEIGHTS[:len(levels)])[0]
+
+    data = {
+        'design_type': design_type,
+        'dot_size': rng.choice([5, 10, 20]),
+        'width': rng.choice([400, 800, 1200]),
+        'height': rng.choice([300, 600, 900]),
+    }
+    if design_type in ('kambi', 'rhombus'):
+        data['rhombus_size'] = level
+    elif design_type == 'custom':
+        data['coordinates'] = [{'x': rng.randint(0, data['width']), 'y': rng.randint(0, data['height'])}
+                               for _ in range(level)]
+    else:
+        data['iterations'] = level
+    if design_type == 'group':
+        data['polygon_sides'] = rng.randint(3, 12)
+    if design_type == 'traditional':
+        data['grid_size'] = rng.randint(3, 15)
+        data['pattern_type'] = rng.choice(['lotus', 'peacock', 'flower', 'geometric'])
+    return data
+
+
+class LoadTest:
+    def __init__(self, base_url, users, duration, mix, think_time, seed, design_types=None,
+                 server_pid=None, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.users = users
+        self.duration = duration
+        self.mix = mix
+        self.think_time = think_time
+        self.seed = seed
+        self.design_types = design_types
+        self.server_pid = server_pid
+        self.timeout = timeout
+
+        self.samples = []  # (endpoint, design_type, started offset, seconds, status)
+        self.rss = []  # (offset, kb)
+        self._lock = threading.Lock()
+
+    def _request(self, endpoint, body=None):
+        url = f'{self.base_url}/api/{endpoint}'
+        if body is None:
+            req = urllib.request.Request(url)
+        else:
+            req = urllib.request.Request(url, data=json.dumps(body).encode(), method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+        except (urllib.error.URLError, OSError):
+            return 0
+
+    def _user(self, index, start, stop):
+        rng = random.Random(self.seed * 1000 + index)
+        endpoints = list(self.mix)
+        weights = [self.mix[name] for name in endpoints]
+        while time.monotonic() < stop:
+            endpoint = rng.choices(endpoints, weights=weights)[0]
+            design_type = None
+            if endpoint == 'design-types':
+                body = None
+            else:
+                body = random_design(rng, self.design_types)
+                design_type = body['design_type']
+
+            began = time.monotonic()
+            status = self._request(endpoint, body)
+            elapsed = time.monotonic() - began
+            with self._lock:
+                self.samples.append((endpoint, design_type, began - start, elapsed, status))
+
+            if self.think_time:
+                time.sleep(rng.expovariate(1 / self.think_time))
+
+    def _sample_rss(self, start, stop):
+        while time.monotonic() < stop:
+            kb = _read_rss_kb(self.server_pid)
+            if kb is not None:
+                self.rss.append((round(time.monotonic() - start, 2), kb))
+            time.sleep(0.5)
+
+    def run(self):
+        start = time.monotonic()
+        stop = start + self.duration
+        threads = [threading.Thread(target=self._user, args=(i, start, stop), daemon=True)
+                   for i in range(self.users)]
+        if self.server_pid:
+            threads.append(threading.Thread(target=self._sample_rss, args=(start, stop), daemon=True))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.report(time.monotonic() - start)
+
+    def report(self, wall_seconds):
+        def summarize(rows):
+            latencies = sorted(row[3] for row in rows)
+            errors = sum(1 for row in rows if not 200 <= row[4] < 300)
+            return {
+                'requests': len(rows),
+                'throughput_rps': round(len(rows) / wall_seconds, 2),
+                'error_rate': round(errors / len(rows), 4) if rows else 0.0,
+                'p50_ms': _ms(_percentile(latencies, 0.50)),
+                'p95_ms': _ms(_percentile(latencies, 0.95)),
+                'p99_ms': _ms(_percentile(latencies, 0.99)),
+                'max_ms': _ms(latencies[-1] if latencies else None),
+            }
+
+        by_endpoint = defaultdict(list)
+        by_design = defaultdict(list)
+        statuses = defaultdict(int)
+        for row in self.samples:
+            by_endpoint[row[0]].append(row)
+            if row[0] == 'generate-kolam':
+                by_design[row[1]].append(row)
+            statuses[str(row[4])] += 1
+
+        return {
+            'config': {
+                'base_url': self.base_url,
+                'users': self.users,
+                'duration': self.duration,
+                'mix': self.mix,
+                'think_time': self.think_time,
+                'seed': self.seed,
+            },
+            'wall_seconds': round(wall_seconds, 2),
+            'overall': summarize(self.samples),
+            'endpoints': {name: summarize(rows) for name, rows in sorted(by_endpoint.items())},
+            'generate_by_design': {name: summarize(rows) for name, rows in sorted(by_design.items())},
+            'status_codes': dict(statuses),
+            'rss_kb': self.rss,
+            'peak_rss_mb': round(max((kb for _, kb in self.rss), default=0) / 1024, 1),
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def start_server(port):
+    """Start app.py's Flask app without the reloader; returns the process once it answers"""
+    code = f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=APP_DIR,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('app.py exited during startup')
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/design-types', timeout=1).read()
+            return process
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('app.py did not start within 30s')
+
+
+def print_report(result, baseline=None):
+    def line(name, stats, base=None):
+        text = (f"{name:<22} {stats['requests']:>7} {stats['throughput_rps']:>8} "
+                f"{stats['error_rate'] * 100:>6.2f}% {stats['p50_ms']!s:>9} {stats['p95_ms']!s:>9} "
+                f"{stats['p99_ms']!s:>9}")
+        if base and base.get('p99_ms') and stats.get('p99_ms'):
+            text += f"   p99 {100 * (stats['p99_ms'] / base['p99_ms'] - 1):+.1f}%"
+            text += f"  rps {100 * (stats['throughput_rps'] / base['throughput_rps'] - 1):+.1f}%"
+        print(text)
+
+    print(f"{'':<22} {'reqs':>7} {'rps':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    line('overall', result['overall'], baseline and baseline['overall'])
+    for name, stats in result['endpoints'].items():
+        line(name, stats, baseline and baseline['endpoints'].get(name))
+    print('generate-kolam by design:')
+    for name, stats in result['generate_by_design'].items():
+        line('  ' + name, stats, baseline and baseline['generate_by_design'].get(name))
+    print(f"status codes: {result['status_codes']}   "
+          f"peak server RSS (with child processes): {result['peak_rss_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the Kolam web app')
+    parser.add_argument('--url', help='Target an already running server instead of starting app.py')
+    parser.add_argument('--pid', type=int,
+                        help='Server PID to sample RSS from when using --url; its child processes are included')
+    parser.add_argument('--users', type=int, default=8, help='Concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help='Mean pause between a user\'s requests, in seconds')
+    parser.add_argument('--mix', help='JSON object of endpoint weights, e.g. \'{"generate-kolam": 1}\'')
+    parser.add_argument('--designs', help='Comma-separated design types to draw from')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--label', help='Name of the saved result file')
+    parser.add_argument('--compare', help='Earlier result JSON to compare against')
+    args = parser.parse_args()
+
+    mix = json.loads(args.mix) if args.mix else DEFAULT_MIX
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        parser.error(f'unknown endpoints in --mix: {", ".join(sorted(unknown))}')
+    design_types = args.designs.split(',') if args.designs else None
+    if design_types:
+        unknown = set(design_types) - set(DESIGN_LEVELS)
+        if unknown:
+            parser.error(f'unknown design types in --designs: {", ".join(sorted(unknown))} '
+                         f'(choose from {", ".join(DESIGN_LEVELS)})')
+
+    process = None
+    if args.url:
+        base_url, server_pid = args.url, args.pid
+    else:
+        port = _free_port()
+        process = start_server(port)
+        base_url, server_pid = f'http://127.0.0.1:{port}', process.pid
+
+    try:
+        test = LoadTest(base_url, args.users, args.duration, mix, args.think_time, args.seed,
+                        design_types, server_pid)
+        result = test.run()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    result['label'] = args.label or time.strftime('%Y%m%d-%H%M%S')
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{result['label']}.json")
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    print(f'saved {path}')
+
+
+if __name__ == '__main__':
+    main()
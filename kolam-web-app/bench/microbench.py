@@ -0,0 +1,264 @@
+"""
+Microbenchmarks for every generate_*_svg method of KolamGenerator and
+AuthenticKolamGenerator.
+
+Each case is timed over several runs (median and best) and profiled once
+under tracemalloc for peak memory, and records the expanded string length,
+emitted segments and output bytes from the render context. Cases whose
+predicted memory exceeds --max-mb are skipped rather than run.
+
+Results are compared against bench/baselines/microbench.json; a case whose
+median time or peak memory grew by more than --threshold is flagged and the
+run exits non-zero. --save-baseline merges this run into the baseline instead:
+cases it ran are overwritten, the others are kept.
+
+    python bench/microbench.py --quick
+    python bench/microbench.py --designs suzhi,kambi --levels 1-6 --save-baseline
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from backend.authentic_kolam_generator import AuthenticKolamGenerator  # noqa: E402
+from backend.kolam_generator import KolamGenerator  # noqa: E402
+from backend.lsystem import ELEMENT_BYTES, POLYLINE_COMMAND_BYTES  # noqa: E402
+from backend.render_context import RenderContext, render_context  # noqa: E402
+
+BASELINE_PATH = os.path.join(APP_DIR, 'bench', 'baselines', 'microbench.json')
+RESULTS_DIR = os.path.join(APP_DIR, 'bench', 'results')
+
+kolam_gen = KolamGenerator()
+auth_kolam_gen = AuthenticKolamGenerator()
+
+
+def _points(level):
+    """Coordinate count standing in for the level of the coordinate designs"""
+    return 2 ** (level + 4)
+
+
+def _coordinates(level, width, height):
+    rng = random.Random(level)
+    return [(rng.randint(0, width), rng.randint(0, height)) for _ in range(_points(level))]
+
+
+# name -> (method, keyword carrying the level, extra keywords)
+DESIGNS = {
+    'suzhi': (kolam_gen.generate_suzhi_kolam_svg, 'iterations', {}),
+    'kambi': (kolam_gen.generate_kambi_kolam_svg, 'rhombus_size', {}),
+    'fourcolor': (kolam_gen.generate_fourcolor_kolam_svg, 'iterations', {}),
+    'island': (kolam_gen.generate_island_kolam_svg, 'iterations', {}),
+    'sikku': (kolam_gen.generate_sikku_kolam_svg, 'iterations', {}),
+    'special': (kolam_gen.generate_special_kolam_svg, 'iterations', {}),
+    'group': (kolam_gen.generate_group_kolam_svg, 'iterations', {'polygon_sides': 6}),
+    'traditional': (kolam_gen.generate_traditional_rangoli_svg, 'iterations',
+                    {'grid_size': 7, 'pattern_type': 'lotus'}),
+    'custom': (kolam_gen.generate_custom_kolam_svg, None, {}),
+    'single_knot': (auth_kolam_gen.generate_single_knot_kolam_svg, 'iterations', {}),
+    'rhombus': (auth_kolam_gen.generate_rhombus_kolam_svg, 'rhombus_size', {}),
+    'polygon_inscribed': (auth_kolam_gen.generate_polygon_inscribed_kolam_svg, 'iterations',
+                          {'polygon_vertices': 6, 'polygon_size': 100}),
+    'circle_inscribed': (auth_kolam_gen.generate_circle_inscribed_kolam_svg, 'iterations',
+                         {'circle_radius': 100}),
+    'combined': (auth_kolam_gen.generate_suzhi_sikku_kambi_combined_svg, 'iterations', {}),
+    'coordinate_based': (auth_kolam_gen.generate_coordinate_based_kolam_svg, None, {}),
+}
+
+DOT_SIZES = (5, 20)
+CANVASES = ((400, 300), (1200, 900))
+QUICK_LEVELS = (1, 3, 5)
+
+
+def predicted_bytes(design, level):
+    if design == 'custom':
+        return _points(level) * POLYLINE_COMMAND_BYTES
+    if design == 'coordinate_based':
+        # One svgwrite line element, validated, per point
+        return _points(level) * ELEMENT_BYTES
+    if design in kolam_gen.kolam_systems:
+        return kolam_gen.estimate_render_bytes(design, level)
+    return auth_kolam_gen.estimate_render_bytes(design, level)
+
+
+def case_key(design, level, dot_size, width, height):
+    return f'{design}/L{level}/dot{dot_size}/{width}x{height}'
+
+
+def _call(design, level, dot_size, width, height):
+    method, level_keyword, extra = DESIGNS[design]
+    kwargs = dict(extra, width=width, height=height)
+    if level_keyword is None:
+        kwargs['coordinates'] = _coordinates(level, width, height)
+    else:
+        kwargs[level_keyword] = level
+        kwargs['dot_size'] = dot_size
+
+    # A fresh context per run: no expansion cache, so every run expands
+    context = RenderContext()
+    with render_context(context):
+        svg = method(**kwargs)
+    return svg, context
+
+
+def run_case(design, level, dot_size, width, height, repeat, max_case_seconds):
+    gc.collect()
+    svg, context = _call(design, level, dot_size, width, height)  # warm-up, also yields counts
+    result = {
+        'design': design,
+        'level': level,
+        'dot_size': dot_size,
+        'width': width,
+        'height': height,
+        'expanded_symbols': context.expanded_symbols,
+        'segments': context.segments,
+        'output_bytes': len(svg),
+    }
+    del svg
+
+    times = []
+    deadline = time.perf_counter() + max_case_seconds
+    while len(times) < repeat and (not times or time.perf_counter() < deadline):
+        gc.collect()
+        started = time.perf_counter()
+        _call(design, level, dot_size, width, height)
+        times.append(time.perf_counter() - started)
+    result['runs'] = len(times)
+    result['median_ms'] = round(statistics.median(times) * 1000, 3)
+    result['best_ms'] = round(min(times) * 1000, 3)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        _call(design, level, dot_size, width, height)
+        result['peak_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+    return result
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Cases whose median time or peak memory regressed past `threshold`"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous or 'median_ms' not in current or 'median_ms' not in previous:
+            continue
+        slower = current['median_ms'] / previous['median_ms'] - 1 if previous['median_ms'] else 0
+        if slower > threshold and current['median_ms'] - previous['median_ms'] > min_delta_ms:
+            regressions.append((key, 'time', previous['median_ms'], current['median_ms'], slower))
+        bigger = current['peak_kb'] / previous['peak_kb'] - 1 if previous['peak_kb'] else 0
+        if bigger > threshold:
+            regressions.append((key, 'memory', previous['peak_kb'], current['peak_kb'], bigger))
+    return regressions
+
+
+def _parse_levels(text):
+    if '-' in text:
+        low, high = text.split('-')
+        return list(range(int(low), int(high) + 1))
+    return [int(level) for level in text.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the kolam generators')
+    parser.add_argument('--designs', help='Comma-separated designs (default: all)')
+    parser.add_argument('--levels', default='1-10', help='Level range or list, e.g. 1-10 or 2,4,6')
+    parser.add_argument('--quick', action='store_true',
+                        help=f'Levels {QUICK_LEVELS}, one dot size and one canvas')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case')
+    parser.add_argument('--max-case-seconds', type=float, default=10.0,
+                        help='Stop repeating a case after this long')
+    parser.add_argument('--max-mb', type=float, default=512,
+                        help='Skip cases predicted to need more memory than this')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative growth in time or memory flagged as a regression')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='Ignore time regressions smaller than this')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Merge this run into the baseline instead of comparing')
+    parser.add_argument('--label', help='Name of the saved result file')
+    args = parser.parse_args()
+
+    designs = args.designs.split(',') if args.designs else list(DESIGNS)
+    unknown = set(designs) - set(DESIGNS)
+    if unknown:
+        parser.error(f'unknown designs: {", ".join(sorted(unknown))}')
+    levels = list(QUICK_LEVELS) if args.quick else _parse_levels(args.levels)
+    dot_sizes = DOT_SIZES[:1] if args.quick else DOT_SIZES
+    canvases = CANVASES[:1] if args.quick else CANVASES
+
+    results, skipped = {}, []
+    for design in designs:
+        for level in levels:
+            estimate = predicted_bytes(design, level)
+            for dot_size in dot_sizes:
+                for width, height in canvases:
+                    key = case_key(design, level, dot_size, width, height)
+                    if estimate > args.max_mb * 2**20:
+                        skipped.append(key)
+                        continue
+                    try:
+                        result = run_case(design, level, dot_size, width, height,
+                                          args.repeat, args.max_case_seconds)
+                    except Exception as e:
+                        result = {'design': design, 'level': level, 'error': str(e)}
+                    results[key] = result
+                    if 'error' in result:
+                        print(f'{key:<44} error: {result["error"]}')
+                    else:
+                        print(f'{key:<44} {result["median_ms"]:>10.2f} ms {result["peak_kb"]:>9} KB '
+                              f'{result["expanded_symbols"]:>9} sym {result["segments"]:>8} seg '
+                              f'{result["output_bytes"]:>10} B')
+
+    if skipped:
+        print(f'skipped {len(skipped)} cases predicted over {args.max_mb:g} MB')
+
+    run = {
+        'label': args.label or time.strftime('%Y%m%d-%H%M%S'),
+        'python': sys.version.split()[0],
+        'cases': results,
+        'skipped': skipped,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f'microbench-{run["label"]}.json')
+    with open(path, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f'saved {path}')
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['cases']
+
+    if args.save_baseline:
+        baseline.update({key: result for key, result in results.items() if 'error' not in result})
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({'python': run['python'], 'cases': baseline}, f, indent=2, sort_keys=True)
+        print(f'baseline updated: {args.baseline}')
+        return
+
+    if not baseline:
+        print('no baseline to compare against; run with --save-baseline first')
+        return
+
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    for key, kind, before, after, growth in regressions:
+        unit = 'ms' if kind == 'time' else 'KB'
+        print(f'REGRESSION {key} {kind}: {before} -> {after} {unit} (+{growth * 100:.1f}%)')
+    if regressions:
+        sys.exit(1)
+    print(f'no regressions over {args.threshold * 100:g}% against {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,89 @@
+class RenderCache {
+    // Recent full-fidelity renders in IndexedDB, keyed by their request parameters
+    constructor(maxEntries = 50) {
+        this.maxEntries = maxEntries;
+        this.dbPromise = this.open();
+    }
+
+    open() {
+        return new Promise((resolve) => {
+            if (!window.indexedDB) {
+                resolve(null);
+                return;
+            }
+            const request = indexedDB.open('kolam-renders', 1);
+            request.onupgradeneeded = () => {
+                const store = request.result.createObjectStore('renders', { keyPath: 'key' });
+                store.createIndex('storedAt', 'storedAt');
+            };
+            request.onsuccess = () => resolve(request.result);
+            // Private browsing or blocked storage: run without a cache
+            request.onerror = () => resolve(null);
+        });
+    }
+
+    static keyFor(data) {
+        return JSON.stringify(Object.keys(data).sort().map(name => [name, data[name]]));
+    }
+
+    async get(data) {
+        const db = await this.dbPromise;
+        if (!db) {
+            return null;
+        }
+        return new Promise((resolve) => {
+            const request = db.transaction('renders').objectStore('renders').get(RenderCache.keyFor(data));
+            request.onsuccess = () => resolve(request.result || null);
+            request.onerror = () => resolve(null);
+        });
+    }
+
+    async put(data, result) {
+        const db = await this.dbPromise;
+        if (!db) {
+            return;
+        }
+        const transaction = db.transaction('renders', 'readwrite');
+        const store = transaction.objectStore('renders');
+        store.put({
+            key: RenderCache.keyFor(data),
+            svg: result.svg,
+            parameters: result.parameters,
+            storedAt: Date.now()
+        });
+
+        // Evict the oldest entries beyond the limit
+        const countRequest = store.count();
+        countRequest.onsuccess = () => {
+            let excess = countRequest.result - this.maxEntries;
+            if (excess <= 0) {
+                return;
+            }
+            store.index('storedAt').openCursor().onsuccess = (e) => {
+                const cursor = e.target.result;
+                if (cursor && excess > 0) {
+                    cursor.delete();
+                    excess--;
+                    cursor.continue();
+                }
+            };
+        };
+    }
+}
+
 class KolamApp {
     constructor() {
         this.currentSVG = null;
         this.coordinates = [];
+        this.liveSessionId = null;
+        this.eventSource = null;
+        this.livePosting = false;
+        this.liveDirty = false;
+        this.livePosted = new Map();
+        this.liveLookup = 0;
+        this.liveShowingCached = false;
+        this.renderCache = new RenderCache();
+        this.renderRequest = 0;
         this.initializeEventListeners();
         this.updateParameterVisibility();
     }
@@ -11,6 +93,7 @@ class KolamApp {
         document.getElementById('designType').addEventListener('change', () => {
             this.updateParameterVisibility();
             this.updateDesignTypeHelp();
+            this.scheduleLiveUpdate();
         });
 
         // Range input updates
@@ -21,6 +104,7 @@ class KolamApp {
             if (input) {
                 input.addEventListener('input', () => {
                     document.getElementById(id + 'Value').textContent = input.value;
+                    this.scheduleLiveUpdate();
                 });
             }
         });
@@ -29,9 +113,27 @@ class KolamApp {
         ['canvasWidth', 'canvasHeight'].forEach(id => {
             document.getElementById(id).addEventListener('change', () => {
                 this.updateCanvasSize();
+                this.scheduleLiveUpdate();
             });
         });
 
+        document.getElementById('patternType').addEventListener('change', () => {
+            this.scheduleLiveUpdate();
+        });
+
+        // Live preview toggle
+        document.getElementById('livePreview').addEventListener('change', (e) => {
+            if (e.target.checked) {
+                this.startLiveSession();
+            } else {
+                this.stopLiveSession();
+            }
+        });
+
+        window.addEventListener('beforeunload', () => {
+            this.stopLiveSession();
+        });
+
         // Generate Kolam button
         document.getElementById('generateKolam').addEventListener('click', () => {
             this.generateKolam();
@@ -196,6 +298,10 @@ class KolamApp {
             data.circle_radius = parseInt(document.getElementById('circleRadius').value);
         } else if (designType === 'custom') {
             data.coordinates = this.collectCoordinates();
+            const simplify = parseFloat(document.getElementById('simplifyTolerance').value);
+            if (simplify > 0) {
+                data.simplify = simplify;
+            }
         }
 
         return data;
@@ -221,11 +327,27 @@ class KolamApp {
     }
 
     async generateKolam() {
+        const file = document.getElementById('coordinateFile').files[0];
+        if (document.getElementById('designType').value === 'custom' && file) {
+            await this.uploadCoordinates(file);
+            return;
+        }
+
+        const formData = this.collectFormData();
+        const request = ++this.renderRequest;
+        this.clearMessages();
+
+        const cached = await this.renderCache.get(formData);
+        if (cached) {
+            if (request === this.renderRequest) {
+                this.showRender(cached);
+                this.showStatus('Kolam loaded from cache');
+            }
+            return;
+        }
+
         try {
             this.showLoading(true);
-            this.clearMessages();
-
-            const formData = this.collectFormData();
             
             // Validate data first
             const validationResponse = await fetch('/api/validate-parameters', {
@@ -243,22 +365,30 @@ class KolamApp {
                 return;
             }
 
-            // Generate Kolam
-            const response = await fetch('/api/generate-kolam', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify(formData)
-            });
-
-            const result = await response.json();
+            // Ask for a cheap preview first. When the design is already cheap
+            // the server answers with the full render and nothing more is sent;
+            // otherwise the preview is shown while the full render is fetched
+            const preview = await this.requestRender({ ...formData, lod: 'preview' });
+            if (request !== this.renderRequest) {
+                return;
+            }
+            if (!preview.success) {
+                this.showError('Failed to generate Kolam: ' + preview.error);
+                return;
+            }
+            if (preview.lod === 'full') {
+                this.finishRender(formData, preview);
+                return;
+            }
+            this.showRender(preview);
+            this.showStatus('Showing a preview, refining...');
 
+            const result = await this.requestRender(formData);
+            if (request !== this.renderRequest) {
+                return;
+            }
             if (result.success) {
-                this.displayKolam(result.svg);
-                this.showDesignInfo(result.parameters);
-                this.showStatus('Kolam generated successfully!');
-                document.getElementById('downloadSVG').disabled = false;
+                this.finishRender(formData, result);
             } else {
                 this.showError('Failed to generate Kolam: ' + result.error);
             }
@@ -270,6 +400,176 @@ class KolamApp {
         }
     }
 
+    async uploadCoordinates(file) {
+        const request = ++this.renderRequest;
+        try {
+            this.showLoading(true);
+            this.clearMessages();
+
+            const params = new URLSearchParams({
+                width: document.getElementById('canvasWidth').value,
+                height: document.getElementById('canvasHeight').value,
+                simplify: document.getElementById('simplifyTolerance').value || 0
+            });
+            const body = new FormData();
+            body.append('file', file);
+            const response = await fetch(`/api/custom-kolam/upload?${params}`, { method: 'POST', body });
+            const result = await response.json();
+
+            if (request !== this.renderRequest) {
+                return;
+            }
+            if (result.success) {
+                this.showRender(result);
+                this.showStatus(`Rendered ${result.parameters.rendered_points} of ${result.parameters.points} points`);
+            } else if (result.errors) {
+                this.showError('Validation errors: ' + result.errors.join(', '));
+            } else {
+                this.showError('Failed to generate Kolam: ' + result.error);
+            }
+        } catch (error) {
+            this.showError('Error uploading coordinates: ' + error.message);
+        } finally {
+            this.showLoading(false);
+        }
+    }
+
+    async requestRender(data) {
+        const response = await fetch('/api/generate-kolam', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(data)
+        });
+        return response.json();
+    }
+
+    finishRender(formData, result) {
+        this.showRender(result);
+        this.showStatus('Kolam generated successfully!');
+        this.renderCache.put(formData, result);
+    }
+
+    showRender(result) {
+        this.displayKolam(result.svg);
+        this.showDesignInfo(result.parameters);
+        document.getElementById('downloadSVG').disabled = false;
+    }
+
+    async startLiveSession() {
+        try {
+            const response = await fetch('/api/live/session', { method: 'POST' });
+            const result = await response.json();
+            this.liveSessionId = result.session_id;
+
+            this.eventSource = new EventSource(`/api/live/${this.liveSessionId}/events`);
+            this.eventSource.addEventListener('result', (e) => {
+                this.handleLiveResult(JSON.parse(e.data), parseInt(e.lastEventId));
+            });
+
+            this.scheduleLiveUpdate();
+            this.showStatus('Live preview enabled');
+        } catch (error) {
+            document.getElementById('livePreview').checked = false;
+            this.showError('Could not start live preview: ' + error.message);
+        }
+    }
+
+    stopLiveSession() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+        if (this.liveSessionId) {
+            fetch(`/api/live/${this.liveSessionId}`, { method: 'DELETE', keepalive: true });
+            this.liveSessionId = null;
+        }
+    }
+
+    async scheduleLiveUpdate() {
+        if (!this.liveSessionId) {
+            return;
+        }
+
+        // Settings seen recently are shown straight from the cache without a round trip
+        const lookup = ++this.liveLookup;
+        const cached = await this.renderCache.get(this.collectFormData());
+        if (lookup !== this.liveLookup) {
+            return;
+        }
+        this.liveShowingCached = Boolean(cached);
+        if (cached) {
+            this.showRender(cached);
+            return;
+        }
+
+        // Keep at most one update in flight; the server only renders the newest anyway
+        this.liveDirty = true;
+        if (!this.livePosting) {
+            this.flushLiveUpdates();
+        }
+    }
+
+    async flushLiveUpdates() {
+        this.livePosting = true;
+        try {
+            while (this.liveDirty && this.liveSessionId) {
+                this.liveDirty = false;
+                const formData = this.collectFormData();
+                const response = await fetch(`/api/live/${this.liveSessionId}/parameters`, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                    },
+                    body: JSON.stringify(formData)
+                });
+
+                if (response.ok) {
+                    // Remember what each version rendered so its result can be cached
+                    const { version } = await response.json();
+                    this.livePosted.set(version, formData);
+                } else if (response.status === 404) {
+                    // Session expired on the server; start a fresh one
+                    this.stopLiveSession();
+                    await this.startLiveSession();
+                }
+            }
+        } catch (error) {
+            this.showError('Live preview update failed: ' + error.message);
+        } finally {
+            this.livePosting = false;
+        }
+    }
+
+    handleLiveResult(result, version) {
+        const formData = this.livePosted.get(version);
+        // Results arrive in version order, so older entries are no longer needed
+        for (const posted of this.livePosted.keys()) {
+            if (posted <= version) {
+                this.livePosted.delete(posted);
+            }
+        }
+
+        if (result.success) {
+            if (formData) {
+                this.renderCache.put(formData, result);
+            }
+            // A cached render for newer settings is already on screen
+            if (!this.liveShowingCached) {
+                this.showRender(result);
+            }
+        } else if (result.errors) {
+            this.showError('Validation errors: ' + result.errors.join(', '));
+        } else if (result.retry_after) {
+            // The server was too busy; send the current settings again once it expects room
+            this.showStatus('Server busy, retrying live preview in ' + result.retry_after + 's');
+            setTimeout(() => this.scheduleLiveUpdate(), result.retry_after * 1000);
+        } else {
+            this.showError('Failed to generate Kolam: ' + result.error);
+        }
+    }
+
     displayKolam(svgContent) {
         const canvas = document.getElementById('kolamCanvas');
         canvas.innerHTML = svgContent;
@@ -0,0 +1,4 @@
+"""
+Shared coordinate tooling for the kolam scripts: batch extraction of stroke
+pixels from images and the helpers the camera trackers build on.
+"""
@@ -0,0 +1,328 @@
+"""
+Kolam overlays pinned to the drawing surface with a homography.
+
+The camera overlays drew points at fixed pixel positions, so the kolam slid
+off the paper whenever the camera or the paper moved. Here the kolam is laid
+out on a flat plane whose four corners are matched to the surface's corners
+in the frame. Those are either four ArUco markers (ids 0-3 clockwise from
+top left, see --marker-sheet) or the outline of the sheet itself. Only the
+pre-rendered overlay is warped, and only when the homography changes. The
+surface is found again only when the tracked corners move more than
+`motion_threshold` pixels from where they were last found. A camera
+calibration can be given to undistort frames through cached remap tables.
+
+Recorded videos can be anchored offline to check the tracking:
+
+    python -m kolamtools.anchor recording.mp4 output.kpts -o anchored.mp4
+    python -m kolamtools.anchor recording.mp4 output.kpts -o anchored.mp4 --markers --calibration camera.npz
+    python -m kolamtools.anchor --marker-sheet markers.png
+"""
+import argparse
+import json
+import sys
+
+import cv2
+import numpy as np
+
+from .overlay import Overlay, blend
+from .pipeline import AsyncWriter, Pipeline
+from .pointfile import PointFileError, load_points
+
+# Surface detection and motion tracking work on a copy of the frame this wide
+DETECT_MAX_SIDE = 640
+
+# Smallest sheet outline accepted, as a fraction of the frame area
+MIN_SURFACE_AREA = 0.05
+
+# Corner movement, in frame pixels, that triggers a new homography
+MOTION_THRESHOLD = 3.0
+
+MARKER_DICTIONARY = 'DICT_4X4_50'
+
+# Padding around the kolam's points on the anchored plane, in point units
+DEFAULT_PADDING = 50
+
+_LK_PARAMS = dict(winSize=(21, 21), maxLevel=3,
+                  criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+
+class AnchorError(ValueError):
+    """Raised for unusable calibrations or missing marker support"""
+
+
+def load_calibration(path):
+    """Camera matrix and distortion coefficients from an .npz (camera_matrix
+    and dist_coeffs, or mtx and dist as cv2.calibrateCamera tutorials save
+    them) or a .json file with the same keys"""
+    try:
+        if path.lower().endswith('.json'):
+            with open(path) as f:
+                values = json.load(f)
+        else:
+            values = dict(np.load(path))
+    except (OSError, ValueError) as e:
+        raise AnchorError(f'Unreadable calibration {path}: {e}')
+    for matrix_key, coefficient_key in (('camera_matrix', 'dist_coeffs'), ('mtx', 'dist')):
+        if matrix_key in values and coefficient_key in values:
+            return (np.asarray(values[matrix_key], dtype=np.float64).reshape(3, 3),
+                    np.asarray(values[coefficient_key], dtype=np.float64).ravel())
+    raise AnchorError(f'{path} needs camera_matrix and dist_coeffs')
+
+
+class Undistorter:
+    """Removes lens distortion with remap tables built once per frame size"""
+
+    def __init__(self, camera_matrix, dist_coeffs, alpha=0.0):
+        self.camera_matrix = camera_matrix
+        self.dist_coeffs = dist_coeffs
+        self.alpha = alpha
+        self._maps = {}
+
+    def __call__(self, frame):
+        size = (frame.shape[1], frame.shape[0])
+        maps = self._maps.get(size)
+        if maps is None:
+            matrix, _ = cv2.getOptimalNewCameraMatrix(self.camera_matrix, self.dist_coeffs, size, self.alpha)
+            maps = cv2.initUndistortRectifyMap(self.camera_matrix, self.dist_coeffs, None, matrix, size,
+                                               cv2.CV_16SC2)
+            self._maps[size] = maps
+        return cv2.remap(frame, maps[0], maps[1], cv2.INTER_LINEAR)
+
+
+def _small_gray(frame):
+    """Grayscale copy at most DETECT_MAX_SIDE wide, and its scale factor"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    factor = min(1.0, DETECT_MAX_SIDE / max(gray.shape))
+    if factor < 1.0:
+        gray = cv2.resize(gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+    return gray, factor
+
+
+def order_corners(points):
+    """Four points ordered top left, top right, bottom right, bottom left"""
+    points = np.asarray(points, dtype=np.float32).reshape(4, 2)
+    total = points.sum(axis=1)
+    difference = points[:, 1] - points[:, 0]
+    return np.array([points[np.argmin(total)], points[np.argmin(difference)],
+                     points[np.argmax(total)], points[np.argmax(difference)]], dtype=np.float32)
+
+
+def find_surface(gray, min_area=MIN_SURFACE_AREA):
+    """Corners of the largest four-sided outline in a grayscale image,
+    ordered from top left, or None"""
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    best, best_area = None, min_area * gray.shape[0] * gray.shape[1]
+    # The sheet may be lighter or darker than the floor
+    for mask in (binary, cv2.bitwise_not(binary)):
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if area <= best_area:
+                continue
+            # Regions running off the frame are the floor, not the sheet
+            x, y, w, h = cv2.boundingRect(contour)
+            if x == 0 or y == 0 or x + w == gray.shape[1] or y + h == gray.shape[0]:
+                continue
+            outline = cv2.approxPolyDP(cv2.convexHull(contour), 0.02 * cv2.arcLength(contour, True), True)
+            if len(outline) == 4 and cv2.isContourConvex(outline):
+                best, best_area = outline, area
+    if best is None:
+        return None
+    corners = order_corners(best)
+    criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.01)
+    return cv2.cornerSubPix(gray, corners.reshape(-1, 1, 2), (5, 5), (-1, -1), criteria).reshape(4, 2)
+
+
+_detectors = {}
+
+
+def _marker_detector(name=MARKER_DICTIONARY):
+    if not hasattr(cv2, 'aruco'):
+        raise AnchorError('Marker anchoring needs an OpenCV build with the aruco module')
+    if name not in _detectors:
+        dictionary = cv2.aruco.getPredefinedDictionary(getattr(cv2.aruco, name))
+        _detectors[name] = cv2.aruco.ArucoDetector(dictionary, cv2.aruco.DetectorParameters())
+    return _detectors[name]
+
+
+def find_markers(gray):
+    """Outer corners of ArUco markers 0-3 (top left, top right, bottom
+    right, bottom left of the surface), or None unless all four are seen"""
+    corners, ids, _ = _marker_detector().detectMarkers(gray)
+    if ids is None:
+        return None
+    found = {}
+    for marker, marker_id in zip(corners, ids.ravel()):
+        if 0 <= marker_id < 4:
+            # Each marker's own corner on the same side as its place on the sheet
+            found[int(marker_id)] = marker.reshape(4, 2)[marker_id]
+    if len(found) < 4:
+        return None
+    return np.array([found[i] for i in range(4)], dtype=np.float32)
+
+
+def marker_sheet(width=2480, height=3508, marker=400, margin=100):
+    """White sheet (A4 at 300 dpi by default) with markers 0-3 in its corners"""
+    _marker_detector()
+    dictionary = cv2.aruco.getPredefinedDictionary(getattr(cv2.aruco, MARKER_DICTIONARY))
+    sheet = np.full((height, width), 255, dtype=np.uint8)
+    places = [(margin, margin), (width - margin - marker, margin),
+              (width - margin - marker, height - margin - marker), (margin, height - margin - marker)]
+    for marker_id, (x, y) in enumerate(places):
+        sheet[y:y + marker, x:x + marker] = cv2.aruco.generateImageMarker(dictionary, marker_id, marker)
+    return sheet
+
+
+def _translation(dx, dy):
+    return np.array([[1.0, 0.0, dx], [0.0, 1.0, dy], [0.0, 0.0, 1.0]])
+
+
+class AnchoredOverlay:
+    """
+    An Overlay laid out on a plane of `plane_size` (width, height), whose
+    corners are pinned to the surface's corners in each frame. `composite`
+    returns the frame it drew on, which is a new array when `undistort` is
+    given.
+    """
+
+    def __init__(self, overlay, plane_size, markers=False, motion_threshold=MOTION_THRESHOLD, undistort=None):
+        self.overlay = overlay
+        self.plane_size = (int(plane_size[0]), int(plane_size[1]))
+        self.markers = markers
+        self.motion_threshold = motion_threshold
+        self.undistort = undistort
+        self.homography = None
+        self.estimates = 0
+        self._corners = None
+        self._reference = None
+        self._warped = None
+
+    def _moved(self, gray, factor):
+        """Whether the corners found last have moved more than the threshold"""
+        previous = self._corners.reshape(-1, 1, 2) * factor
+        tracked, status, _ = cv2.calcOpticalFlowPyrLK(self._reference, gray, previous, None, **_LK_PARAMS)
+        if status is None or not status.all():
+            return True
+        return np.abs(tracked - previous).max() / factor > self.motion_threshold
+
+    def update(self, frame):
+        """Find the surface again if it moved; True when the homography changed"""
+        gray, factor = _small_gray(frame)
+        if self.homography is not None and not self._moved(gray, factor):
+            return False
+        corners = find_markers(gray) if self.markers else find_surface(gray)
+        if corners is None:
+            # Keep the last homography until the surface is seen again
+            return False
+        self._corners = corners / factor
+        self._reference = gray
+        width, height = self.plane_size
+        plane = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+        self.homography = cv2.getPerspectiveTransform(plane, self._corners.astype(np.float32))
+        self.estimates += 1
+        self._warped = None
+        return True
+
+    def _warp(self, shape):
+        box, layer, mask = self.overlay.layer((self.plane_size[1], self.plane_size[0]))
+        self._warped = (shape, None, None, None)
+        if box is None:
+            return
+        y0, y1, x0, x1 = box
+        matrix = self.homography @ _translation(x0, y0)
+        # Only the overlay's own footprint in the frame is warped
+        h, w = layer.shape[:2]
+        corners = cv2.perspectiveTransform(np.float32([[[0, 0], [w, 0], [w, h], [0, h]]]), matrix)[0]
+        fx0, fy0 = np.maximum(np.floor(corners.min(axis=0)).astype(int), 0)
+        fx1 = min(int(np.ceil(corners[:, 0].max())) + 1, shape[1])
+        fy1 = min(int(np.ceil(corners[:, 1].max())) + 1, shape[0])
+        if fx1 <= fx0 or fy1 <= fy0:
+            return
+        matrix = _translation(-fx0, -fy0) @ matrix
+        size = (fx1 - fx0, fy1 - fy0)
+        warped = cv2.warpPerspective(layer, matrix, size, flags=cv2.INTER_LINEAR)
+        warped_mask = cv2.warpPerspective(mask, matrix, size, flags=cv2.INTER_NEAREST)
+        self._warped = (shape, (int(fy0), int(fy1), int(fx0), int(fx1)), warped, warped_mask)
+
+    def composite(self, frame):
+        if self.undistort is not None:
+            frame = self.undistort(frame)
+        self.update(frame)
+        if self.homography is None:
+            return frame
+        if self._warped is None or self._warped[0] != frame.shape[:2]:
+            self._warp(frame.shape[:2])
+        _, box, layer, mask = self._warped
+        if box is not None:
+            blend(frame, box, layer, mask, self.overlay.opacity)
+        return frame
+
+    def pixel(self, point):
+        """Frame position of one kolam point, e.g. for the guide dot, or None before the surface is found"""
+        if self.homography is None:
+            return None
+        x, y = self.overlay.pixel(point)
+        mapped = cv2.perspectiveTransform(np.float32([[[x, y]]]), self.homography)[0, 0]
+        return int(round(mapped[0])), int(round(mapped[1]))
+
+
+def plane_for(points, padding=DEFAULT_PADDING):
+    """(offset, plane size) laying points out on a plane with `padding` round them"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    low, high = points.min(axis=0), points.max(axis=0)
+    size = np.ceil(high - low + 2 * padding).astype(int)
+    return (padding - low[0], padding - low[1]), (int(size[0]), int(size[1]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pin a kolam overlay to the drawing surface in a video')
+    parser.add_argument('video', nargs='?', help='Recorded video to anchor')
+    parser.add_argument('points', nargs='?', help='Coordinate file (.kpts, .csv or .npy)')
+    parser.add_argument('-o', '--output', help='Anchored video to write')
+    parser.add_argument('--markers', action='store_true', help='Anchor to ArUco markers 0-3 instead of the sheet outline')
+    parser.add_argument('--calibration', help='Camera calibration (.npz or .json) to undistort frames')
+    parser.add_argument('--threshold', type=float, default=MOTION_THRESHOLD,
+                        help='Corner movement in pixels that triggers a new homography')
+    parser.add_argument('--padding', type=float, default=DEFAULT_PADDING, help='Plane margin round the points')
+    parser.add_argument('--radius', type=int, default=10, help='Circle radius on the plane')
+    parser.add_argument('--show', action='store_true', help='Show frames while anchoring')
+    parser.add_argument('--marker-sheet', metavar='PNG', help='Write a printable sheet with the four markers and exit')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.marker_sheet:
+            cv2.imwrite(args.marker_sheet, marker_sheet())
+            print(f'Wrote {args.marker_sheet}')
+            return 0
+        if not args.video or not args.points:
+            parser.error('give a video and a coordinate file')
+
+        points = load_points(args.points)[['x', 'y']].to_numpy()
+        offset, plane_size = plane_for(points, args.padding)
+        undistort = Undistorter(*load_calibration(args.calibration)) if args.calibration else None
+        anchored = AnchoredOverlay(Overlay(points, args.radius, offset=offset), plane_size, args.markers,
+                                   args.threshold, undistort)
+
+        capture = cv2.VideoCapture(args.video)
+        if not capture.isOpened():
+            print(f'Cannot open {args.video}', file=sys.stderr)
+            return 1
+        writer = None
+        if args.output:
+            fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+            size = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            writer = AsyncWriter(cv2.VideoWriter(args.output, cv2.VideoWriter_fourcc(*'mp4v'), fps, size))
+        stats = Pipeline(capture, anchored.composite, 'Anchored' if args.show else None, writer,
+                         latest=False).run()
+    except (OSError, PointFileError, AnchorError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    print(f"{stats['processed']} frames at {stats['fps']:.1f} fps, "
+          f'homography estimated {anchored.estimates} times')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
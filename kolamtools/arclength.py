@@ -0,0 +1,542 @@
+"""
+Coordinates sampled at a fixed arc-length spacing along a kolam's strokes.
+
+speedkollamsingleknotcsvxy.py got its coordinates by driving a Tk turtle
+and recording where it went, which was slow, tied to a display and capped at
+10000 points. Here a design is first turned into its exact geometry: lines,
+circular or elliptical arcs and Bezier curves, in drawing order, grouped into
+strokes wherever the pen lifts. Points are then placed every `spacing` units
+of arc length along each stroke in one vectorized pass. Lines and circular
+arcs are evaluated in closed form; elliptical arcs and Beziers go through a
+small per-curve table of arc length against the curve parameter.
+
+Geometry comes from any SVG, such as the web app's designs, or from a
+turtle program given as an L-system string with the moves of each symbol.
+
+    python -m kolamtools.arclength design.svg -o coordinates.kpts --spacing 2
+    python -m kolamtools.arclength --single-knot 4 -o coordinates.kpts --spacing 5
+"""
+import argparse
+import math
+import re
+import sys
+import time
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .pointfile import PointFileError, save_points
+
+# Primitive kinds. Parameters, padded to eight: a line's two end points; an
+# arc's affine map of the unit circle (a, b, tx, c, d, ty) and its start angle
+# and signed sweep in radians; a quadratic or cubic Bezier's control points
+LINE, ARC, QUAD, CUBIC = range(4)
+
+# Curve parameter steps in the arc-length tables of elliptical arcs and Beziers
+TABLE_STEPS = 64
+
+# Exports larger than this many points are refused
+MAX_POINTS = 50_000_000
+
+# Strokes, in order, of drawn primitives: `kinds` (N,), `params` (N, 8) and
+# the stroke number of each primitive, `strokes` (N,)
+Geometry = namedtuple('Geometry', 'kinds params strokes')
+
+# Gaps smaller than this between one primitive's end and the next one's start
+# don't lift the pen
+_JOIN_TOLERANCE = 1e-6
+
+
+class GeometryError(ValueError):
+    """Raised for drawings that can't be read or sampled"""
+
+
+class GeometryBuilder:
+    """Collects primitives in drawing order, starting a new stroke whenever
+    one doesn't begin where the last ended"""
+
+    def __init__(self):
+        self.kinds, self.params, self.strokes = [], [], []
+        self.stroke = -1
+        self.end = None
+
+    def _add(self, kind, params, start, end):
+        if self.end is None or abs(start[0] - self.end[0]) + abs(start[1] - self.end[1]) > _JOIN_TOLERANCE:
+            self.stroke += 1
+        self.kinds.append(kind)
+        self.params.append(list(params) + [0.0] * (8 - len(params)))
+        self.strokes.append(self.stroke)
+        self.end = end
+
+    def line(self, p0, p1):
+        self._add(LINE, (*p0, *p1), p0, p1)
+
+    def arc(self, matrix, start, sweep):
+        """Arc of the unit circle from angle `start` through `sweep` radians,
+        mapped by the 2x3 affine `matrix`"""
+        (a, b, tx), (c, d, ty) = matrix
+        p0 = (a * math.cos(start) + b * math.sin(start) + tx, c * math.cos(start) + d * math.sin(start) + ty)
+        stop = start + sweep
+        p1 = (a * math.cos(stop) + b * math.sin(stop) + tx, c * math.cos(stop) + d * math.sin(stop) + ty)
+        self._add(ARC, (a, b, tx, c, d, ty, start, sweep), p0, p1)
+
+    def quad(self, p0, p1, p2):
+        self._add(QUAD, (*p0, *p1, *p2), p0, p2)
+
+    def cubic(self, p0, p1, p2, p3):
+        self._add(CUBIC, (*p0, *p1, *p2, *p3), p0, p3)
+
+    def build(self):
+        return Geometry(np.array(self.kinds, dtype=np.int8), np.array(self.params, dtype=np.float64).reshape(-1, 8),
+                        np.array(self.strokes, dtype=np.int64))
+
+
+def _evaluate(kinds, params, t):
+    """Points at curve parameter t in [0, 1] of each (kind, params) row"""
+    points = np.empty((len(t), 2))
+    for kind in (LINE, ARC, QUAD, CUBIC):
+        rows = np.flatnonzero(kinds == kind)
+        if not len(rows):
+            continue
+        p, u = params[rows], t[rows, None]
+        if kind == LINE:
+            points[rows] = p[:, 0:2] + u * (p[:, 2:4] - p[:, 0:2])
+        elif kind == ARC:
+            angle = p[:, 6] + t[rows] * p[:, 7]
+            cos, sin = np.cos(angle), np.sin(angle)
+            points[rows, 0] = p[:, 0] * cos + p[:, 1] * sin + p[:, 2]
+            points[rows, 1] = p[:, 3] * cos + p[:, 4] * sin + p[:, 5]
+        elif kind == QUAD:
+            points[rows] = (1 - u) ** 2 * p[:, 0:2] + 2 * (1 - u) * u * p[:, 2:4] + u ** 2 * p[:, 4:6]
+        else:
+            points[rows] = ((1 - u) ** 3 * p[:, 0:2] + 3 * (1 - u) ** 2 * u * p[:, 2:4]
+                            + 3 * (1 - u) * u ** 2 * p[:, 4:6] + u ** 3 * p[:, 6:8])
+    return points
+
+
+def _uniform_speed(kinds, params):
+    """Primitives whose points move at constant speed with the parameter:
+    lines, and arcs whose map is a rotation or reflection times a scale"""
+    a, b, c, d = params[:, 0], params[:, 1], params[:, 3], params[:, 4]
+    scale = np.maximum(np.hypot(a, c), 1e-300)
+    circular = ((np.abs(a - d) + np.abs(b + c) <= 1e-9 * scale)
+                | (np.abs(a + d) + np.abs(b - c) <= 1e-9 * scale))
+    return (kinds == LINE) | ((kinds == ARC) & circular)
+
+
+def _lengths(geometry):
+    """Length of every primitive, and for the curved ones without a closed
+    form (indices, (n, TABLE_STEPS + 1) normalized cumulative length)"""
+    kinds, params = geometry.kinds, geometry.params
+    lengths = np.zeros(len(kinds))
+    lines = kinds == LINE
+    lengths[lines] = np.hypot(params[lines, 2] - params[lines, 0], params[lines, 3] - params[lines, 1])
+    uniform = _uniform_speed(kinds, params)
+    arcs = uniform & (kinds == ARC)
+    lengths[arcs] = np.hypot(params[arcs, 0], params[arcs, 3]) * np.abs(params[arcs, 7])
+
+    tabled = np.flatnonzero(~uniform)
+    grid = np.linspace(0, 1, TABLE_STEPS + 1)
+    tables = np.empty((len(tabled), TABLE_STEPS + 1))
+    for start in range(0, len(tabled), 65536):
+        rows = tabled[start:start + 65536]
+        repeated = np.repeat(rows, TABLE_STEPS + 1)
+        points = _evaluate(kinds[repeated], params[repeated], np.tile(grid, len(rows)))
+        steps = np.hypot(*np.diff(points.reshape(len(rows), TABLE_STEPS + 1, 2), axis=1).transpose(2, 0, 1))
+        tables[start:start + len(rows), 1:] = np.cumsum(steps, axis=1)
+    tables[:, 0] = 0
+    lengths[tabled] = tables[:, -1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tables = np.where(tables[:, -1:] > 0, tables / tables[:, -1:], grid)
+    return lengths, tabled, tables
+
+
+def sample_geometry(geometry, spacing, max_points=MAX_POINTS):
+    """
+    Points every `spacing` units of arc length along each stroke, starting at
+    the stroke's beginning. Returns (M, 2) float64 points and the stroke
+    number of each.
+    """
+    if spacing <= 0:
+        raise GeometryError('spacing must be positive')
+    if not len(geometry.kinds):
+        return np.empty((0, 2)), np.empty(0, dtype=np.int64)
+    lengths, tabled, tables = _lengths(geometry)
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+
+    first = np.flatnonzero(np.r_[True, geometry.strokes[1:] != geometry.strokes[:-1]])
+    last = np.r_[first[1:], len(lengths)] - 1
+    stroke_lengths = ends[last] - starts[first]
+    counts = np.floor(stroke_lengths / spacing + 1e-9).astype(np.int64) + 1
+    total = int(counts.sum())
+    if total > max_points:
+        raise GeometryError(f'{total} points at spacing {spacing:g}; at most {max_points} can be exported')
+
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    position = np.repeat(starts[first], counts) + offsets * spacing
+    primitive = np.searchsorted(ends, position, side='right')
+    primitive = np.clip(primitive, np.repeat(first, counts), np.repeat(last, counts))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = np.clip((position - starts[primitive]) / lengths[primitive], 0, 1)
+    fraction = np.nan_to_num(fraction)
+
+    # Turn the fraction of arc length into the curve parameter where needed
+    table_row = np.full(len(lengths), -1)
+    table_row[tabled] = np.arange(len(tabled))
+    rows = table_row[primitive]
+    needs = np.flatnonzero(rows >= 0)
+    if len(needs):
+        table = tables[rows[needs]]
+        u = fraction[needs]
+        step = np.minimum((table[:, 1:] <= u[:, None]).sum(axis=1), TABLE_STEPS - 1)
+        low = table[np.arange(len(needs)), step]
+        high = table[np.arange(len(needs)), step + 1]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            within = np.nan_to_num(np.clip((u - low) / (high - low), 0, 1))
+        fraction[needs] = (step + within) / TABLE_STEPS
+
+    points = _evaluate(geometry.kinds[primitive], geometry.params[primitive], fraction)
+    return points, np.repeat(np.arange(len(first)), counts)
+
+
+def total_length(geometry):
+    return float(_lengths(geometry)[0].sum())
+
+
+# SVG
+
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+_PATH_TOKEN = re.compile(rf'[MmLlHhVvAaQqTtCcSsZz]|{_NUMBER}')
+_TRANSFORM = re.compile(r'(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)')
+_PATH_ARGS = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'A': 7, 'Q': 4, 'T': 2, 'C': 6, 'S': 4, 'Z': 0}
+_SKIPPED = {'defs', 'text', 'title', 'desc', 'metadata', 'clipPath', 'mask', 'pattern', 'symbol', 'marker',
+            'style', 'script', 'linearGradient', 'radialGradient', 'use', 'image'}
+
+
+def _transform(text):
+    """3x3 matrix of an SVG transform attribute"""
+    matrix = np.eye(3)
+    for name, args in _TRANSFORM.findall(text or ''):
+        values = [float(value) for value in re.findall(_NUMBER, args)]
+        step = np.eye(3)
+        if name == 'matrix' and len(values) == 6:
+            step[:2] = np.array(values).reshape(3, 2).T
+        elif name == 'translate' and values:
+            step[:2, 2] = values[0], values[1] if len(values) > 1 else 0.0
+        elif name == 'scale' and values:
+            step[0, 0], step[1, 1] = values[0], values[1] if len(values) > 1 else values[0]
+        elif name == 'rotate' and values:
+            theta = math.radians(values[0])
+            cx, cy = (values[1], values[2]) if len(values) == 3 else (0.0, 0.0)
+            turn = np.array([[math.cos(theta), -math.sin(theta), 0], [math.sin(theta), math.cos(theta), 0], [0, 0, 1]])
+            step = np.array([[1, 0, cx], [0, 1, cy], [0, 0, 1]]) @ turn @ np.array([[1, 0, -cx], [0, 1, -cy], [0, 0, 1]])
+        elif name == 'skewX' and values:
+            step[0, 1] = math.tan(math.radians(values[0]))
+        elif name == 'skewY' and values:
+            step[1, 0] = math.tan(math.radians(values[0]))
+        matrix = matrix @ step
+    return matrix
+
+
+def _stroke_of(element, inherited):
+    """The stroke paint of an element, from its attribute, its style or its parent"""
+    style = dict(part.split(':', 1) for part in element.get('style', '').split(';') if ':' in part)
+    style = {key.strip(): value.strip() for key, value in style.items()}
+    return style.get('stroke', element.get('stroke', inherited))
+
+
+class _Pen:
+    """Draws SVG shapes into a builder through a transform"""
+
+    def __init__(self, builder, matrix):
+        self.builder = builder
+        self.matrix = matrix
+
+    def point(self, x, y):
+        m = self.matrix
+        return (m[0, 0] * x + m[0, 1] * y + m[0, 2], m[1, 0] * x + m[1, 1] * y + m[1, 2])
+
+    def line(self, p0, p1):
+        self.builder.line(self.point(*p0), self.point(*p1))
+
+    def quad(self, p0, p1, p2):
+        self.builder.quad(self.point(*p0), self.point(*p1), self.point(*p2))
+
+    def cubic(self, p0, p1, p2, p3):
+        self.builder.cubic(self.point(*p0), self.point(*p1), self.point(*p2), self.point(*p3))
+
+    def ellipse(self, cx, cy, rx, ry, phi, start, sweep):
+        local = np.array([[rx * math.cos(phi), -ry * math.sin(phi), cx],
+                          [rx * math.sin(phi), ry * math.cos(phi), cy], [0, 0, 1]])
+        self.builder.arc((self.matrix @ local)[:2], start, sweep)
+
+    def svg_arc(self, p0, rx, ry, rotation, large, sweep, p1):
+        """Endpoint-parameterized SVG arc, converted to its centre form"""
+        if p0 == p1:
+            return
+        rx, ry = abs(rx), abs(ry)
+        if rx == 0 or ry == 0:
+            self.line(p0, p1)
+            return
+        phi = math.radians(rotation)
+        cos, sin = math.cos(phi), math.sin(phi)
+        dx, dy = (p0[0] - p1[0]) / 2, (p0[1] - p1[1]) / 2
+        x1, y1 = cos * dx + sin * dy, -sin * dx + cos * dy
+        # Radii too small to span the end points are scaled up
+        scale = x1 * x1 / (rx * rx) + y1 * y1 / (ry * ry)
+        if scale > 1:
+            rx, ry = rx * math.sqrt(scale), ry * math.sqrt(scale)
+        numerator = rx * rx * ry * ry - rx * rx * y1 * y1 - ry * ry * x1 * x1
+        denominator = rx * rx * y1 * y1 + ry * ry * x1 * x1
+        factor = math.sqrt(max(numerator, 0.0) / denominator) * (-1 if bool(large) == bool(sweep) else 1)
+        cx1, cy1 = factor * rx * y1 / ry, -factor * ry * x1 / rx
+        cx = cos * cx1 - sin * cy1 + (p0[0] + p1[0]) / 2
+        cy = sin * cx1 + cos * cy1 + (p0[1] + p1[1]) / 2
+        start = math.atan2((y1 - cy1) / ry, (x1 - cx1) / rx)
+        stop = math.atan2((-y1 - cy1) / ry, (-x1 - cx1) / rx)
+        delta = (stop - start) % (2 * math.pi)
+        if not sweep and delta > 0:
+            delta -= 2 * math.pi
+        self.ellipse(cx, cy, rx, ry, phi, start, delta)
+
+    def path(self, d):
+        tokens = _PATH_TOKEN.findall(d)
+        position = start = (0.0, 0.0)
+        control = None
+        previous = ''
+        i = 0
+        command = None
+        while i < len(tokens):
+            if tokens[i].isalpha():
+                command = tokens[i]
+                i += 1
+            elif command is None:
+                raise GeometryError('Path data must start with a command')
+            upper = command.upper()
+            relative = command.islower()
+            count = _PATH_ARGS[upper]
+            if upper == 'Z':
+                self.line(position, start)
+                position = start
+                previous, control = 'Z', None
+                # Z takes no arguments, so the next token has to be a command
+                if i < len(tokens) and not tokens[i].isalpha():
+                    raise GeometryError(f'Path data has a stray number {tokens[i]} after {command}')
+                continue
+            if i + count > len(tokens):
+                raise GeometryError(f'Path command {command} is missing arguments')
+            args = [float(token) for token in tokens[i:i + count]]
+            i += count
+            ox, oy = position if relative else (0.0, 0.0)
+            if upper == 'M':
+                position = start = (args[0] + ox, args[1] + oy)
+                # Further pairs after a move are lines
+                command = 'l' if relative else 'L'
+                previous, control = 'M', None
+                continue
+            if upper == 'L':
+                end = (args[0] + ox, args[1] + oy)
+                self.line(position, end)
+            elif upper == 'H':
+                end = (args[0] + ox, position[1])
+                self.line(position, end)
+            elif upper == 'V':
+                end = (position[0], args[0] + oy)
+                self.line(position, end)
+            elif upper == 'A':
+                end = (args[5] + ox, args[6] + oy)
+                self.svg_arc(position, args[0], args[1], args[2], args[3], args[4], end)
+            elif upper in ('Q', 'T'):
+                if upper == 'Q':
+                    handle = (args[0] + ox, args[1] + oy)
+                    end = (args[2] + ox, args[3] + oy)
+                else:
+                    handle = (2 * position[0] - control[0], 2 * position[1] - control[1]) \
+                        if previous in ('Q', 'T') else position
+                    end = (args[0] + ox, args[1] + oy)
+                self.quad(position, handle, end)
+                control = handle
+            else:
+                if upper == 'C':
+                    first = (args[0] + ox, args[1] + oy)
+                    second = (args[2] + ox, args[3] + oy)
+                    end = (args[4] + ox, args[5] + oy)
+                else:
+                    first = (2 * position[0] - control[0], 2 * position[1] - control[1]) \
+                        if previous in ('C', 'S') else position
+                    second = (args[0] + ox, args[1] + oy)
+                    end = (args[2] + ox, args[3] + oy)
+                self.cubic(position, first, second, end)
+                control = second
+            if upper not in ('Q', 'T', 'C', 'S'):
+                control = None
+            previous = upper
+            position = end
+
+
+def _number(element, name, default=0.0):
+    value = re.match(_NUMBER, element.get(name, '').strip())
+    return float(value.group()) if value else default
+
+
+def _draw_element(builder, element, matrix, stroke):
+    tag = element.tag.rsplit('}', 1)[-1]
+    if tag in _SKIPPED:
+        return
+    matrix = matrix @ _transform(element.get('transform'))
+    stroke = _stroke_of(element, stroke)
+    if stroke is not None and stroke != 'none':
+        pen = _Pen(builder, matrix)
+        if tag == 'line':
+            pen.line((_number(element, 'x1'), _number(element, 'y1')), (_number(element, 'x2'), _number(element, 'y2')))
+        elif tag in ('polyline', 'polygon'):
+            values = [float(value) for value in re.findall(_NUMBER, element.get('points', ''))]
+            points = list(zip(values[0::2], values[1::2]))
+            if tag == 'polygon' and points:
+                points.append(points[0])
+            for p0, p1 in zip(points, points[1:]):
+                pen.line(p0, p1)
+        elif tag == 'rect':
+            x, y = _number(element, 'x'), _number(element, 'y')
+            w, h = _number(element, 'width'), _number(element, 'height')
+            corners = [(x, y), (x + w, y), (x + w, y + h), (x, y + h), (x, y)]
+            for p0, p1 in zip(corners, corners[1:]):
+                pen.line(p0, p1)
+        elif tag in ('circle', 'ellipse'):
+            cx, cy = _number(element, 'cx'), _number(element, 'cy')
+            if tag == 'circle':
+                rx = ry = _number(element, 'r')
+            else:
+                rx, ry = _number(element, 'rx'), _number(element, 'ry')
+            if rx > 0 and ry > 0:
+                pen.ellipse(cx, cy, rx, ry, 0.0, 0.0, 2 * math.pi)
+        elif tag == 'path':
+            pen.path(element.get('d', ''))
+    for child in element:
+        _draw_element(builder, child, matrix, stroke)
+
+
+def svg_geometry(svg):
+    """Geometry of the stroked shapes of an SVG document (text or bytes);
+    filled-only shapes such as the pulli dots and the background are left out"""
+    try:
+        root = ET.fromstring(svg)
+    except ET.ParseError as e:
+        raise GeometryError(f'Unreadable SVG: {e}')
+    builder = GeometryBuilder()
+    _draw_element(builder, root, np.eye(3), None)
+    return builder.build()
+
+
+# Turtle programs
+
+def turtle_geometry(program, moves, heading=0.0, start=(0.0, 0.0)):
+    """
+    Geometry of a turtle program: every symbol of `program` runs its list of
+    moves from `moves`, ('forward', distance), ('arc', radius, degrees)
+    turning left like turtle.circle, or ('turn', degrees) to the left.
+    Symbols without moves are skipped. Coordinates are the turtle's, y up.
+    """
+    table = {ord(symbol): steps for symbol, steps in moves.items()}
+    width = max((len(steps) for steps in table.values()), default=0)
+    counts = np.zeros(256, dtype=np.int64)
+    kinds = np.zeros((256, max(width, 1)), dtype=np.int8)
+    sizes = np.zeros((256, max(width, 1)))
+    turns = np.zeros((256, max(width, 1)))
+    for code, steps in table.items():
+        counts[code] = len(steps)
+        for i, step in enumerate(steps):
+            if step[0] == 'forward':
+                kinds[code, i], sizes[code, i] = 0, step[1]
+            elif step[0] == 'arc':
+                kinds[code, i], sizes[code, i], turns[code, i] = 1, step[1], math.radians(step[2])
+            elif step[0] == 'turn':
+                kinds[code, i], turns[code, i] = 2, math.radians(step[1])
+            else:
+                raise GeometryError(f'Unknown turtle move {step[0]!r}')
+
+    codes = np.frombuffer(program.encode('latin-1'), dtype=np.uint8)
+    per_symbol = counts[codes]
+    index = np.arange(per_symbol.sum()) - np.repeat(np.cumsum(per_symbol) - per_symbol, per_symbol)
+    codes = np.repeat(codes, per_symbol)
+    kind, size, turn = kinds[codes, index], sizes[codes, index], turns[codes, index]
+
+    # Heading before each move, then each move's displacement
+    before = math.radians(heading) + np.cumsum(turn) - turn
+    after = before + turn
+    dx = np.where(kind == 0, size * np.cos(before), size * (np.sin(after) - np.sin(before)))
+    dy = np.where(kind == 0, size * np.sin(before), size * (np.cos(before) - np.cos(after)))
+    dx[kind == 2] = dy[kind == 2] = 0
+    x = start[0] + np.cumsum(dx) - dx
+    y = start[1] + np.cumsum(dy) - dy
+
+    drawn = kind != 2
+    params = np.zeros((len(kind), 8))
+    lines = kind == 0
+    params[lines] = np.column_stack([x[lines], y[lines], (x + dx)[lines], (y + dy)[lines],
+                                     np.zeros((lines.sum(), 4))])
+    arcs = kind == 1
+    # Left turns circle a centre on the turtle's left, starting 90 degrees behind the heading
+    r = size[arcs]
+    cx = x[arcs] - r * np.sin(before[arcs])
+    cy = y[arcs] + r * np.cos(before[arcs])
+    params[arcs] = np.column_stack([r, np.zeros_like(r), cx, np.zeros_like(r), r, cy,
+                                    before[arcs] - np.pi / 2, turn[arcs]])
+    return Geometry(np.where(lines, LINE, ARC)[drawn].astype(np.int8), params[drawn],
+                    np.zeros(drawn.sum(), dtype=np.int64))
+
+
+def expand_lsystem(axiom, rules, level):
+    state = axiom
+    for _ in range(level):
+        state = ''.join(rules.get(symbol, symbol) for symbol in state)
+    return state
+
+
+def single_knot_geometry(level, step=20):
+    """The single-knot kolam of speedkollamsingleknotcsvxy.py at `level`"""
+    program = expand_lsystem('FBFBFBFB', {'A': 'AFBFA', 'B': 'AFBFBFBFA'}, level)
+    loop = step / 2 / math.sqrt(2)
+    moves = {'F': [('forward', step)],
+             'A': [('arc', step, 90)],
+             'B': [('forward', loop), ('arc', loop, 270), ('forward', loop)]}
+    return turtle_geometry(program, moves, heading=45)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sample kolam strokes at a fixed arc-length spacing')
+    parser.add_argument('svg', nargs='?', help='SVG drawing, e.g. a design saved from the web app')
+    parser.add_argument('--single-knot', type=int, metavar='LEVEL',
+                        help='Sample the single-knot L-system kolam at this level instead')
+    parser.add_argument('-o', '--output', required=True, help='Coordinate file (.kpts, .csv or .npy)')
+    parser.add_argument('--spacing', type=float, default=1.0, help='Arc length between points')
+    parser.add_argument('--round', action='store_true', help='Round to whole pixels')
+    args = parser.parse_args(argv)
+    if (args.svg is None) == (args.single_knot is None):
+        parser.error('give an SVG file or --single-knot LEVEL')
+
+    started = time.perf_counter()
+    try:
+        if args.svg:
+            with open(args.svg, 'rb') as f:
+                geometry = svg_geometry(f.read())
+        else:
+            geometry = single_knot_geometry(args.single_knot)
+        points, strokes = sample_geometry(geometry, args.spacing)
+        if args.round:
+            points = np.rint(points).astype(np.int32)
+        save_points(args.output, pd.DataFrame({'x': points[:, 0], 'y': points[:, 1], 'path': strokes}))
+    except (OSError, GeometryError, PointFileError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f'Wrote {len(points)} points along {len(geometry.kinds)} lines and curves '
+          f'({int(strokes[-1]) + 1 if len(strokes) else 0} strokes) to {args.output} '
+          f'in {time.perf_counter() - started:.2f}s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
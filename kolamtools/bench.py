@@ -0,0 +1,312 @@
+"""
+Per-stage latency, end-to-end FPS and dropped frames of the camera pipelines.
+
+Each pipeline is the processing one of the camera scripts does per frame,
+split into stages: the static overlay, the tracker's guide dot, the
+overlay anchored to the sheet, pulli detection, and YOLO object detection
+when yolov3-tiny.weights is present. A recording is replayed through the
+same threaded Pipeline the scripts use, with nothing shown. By default
+frames go as fast as they can be processed and none are dropped, which
+measures throughput. With --realtime they arrive at the recording's frame
+rate, the way a camera delivers them, and the frames processing can't keep
+up with are dropped and counted. Latency runs from the moment a frame
+leaves the capture to the end of its last stage, so it includes any time
+the frame waited in the queue.
+
+The bundled clips are synthetic and reproducible: a dark sheet with a 5x5
+pulli grid drifting over a textured floor. They are written to bench/clips
+on first use.
+
+    python -m kolamtools.bench
+    python -m kolamtools.bench --realtime --pipelines tracker anchor --clip sheet-1080p
+    python -m kolamtools.bench --clip recording.mp4 --write --json results.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from .anchor import AnchoredOverlay, plane_for
+from .arclength import sample_geometry, single_knot_geometry
+from .guide import Guide
+from .overlay import Overlay
+from .pipeline import AsyncWriter, Pipeline
+from .pulli import PulliError, detect_pulli, draw_pulli
+from .replay import ReplayCapture, ReplayError, synthetic_clip
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLIPS_DIR = os.path.join(REPO_DIR, 'bench', 'clips')
+
+# The bundled clips: frame size and number of frames
+CLIPS = {'sheet-720p': ((1280, 720), 150), 'sheet-1080p': ((1920, 1080), 150)}
+
+# The chalk in the bundled clips is brighter than this; Otsu's threshold
+# splits the textured floor instead
+PULLI_THRESHOLD = 180
+
+YOLO_WEIGHTS = os.path.join(REPO_DIR, 'yolov3-tiny.weights')
+YOLO_CONFIG = os.path.join(REPO_DIR, 'yolov3-tiny.cfg')
+
+
+class Skip(Exception):
+    """Raised by a pipeline that can't run here; the message says why"""
+
+
+def bundled_clip(name):
+    """Path of a bundled clip, written first if it isn't there yet"""
+    size, frames = CLIPS[name]
+    return synthetic_clip(os.path.join(CLIPS_DIR, name + '.mp4'), size, frames)
+
+
+def _kolam():
+    """The level 2 single-knot kolam, a point every 10 units, and the stroke of each"""
+    return sample_geometry(single_knot_geometry(2), 10)
+
+
+def _fitted_overlay(points, size):
+    """An Overlay of `points` scaled and centred to fill most of a frame of `size`"""
+    low, high = points.min(axis=0), points.max(axis=0)
+    scale = 0.8 * min(size[0] / (high[0] - low[0]), size[1] / (high[1] - low[1]))
+    offset = (size[0] / 2 - scale * (low[0] + high[0]) / 2, size[1] / 2 - scale * (low[1] + high[1]) / 2)
+    return Overlay(points, radius=4, color=(0, 0, 255), scale=scale, offset=offset)
+
+
+def overlay_stages(size, options):
+    overlay = _fitted_overlay(_kolam()[0], size)
+    return [('overlay', overlay.composite)]
+
+
+def tracker_stages(size, options):
+    points, strokes = _kolam()
+    overlay = _fitted_overlay(points, size)
+    guide = Guide(points, speed=600, strokes=strokes)
+
+    def draw_guide(frame):
+        cv2.circle(frame, overlay.pixel(guide.position()), 15, (255, 0, 0), -1)
+        return frame
+
+    return [('overlay', overlay.composite), ('guide', draw_guide)]
+
+
+def anchor_stages(size, options):
+    points, strokes = _kolam()
+    offset, plane_size = plane_for(points)
+    anchored = AnchoredOverlay(Overlay(points, 4, (0, 0, 255), offset=offset), plane_size)
+    guide = Guide(points, speed=600, strokes=strokes)
+
+    def draw_guide(frame):
+        position = anchored.pixel(guide.position())
+        if position is not None:
+            cv2.circle(frame, position, 15, (255, 0, 0), -1)
+        return frame
+
+    return [('anchor', anchored.composite), ('guide', draw_guide)]
+
+
+def pulli_stages(size, options):
+    found = {}
+
+    def detect(frame):
+        try:
+            found['grid'] = detect_pulli(frame, threshold=options.get('pulli_threshold'))
+        except PulliError:
+            found['grid'] = None
+        return frame
+
+    def draw(frame):
+        if found['grid'] is not None:
+            draw_pulli(frame, found['grid'])
+        return frame
+
+    return [('detect', detect), ('draw', draw)]
+
+
+def detection_stages(size, options):
+    if not os.path.exists(YOLO_WEIGHTS):
+        raise Skip(f'{os.path.basename(YOLO_WEIGHTS)} is not in the repository')
+    try:
+        net = cv2.dnn.readNet(YOLO_WEIGHTS, YOLO_CONFIG)
+    except cv2.error as e:
+        raise Skip(f'OpenCV cannot load the model: {str(e).strip().splitlines()[-1]}')
+    layers = net.getUnconnectedOutLayersNames()
+    width, height = size
+    found = {}
+
+    # The same blob, forward pass and box decoding as correctcodeprcappu.py
+    def infer(frame):
+        net.setInput(cv2.dnn.blobFromImage(frame, 1 / 255.0, (416, 416), swapRB=True, crop=False))
+        found['outputs'] = net.forward(layers)
+        return frame
+
+    def boxes(frame):
+        detections = np.concatenate([output.reshape(-1, output.shape[-1]) for output in found['outputs']])
+        scores = detections[:, 5:]
+        confidence = scores.max(axis=1)
+        keep = confidence > 0.5
+        centres = detections[keep, :2] * (width, height)
+        extents = detections[keep, 2:4] * (width, height)
+        corners = np.rint(np.c_[centres - extents / 2, extents]).astype(int)
+        for i in np.ravel(cv2.dnn.NMSBoxes(corners.tolist(), confidence[keep].tolist(), 0.5, 0.4)):
+            x, y, w, h = corners[i]
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        return frame
+
+    return [('infer', infer), ('boxes', boxes)]
+
+
+PIPELINES = {'overlay': overlay_stages, 'tracker': tracker_stages, 'anchor': anchor_stages,
+             'pulli': pulli_stages, 'detection': detection_stages}
+
+
+class _Stamped:
+    """A capture that notes when each frame left it, so latency includes queueing"""
+
+    def __init__(self, capture):
+        self.capture = capture
+        self.times = {}
+
+    def read(self):
+        ok, frame = self.capture.read()
+        if ok:
+            self.times[id(frame)] = time.perf_counter()
+        return ok, frame
+
+    def release(self):
+        self.capture.release()
+
+
+class _TimedWriter:
+    """A VideoWriter that records how long each write took"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.seconds = []
+
+    def write(self, frame):
+        started = time.perf_counter()
+        self.writer.write(frame)
+        self.seconds.append(time.perf_counter() - started)
+
+    def release(self):
+        self.writer.release()
+
+
+def summary(seconds):
+    """Mean, median, 95th percentile and worst of durations, in milliseconds"""
+    if not len(seconds):
+        return None
+    ms = np.asarray(seconds) * 1000
+    return {'mean_ms': round(float(ms.mean()), 3), 'p50_ms': round(float(np.percentile(ms, 50)), 3),
+            'p95_ms': round(float(np.percentile(ms, 95)), 3), 'max_ms': round(float(ms.max()), 3)}
+
+
+def run_pipeline(name, source, realtime=False, write=False, options=None):
+    """
+    Replay `source` through pipeline `name` and return its report, or a
+    report with 'skipped' set when the pipeline can't run here.
+    """
+    capture = ReplayCapture(source, realtime=realtime)
+    try:
+        stages = PIPELINES[name](capture.size, options or {})
+    except Skip as e:
+        capture.release()
+        return {'pipeline': name, 'source': str(source), 'skipped': str(e)}
+
+    timings = {stage: [] for stage, _ in stages}
+    latency = []
+    stamped = _Stamped(capture)
+
+    def process(frame):
+        born = stamped.times.pop(id(frame), None)
+        for stage, function in stages:
+            started = time.perf_counter()
+            frame = function(frame)
+            timings[stage].append(time.perf_counter() - started)
+        if born is not None:
+            latency.append(time.perf_counter() - born)
+        return frame
+
+    writer = output = None
+    if write:
+        handle, output = tempfile.mkstemp(suffix='.mp4')
+        os.close(handle)
+        writer = _TimedWriter(cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*'mp4v'), capture.fps, capture.size))
+    try:
+        stats = Pipeline(stamped, process, window=None, writer=writer and AsyncWriter(writer),
+                         latest=realtime).run()
+    finally:
+        if output is not None:
+            os.remove(output)
+
+    captured = stats['captured'] + capture.skipped
+    stage_reports = {stage: summary(seconds) for stage, seconds in timings.items()}
+    if writer is not None:
+        stage_reports['write'] = summary(writer.seconds)
+    return {'pipeline': name, 'source': str(source), 'realtime': realtime,
+            'size': list(capture.size), 'source_fps': round(capture.fps, 2),
+            'frames': stats['processed'], 'captured': captured,
+            'dropped': stats['dropped'] + capture.skipped,
+            'seconds': round(stats['seconds'], 3), 'fps': round(stats['fps'], 2),
+            'decode_ms': round(capture.decode_seconds / max(captured, 1) * 1000, 3),
+            'latency': summary(latency), 'stages': stage_reports}
+
+
+def _print_report(report):
+    if 'skipped' in report:
+        print(f"{report['pipeline']:<10} skipped: {report['skipped']}")
+        return
+    latency = report['latency'] or {'p50_ms': 0.0, 'p95_ms': 0.0}
+    print(f"{report['pipeline']:<10} {report['frames']:>6} frames  {report['dropped']:>5} dropped  "
+          f"{report['fps']:>7.1f} fps  latency p50 {latency['p50_ms']:.2f} ms, p95 {latency['p95_ms']:.2f} ms  "
+          f"(decode {report['decode_ms']:.2f} ms)")
+    for stage, timing in report['stages'].items():
+        if timing is not None:
+            print(f"{'':<12}{stage:<10} mean {timing['mean_ms']:>8.3f}  p50 {timing['p50_ms']:>8.3f}  "
+                  f"p95 {timing['p95_ms']:>8.3f}  max {timing['max_ms']:>8.3f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the camera pipelines on recorded or bundled clips')
+    parser.add_argument('--clip', action='append',
+                        help=f'Bundled clip ({", ".join(CLIPS)}), video file or image folder; '
+                             'may be repeated (default: sheet-720p)')
+    parser.add_argument('--pipelines', nargs='+', choices=list(PIPELINES), default=list(PIPELINES))
+    parser.add_argument('--realtime', action='store_true',
+                        help="Deliver frames at the clip's frame rate, dropping those processing misses")
+    parser.add_argument('--write', action='store_true', help='Also encode the output, as the recording scripts do')
+    parser.add_argument('--pulli-threshold', type=int,
+                        help=f'Gray level of the dots (default: {PULLI_THRESHOLD} for bundled clips, else Otsu)')
+    parser.add_argument('--json', help='Write the reports to this JSON file')
+    args = parser.parse_args(argv)
+
+    reports = []
+    for clip in args.clip or ['sheet-720p']:
+        bundled = clip in CLIPS
+        source = bundled_clip(clip) if bundled else clip
+        threshold = args.pulli_threshold
+        if threshold is None and bundled:
+            threshold = PULLI_THRESHOLD
+        print(f'{clip}:')
+        for name in args.pipelines:
+            try:
+                report = run_pipeline(name, source, args.realtime, args.write, {'pulli_threshold': threshold})
+            except ReplayError as e:
+                print(f'Error: {e}', file=sys.stderr)
+                return 1
+            _print_report(report)
+            reports.append(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f'Wrote {args.json}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
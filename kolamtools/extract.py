@@ -0,0 +1,166 @@
+"""
+Batch pixel-to-coordinate extractor.
+
+Replaces the per-pixel loops of blackandwhitetocsvcorrectcode.py and
+correctcsvoutblackcsvxy.py: stroke pixels are found with a NumPy mask, the
+coordinates are written in one go, and files are processed in parallel
+worker processes.
+
+    python -m kolamtools.extract scans/ -o coords/ --color white
+    python -m kolamtools.extract "photos/*.png" -o coords/ --max-points 10000 --sample random
+    python -m kolamtools.extract scans/ -o coords/ --sample blue-noise --spacing 4
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from .paths import order_points
+from .pointfile import POINT_FORMATS, save_points
+from .sampling import blue_noise_sample
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp')
+SAMPLE_MODES = ('first', 'random', 'blue-noise')
+
+
+def find_images(inputs):
+    """Image paths from files, directories and glob patterns, in a stable order"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.extend(os.path.join(root, name) for name in files
+                             if name.lower().endswith(IMAGE_EXTENSIONS))
+        elif os.path.isfile(item):
+            paths.append(item)
+        else:
+            paths.extend(path for path in glob.glob(item, recursive=True)
+                         if path.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(dict.fromkeys(paths))
+
+
+def stroke_mask(gray, color='white', threshold=127):
+    """Pixels of the strokes: brighter than `threshold` for white, at or below it for black"""
+    return gray > threshold if color == 'white' else gray <= threshold
+
+
+def limit_points(points, max_points=None, sample='first', seed=None, spacing=None):
+    """
+    Reduce points to at most `max_points`: the first in scan order, a random
+    subset, or with sample='blue-noise' points at least `spacing` apart (or
+    the widest spacing that fits `max_points`).
+    """
+    if sample == 'blue-noise' and (spacing or max_points is not None):
+        return points[blue_noise_sample(points, spacing, max_points, seed=seed)]
+    if max_points is not None and len(points) > max_points:
+        if sample == 'random':
+            rng = np.random.default_rng(seed)
+            points = points[np.sort(rng.choice(len(points), max_points, replace=False))]
+        else:
+            points = points[:max_points]
+    return points
+
+
+def extract_points(gray, color='white', threshold=127, max_points=None, sample='first', seed=None,
+                   spacing=None):
+    """(N, 2) int32 array of x, y stroke pixel coordinates in row-major order, limited as in limit_points"""
+    ys, xs = np.nonzero(stroke_mask(gray, color, threshold))
+    points = np.column_stack([xs, ys]).astype(np.int32)
+    return limit_points(points, max_points, sample, seed, spacing)
+
+
+def output_path(image_path, output_dir, fmt):
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    return os.path.join(output_dir, f'{stem}.{fmt}')
+
+
+def _process(job):
+    image_path, destination, options, ordered = job
+    started = time.perf_counter()
+    gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return image_path, None, 0.0
+    points = extract_points(gray, **options)
+    if ordered:
+        points = points[order_points(points)[0]]
+    save_points(destination, points)
+    return image_path, len(points), time.perf_counter() - started
+
+
+def _init_worker():
+    # One OpenCV thread per worker process; parallelism comes from the pool
+    cv2.setNumThreads(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Extract stroke pixel coordinates from images')
+    parser.add_argument('inputs', nargs='+', help='Image files, directories or glob patterns')
+    parser.add_argument('-o', '--output-dir', default='.', help='Directory for the coordinate files')
+    parser.add_argument('--color', choices=('white', 'black'), default='white',
+                        help='Colour of the strokes in the image')
+    parser.add_argument('--threshold', type=int, default=127,
+                        help='Gray level separating strokes from background')
+    parser.add_argument('--max-points', type=int, help='Limit the points per image')
+    parser.add_argument('--sample', choices=SAMPLE_MODES, default='first',
+                        help='Which points to keep when limiting: the first in scan order, random, '
+                             'or evenly spread along the strokes (blue-noise)')
+    parser.add_argument('--spacing', type=float,
+                        help='Minimum distance in pixels between blue-noise points')
+    parser.add_argument('--seed', type=int, help='Seed for random sampling')
+    parser.add_argument('--order', action='store_true',
+                        help='Reorder the points along the strokes instead of scan order')
+    parser.add_argument('--format', choices=POINT_FORMATS, default='kpts',
+                        help='Output format: compact binary .kpts (default), .csv or .npy')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help='Worker processes (default: one per CPU)')
+    args = parser.parse_args(argv)
+
+    images = find_images(args.inputs)
+    if not images:
+        parser.error('no images found')
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    destinations = [output_path(path, args.output_dir, args.format) for path in images]
+    if len(set(destinations)) != len(destinations):
+        parser.error('several images share a file name; split them across runs or output directories')
+
+    if args.spacing and args.sample != 'blue-noise':
+        parser.error('--spacing needs --sample blue-noise')
+
+    options = {'color': args.color, 'threshold': args.threshold, 'max_points': args.max_points,
+               'sample': args.sample, 'seed': args.seed, 'spacing': args.spacing}
+    jobs = [(path, destination, options, args.order) for path, destination in zip(images, destinations)]
+
+    started = time.perf_counter()
+    total_points, failed = 0, []
+    if args.workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+            results = pool.map(_process, jobs, chunksize=max(1, len(jobs) // (args.workers * 4)))
+            for image_path, count, _ in results:
+                if count is None:
+                    failed.append(image_path)
+                else:
+                    total_points += count
+    else:
+        for job in jobs:
+            image_path, count, _ = _process(job)
+            if count is None:
+                failed.append(image_path)
+            else:
+                total_points += count
+
+    elapsed = time.perf_counter() - started
+    print(f'Extracted {total_points} coordinates from {len(jobs) - len(failed)} images '
+          f'into {args.output_dir} in {elapsed:.2f}s')
+    for path in failed:
+        print(f'Could not read {path}', file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Guide dot moving along a kolam at a steady speed in wall-clock time.
+
+The trackers advanced the guide by a fixed number of rows per frame, or
+spread each step over a fixed number of frames. Its speed on screen
+therefore depended on the frame rate and on how densely the path was
+sampled, and it stuttered whenever frames were dropped. A Guide measures
+the path once: the cumulative arc length at every point, the curvature
+over a short window of arc length, and from those the time at which the
+dot reaches each point. The dot slows down on tight curves. Each frame
+then asks where the dot is at the current time, one binary search, so the
+cost per frame doesn't grow with the path and a dropped frame only means
+the dot is drawn a little further on.
+
+    guide = Guide(points, speed=300)
+    while True:
+        ret, frame = cap.read()
+        x, y = guide.position()
+        cv2.circle(frame, (int(x), int(y)), 15, (255, 0, 0), -1)
+"""
+import time
+
+import numpy as np
+
+# Speed along the path, in point units (usually pixels) per second
+DEFAULT_SPEED = 300.0
+
+# Arc length either side of a point over which its curvature is measured
+CURVATURE_WINDOW = 10.0
+
+# On a curve of this radius the dot moves at half speed
+COMFORT_RADIUS = 20.0
+
+# The dot never drops below this fraction of its speed
+MIN_SPEED_FACTOR = 0.25
+
+
+class GuideError(ValueError):
+    """Raised for paths a guide can't follow"""
+
+
+def curvature(points, distance, strokes=None, window=CURVATURE_WINDOW):
+    """
+    Unsigned curvature at every point: the turn between the chords reaching
+    `window` of arc length back and ahead, divided by their mean length.
+    `distance` is the cumulative arc length; windows stop at stroke ends.
+    """
+    n = len(points)
+    back = np.searchsorted(distance, distance - window, side='left')
+    ahead = np.searchsorted(distance, distance + window, side='right') - 1
+    if strokes is not None:
+        first = np.flatnonzero(np.r_[True, strokes[1:] != strokes[:-1]])
+        last = np.r_[first[1:], n] - 1
+        stroke = np.cumsum(np.r_[True, strokes[1:] != strokes[:-1]]) - 1
+        back = np.maximum(back, first[stroke])
+        ahead = np.minimum(ahead, last[stroke])
+    incoming = points - points[back]
+    outgoing = points[ahead] - points
+    turn = np.abs(np.arctan2(incoming[:, 0] * outgoing[:, 1] - incoming[:, 1] * outgoing[:, 0],
+                             (incoming * outgoing).sum(axis=1)))
+    span = (np.hypot(*incoming.T) + np.hypot(*outgoing.T)) / 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(span > 0, turn / span, 0.0)
+
+
+class Guide:
+    """
+    A dot that follows `points` ((N, 2), in drawing order) at `speed` units
+    a second of `clock` time, slowing on curves tighter than
+    `comfort_radius`. `strokes` numbers the stroke of each point; the dot
+    jumps between strokes without spending time. With `loop` it starts
+    over at the end, otherwise it stops there.
+    """
+
+    def __init__(self, points, speed=DEFAULT_SPEED, strokes=None, comfort_radius=COMFORT_RADIUS,
+                 min_speed_factor=MIN_SPEED_FACTOR, window=CURVATURE_WINDOW, loop=True, clock=time.perf_counter):
+        points = points.to_numpy() if hasattr(points, 'to_numpy') else points
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if not len(self.points):
+            raise GuideError('A guide needs at least one point')
+        if speed <= 0:
+            raise GuideError('speed must be positive')
+        if strokes is not None:
+            strokes = np.asarray(strokes).ravel()
+        self.loop = loop
+        self.clock = clock
+
+        steps = np.hypot(*np.diff(self.points, axis=0).T)
+        if strokes is not None:
+            steps[strokes[1:] != strokes[:-1]] = 0
+        self.distance = np.r_[0.0, np.cumsum(steps)]
+        bends = curvature(self.points, self.distance, strokes, window)
+        factor = np.maximum(min_speed_factor, 1 / (1 + bends * comfort_radius))
+        # Each step is taken at the slower of its two ends
+        step_factor = np.minimum(factor[:-1], factor[1:])
+        self.times = np.r_[0.0, np.cumsum(steps / (speed * step_factor))]
+        self.duration = float(self.times[-1])
+
+        self.rate = 1.0
+        self.paused = False
+        self._started = clock()
+        self._elapsed = 0.0
+
+    def elapsed(self, now=None):
+        """Path time reached, in seconds at the base speed"""
+        if self.paused:
+            return self._elapsed
+        now = self.clock() if now is None else now
+        return self._elapsed + (now - self._started) * self.rate
+
+    def _restart(self, elapsed):
+        self._elapsed = elapsed
+        self._started = self.clock()
+
+    def _wrapped(self, elapsed):
+        if self.duration <= 0:
+            return 0.0
+        return elapsed % self.duration if self.loop else min(max(elapsed, 0.0), self.duration)
+
+    def point_index(self, now=None):
+        """Index of the last point the dot has passed"""
+        if len(self.points) < 2:
+            return 0
+        index = np.searchsorted(self.times, self._wrapped(self.elapsed(now)), side='right') - 1
+        return int(min(max(index, 0), len(self.points) - 2))
+
+    def position(self, now=None):
+        """The dot's (x, y) now, or at clock time `now`"""
+        if len(self.points) < 2:
+            return float(self.points[0, 0]), float(self.points[0, 1])
+        elapsed = self._wrapped(self.elapsed(now))
+        i = int(min(max(np.searchsorted(self.times, elapsed, side='right') - 1, 0), len(self.points) - 2))
+        span = self.times[i + 1] - self.times[i]
+        fraction = (elapsed - self.times[i]) / span if span > 0 else 1.0
+        x0, y0 = self.points[i]
+        x1, y1 = self.points[i + 1]
+        return float(x0 + fraction * (x1 - x0)), float(y0 + fraction * (y1 - y0))
+
+    def set_rate(self, rate):
+        """Play faster (rate > 1) or slower, carrying on from where the dot is"""
+        self._restart(self.elapsed())
+        self.rate = max(float(rate), 0.0)
+
+    def pause(self):
+        if not self.paused:
+            self._elapsed = self.elapsed()
+            self.paused = True
+
+    def resume(self):
+        if self.paused:
+            self.paused = False
+            self._started = self.clock()
+
+    def seek(self, distance):
+        """Move the dot to `distance` along the path"""
+        self._restart(float(np.interp(distance, self.distance, self.times)))
+
+    def seek_point(self, index):
+        """Move the dot to point `index`, wrapping round the path"""
+        self._restart(float(self.times[index % len(self.points)]))
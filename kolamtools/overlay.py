@@ -0,0 +1,110 @@
+"""
+Kolam points drawn once as an overlay layer and composited onto every frame.
+
+The camera trackers used to call cv2.circle for every coordinate on every
+frame, 5k-10k calls that held them to a few frames a second. An Overlay
+renders the static points once into a colour layer and mask cropped to the
+kolam's bounding box. Each frame is then a single masked copy, and only the
+moving guide dot is drawn per frame. The layer is rendered again only when
+the points, the view (scale and offset) or the frame size change.
+
+    overlay = Overlay(load_points('output.kpts'), radius=10, color=(0, 0, 255))
+    while True:
+        ret, frame = cap.read()
+        overlay.composite(frame)
+        cv2.circle(frame, guide, 15, (255, 0, 0), -1)
+"""
+import cv2
+import numpy as np
+
+
+class Overlay:
+    """
+    Circles of `radius` and `color` (BGR) at every point, drawn with
+    `thickness` (-1 fills them) after scaling by `scale` and moving by
+    `offset`. With `opacity` below 1 the layer is blended over the frame.
+    """
+
+    def __init__(self, points, radius=10, color=(0, 0, 255), thickness=-1, scale=1.0, offset=(0, 0),
+                 opacity=1.0):
+        self.radius = radius
+        self.color = tuple(int(channel) for channel in color)
+        self.thickness = thickness
+        self.opacity = opacity
+        self.scale = scale
+        self.offset = tuple(offset)
+        self.set_points(points)
+
+    def set_points(self, points):
+        """Replace the kolam points; the layer is rendered again on the next frame"""
+        points = points.to_numpy() if hasattr(points, 'to_numpy') else points
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self._shape = None
+
+    def set_view(self, scale=None, offset=None):
+        """Change the scale or offset, rendering again only if either differs"""
+        scale = self.scale if scale is None else scale
+        offset = self.offset if offset is None else tuple(offset)
+        if scale != self.scale or offset != self.offset:
+            self.scale, self.offset = scale, offset
+            self._shape = None
+
+    def pixel(self, point):
+        """Integer frame position of one kolam point under the current view, e.g. for the guide dot"""
+        return (int(round(point[0] * self.scale + self.offset[0])),
+                int(round(point[1] * self.scale + self.offset[1])))
+
+    def _render(self, shape):
+        height, width = shape
+        self._shape = shape
+        self._box = None
+        if not len(self.points):
+            return
+        pixels = np.rint(self.points * self.scale + np.asarray(self.offset)).astype(np.int64)
+        # Many points round onto the same pixel; each is drawn once
+        pixels = np.unique(pixels, axis=0)
+        reach = self.radius + max(self.thickness, 1)
+        inside = ((pixels[:, 0] > -reach) & (pixels[:, 0] < width + reach)
+                  & (pixels[:, 1] > -reach) & (pixels[:, 1] < height + reach))
+        pixels = pixels[inside]
+        if not len(pixels):
+            return
+
+        x0, y0 = np.maximum(pixels.min(axis=0) - reach, 0)
+        x1 = min(int(pixels[:, 0].max()) + reach + 1, width)
+        y1 = min(int(pixels[:, 1].max()) + reach + 1, height)
+        layer = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        for x, y in (pixels - (x0, y0)).tolist():
+            cv2.circle(layer, (x, y), self.radius, self.color, self.thickness)
+            cv2.circle(mask, (x, y), self.radius, 255, self.thickness)
+        self._box = (int(y0), int(y1), int(x0), int(x1))
+        self._layer = layer
+        self._mask = mask
+
+    def layer(self, shape):
+        """(box, layer, mask) rendered for a (height, width) canvas, where `box`
+        is (y0, y1, x0, x1) or None when nothing lands on it"""
+        if self._shape != shape:
+            self._render(shape)
+        if self._box is None:
+            return None, None, None
+        return self._box, self._layer, self._mask
+
+    def composite(self, frame):
+        """Draw the overlay onto a BGR frame in place and return it"""
+        box, layer, mask = self.layer(frame.shape[:2])
+        if box is None:
+            return frame
+        return blend(frame, box, layer, mask, self.opacity)
+
+
+def blend(frame, box, layer, mask, opacity=1.0):
+    """Copy `layer` through `mask` onto the `box` (y0, y1, x0, x1) of a frame, in place"""
+    y0, y1, x0, x1 = box
+    region = frame[y0:y1, x0:x1]
+    if opacity < 1:
+        layer = cv2.addWeighted(region, 1 - opacity, layer, opacity, 0)
+    # Writes through the view into the frame
+    cv2.copyTo(layer, mask, region)
+    return frame
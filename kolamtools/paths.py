@@ -0,0 +1,308 @@
+"""
+Ordering point clouds into continuous drawing paths.
+
+Exported coordinates come out in raster order, or in no order at all after
+sampling, so a guide dot stepping through the rows jumps across the frame.
+order_points chains the points into paths instead: a path grows from its
+end to the nearest unvisited point, then from its start once the end is
+stuck, and when no point is within `max_jump` the next path begins at the
+unvisited point nearest to where the last one stopped. A windowed 2-opt pass
+then straightens the short back-and-forth detours a greedy chain leaves.
+
+Candidates come from a uniform grid. The nearest neighbours of every point
+among the 3x3 cells around it are found up front in vectorized passes, so
+the chain mostly walks short lists and only searches the remaining points
+when all of a point's neighbours are taken.
+
+    python -m kolamtools.paths output_coordinates.kpts -o output.kpts
+    python -m kolamtools.paths scan.csv -o scan.kpts --max-jump 12
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from .pointfile import PointFileError, load_points, save_points
+
+# Nearest neighbours kept per point for the chain
+NEIGHBOURS = 8
+
+# Grid cells are shrunk until almost every point shares its cell with at
+# most this many others
+MAX_CELL_POINTS = 4
+
+# Default largest step within a path, in multiples of the median distance
+# between neighbouring points
+JUMP_FACTOR = 3.0
+
+# 2-opt reverses runs of up to this many points, for at most this many rounds
+TWO_OPT_WINDOW = 16
+TWO_OPT_ROUNDS = 10
+
+# Points per block when finding neighbours, to bound memory
+_BLOCK_POINTS = 1 << 16
+
+_BLOCK_OFFSETS = np.array([(dx, dy) for dx in range(-1, 2) for dy in range(-1, 2)])
+
+
+def _cell_size(points):
+    """Grid spacing starting from the even-spread guess and halved while
+    too many points crowd into shared cells"""
+    extent = np.ptp(points, axis=0) + 1
+    cell = float(np.sqrt(extent[0] * extent[1] / len(points)))
+    for _ in range(8):
+        cells = np.floor((points - points.min(axis=0)) / cell).astype(np.int64)
+        _, inverse, counts = np.unique(cells[:, 0] * (int(cells[:, 1].max()) + 1) + cells[:, 1],
+                                       return_inverse=True, return_counts=True)
+        if np.percentile(counts[inverse], 90) <= MAX_CELL_POINTS:
+            break
+        cell /= 2
+    return cell
+
+
+def nearest_neighbours(points, k=NEIGHBOURS):
+    """
+    (N, k) indices of each point's nearest other points among the 3x3 grid
+    cells around it, closest first and padded with -1, and their distances
+    (inf where padded).
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+    cell = _cell_size(points)
+    cells = np.floor((points - points.min(axis=0)) / cell).astype(np.int64)
+    span = int(cells[:, 1].max()) + 3
+    keys = (cells[:, 0] + 1) * span + cells[:, 1] + 1
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    first = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    cell_keys = sorted_keys[first]
+    counts = np.diff(np.r_[first, n])
+    slots = int(min(counts.max(), MAX_CELL_POINTS * 2))
+    offsets = _BLOCK_OFFSETS[:, 0] * span + _BLOCK_OFFSETS[:, 1]
+
+    indices = np.full((n, k), -1, dtype=np.int64)
+    distances = np.full((n, k), np.inf)
+    for start in range(0, n, _BLOCK_POINTS):
+        block = np.arange(start, min(start + _BLOCK_POINTS, n))
+        nearby_keys = keys[block, None] + offsets
+        nearby = np.searchsorted(cell_keys, nearby_keys).clip(max=len(cell_keys) - 1)
+        found = cell_keys[nearby] == nearby_keys
+        # Every slot of every neighbouring cell, -1 where the cell is shorter
+        candidates = np.full((len(block), len(offsets), slots), -1, dtype=np.int64)
+        for slot in range(slots):
+            filled = found & (counts[nearby] > slot)
+            candidates[:, :, slot][filled] = order[first[nearby[filled]] + slot]
+        candidates = candidates.reshape(len(block), -1)
+        valid = (candidates >= 0) & (candidates != block[:, None])
+        delta = points[candidates] - points[block, None]
+        squared = np.where(valid, np.einsum('ijk,ijk->ij', delta, delta), np.inf)
+        take = min(k, squared.shape[1])
+        closest = np.argpartition(squared, take - 1, axis=1)[:, :take]
+        closest_squared = np.take_along_axis(squared, closest, axis=1)
+        rank = np.argsort(closest_squared, axis=1)
+        closest = np.take_along_axis(closest, rank, axis=1)
+        closest_squared = np.take_along_axis(closest_squared, rank, axis=1)
+        padded = ~np.isfinite(closest_squared)
+        indices[block, :take] = np.where(padded, -1, np.take_along_axis(candidates, closest, axis=1))
+        distances[block, :take] = np.sqrt(closest_squared)
+    return indices, distances
+
+
+class _Remaining:
+    """
+    Points not yet placed on a path, bucketed into a coarse grid with a count
+    of the unplaced points in each cell. The nearest of them to a position is
+    found by growing a window of cells until one is occupied, then measuring
+    only the points in the cells that could hold something closer.
+    """
+
+    def __init__(self, points, cell):
+        self.points = points
+        self.cell = cell
+        self.origin = points.min(axis=0)
+        cells = np.floor((points - self.origin) / cell).astype(np.int64)
+        self.shape = (int(cells[:, 0].max()) + 1, int(cells[:, 1].max()) + 1)
+        flat = cells[:, 0] * self.shape[1] + cells[:, 1]
+        self.order = np.argsort(flat, kind='stable')
+        self.starts = np.searchsorted(flat[self.order], np.arange(self.shape[0] * self.shape[1] + 1))
+        self.counts = np.diff(self.starts).reshape(self.shape)
+        self.cells = cells.tolist()
+        self.taken = np.zeros(len(points), dtype=bool)
+
+    def take(self, index):
+        self.taken[index] = True
+        cx, cy = self.cells[index]
+        self.counts[cx, cy] -= 1
+
+    def _window(self, cx, cy, radius):
+        x0, y0 = max(cx - radius, 0), max(cy - radius, 0)
+        return x0, y0, self.counts[x0:cx + radius + 1, y0:cy + radius + 1]
+
+    def nearest(self, index):
+        """Nearest unplaced point to point `index` and its distance, or (None, inf)"""
+        cx, cy = self.cells[index]
+        radius = 1
+        while not self._window(cx, cy, radius)[2].any():
+            if radius > max(self.shape):
+                return None, np.inf
+            radius *= 2
+        # Whatever was found lies within (radius + 1) cells on each axis
+        reach = int(np.ceil((radius + 1) * np.sqrt(2)))
+        x0, y0, window = self._window(cx, cy, reach)
+        wx, wy = np.nonzero(window)
+        flat = (wx + x0) * self.shape[1] + wy + y0
+        lengths = self.starts[flat + 1] - self.starts[flat]
+        runs = np.repeat(self.starts[flat] - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        near = self.order[runs]
+        near = near[~self.taken[near]]
+        delta = self.points[near] - self.points[index]
+        squared = np.einsum('ij,ij->i', delta, delta)
+        best = int(np.argmin(squared))
+        return int(near[best]), float(np.sqrt(squared[best]))
+
+
+def _chain(points, neighbours, max_jump, cell, start=0):
+    """Greedy nearest-neighbour paths as (order, path number of each point)"""
+    n = len(points)
+    x_list, y_list = points[:, 0].tolist(), points[:, 1].tolist()
+    candidates = neighbours.tolist()
+    visited = bytearray(n)
+    remaining = _Remaining(points, cell)
+    order, path_ids = [], []
+
+    def nearest(p):
+        for q in candidates[p]:
+            if q < 0:
+                break
+            if not visited[q]:
+                return q, ((x_list[q] - x_list[p]) ** 2 + (y_list[q] - y_list[p]) ** 2) ** 0.5
+        # All neighbours placed already
+        return remaining.nearest(p)
+
+    paths = 0
+    while start is not None:
+        path = [start]
+        visited[start] = 1
+        remaining.take(start)
+        forward = True
+        while True:
+            q, distance = nearest(path[-1])
+            if q is None or distance > max_jump:
+                if forward:
+                    # Grow the other way from where the path started
+                    path.reverse()
+                    forward = False
+                    continue
+                break
+            path.append(q)
+            visited[q] = 1
+            remaining.take(q)
+        path_ids.extend([paths] * len(path))
+        order.extend(path)
+        paths += 1
+        start = q
+    return np.array(order, dtype=np.int64), np.array(path_ids, dtype=np.int64)
+
+
+def _two_opt(points, order, path_ids, window=TWO_OPT_WINDOW, rounds=TWO_OPT_ROUNDS):
+    """Reverse runs of up to `window` points wherever that shortens a path;
+    runs never cross from one path into the next"""
+    order = order.copy()
+    n = len(order)
+    # A reversal needs two edges with a point between them
+    if n < 4:
+        return order
+    for _ in range(rounds):
+        placed = points[order]
+        edges = np.hypot(*(placed[1:] - placed[:-1]).T)
+        moves = []
+        for span in range(2, min(window, n - 2) + 1):
+            i = np.arange(n - 1 - span)
+            j = i + span
+            gain = (edges[i] + edges[j]
+                    - np.hypot(*(placed[j] - placed[i]).T)
+                    - np.hypot(*(placed[j + 1] - placed[i + 1]).T))
+            better = np.flatnonzero((gain > 1e-9) & (path_ids[i] == path_ids[j + 1]))
+            moves.append((gain[better], i[better], j[better]))
+        if not moves:
+            break
+        gains = np.concatenate([gain for gain, _, _ in moves])
+        if not len(gains):
+            break
+        starts = np.concatenate([i for _, i, _ in moves])
+        ends = np.concatenate([j for _, _, j in moves])
+        # Best moves first, skipping any that touch a run already reversed
+        busy = bytearray(n)
+        for m in np.argsort(-gains, kind='stable').tolist():
+            i, j = int(starts[m]), int(ends[m])
+            if any(busy[i:j + 2]):
+                continue
+            busy[i:j + 2] = b'\x01' * (j + 2 - i)
+            order[i + 1:j + 1] = order[i + 1:j + 1][::-1]
+    return order
+
+
+def order_points(points, max_jump=None, improve=True, window=TWO_OPT_WINDOW):
+    """
+    Order (N, 2) points into continuous paths. Returns the indices of the
+    points in drawing order and the path number of each of them; a new path
+    starts wherever the nearest remaining point is more than `max_jump`
+    away (default JUMP_FACTOR times the median neighbour distance).
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) < 3:
+        return np.arange(len(points)), np.zeros(len(points), dtype=np.int64)
+    neighbours, distances = nearest_neighbours(points)
+    spacing = distances[:, 0][np.isfinite(distances[:, 0])]
+    # Stacked duplicates can leave no spacing to go by
+    spacing = float(np.median(spacing)) if len(spacing) else 0.0
+    spacing = spacing or 1.0
+    if max_jump is None:
+        max_jump = JUMP_FACTOR * spacing
+    order, path_ids = _chain(points, neighbours, max_jump, JUMP_FACTOR * spacing)
+    if improve:
+        order = _two_opt(points, order, path_ids, window)
+    return order, path_ids
+
+
+def travel(points):
+    """Total distance from each point to the next, in the given order"""
+    points = np.asarray(points, dtype=np.float64)
+    return float(np.hypot(*np.diff(points, axis=0).T).sum()) if len(points) > 1 else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Reorder coordinates into continuous paths for guide dots and pen plotting')
+    parser.add_argument('source', help='Coordinate file (.kpts, .csv or .npy)')
+    parser.add_argument('-o', '--output', required=True,
+                        help='Ordered coordinate file; .kpts and .csv also get a path column')
+    parser.add_argument('--max-jump', type=float,
+                        help=f'Longest step within a path in pixels (default: {JUMP_FACTOR:g}x the '
+                             'typical point spacing)')
+    parser.add_argument('--window', type=int, default=TWO_OPT_WINDOW,
+                        help='Longest run of points 2-opt may reverse')
+    parser.add_argument('--no-improve', action='store_true', help='Skip the 2-opt pass')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        frame = load_points(args.source)
+    except (OSError, PointFileError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    points = frame.to_numpy()
+    order, path_ids = order_points(points, args.max_jump, not args.no_improve, args.window)
+    ordered = points[order]
+    save_points(args.output, pd.DataFrame({'x': ordered[:, 0], 'y': ordered[:, 1], 'path': path_ids}))
+    paths = int(path_ids[-1]) + 1 if len(path_ids) else 0
+    print(f'Ordered {len(points)} points into {paths} paths in {time.perf_counter() - started:.2f}s; '
+          f'travel {travel(points):.0f} -> {travel(ordered):.0f} px')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+Camera capture, processing and output on separate threads.
+
+The camera scripts used to read, draw, show, write and poll the keyboard
+one after another in a single loop, so any slow stage held up capture and
+frames queued up in the driver, adding lag that grew the longer a script
+ran. Here capture, processing and writing each run on their own thread,
+connected by bounded queues. Capture keeps only the newest frame, so
+processing always sees the present and the frames it can't keep up with
+are dropped and counted. Frames to be recorded are written to disk by a
+background thread. Display and key handling stay on the calling thread,
+which is where cv2.imshow has to run. OpenCV releases the GIL while it
+reads, encodes and draws, so threads are enough to overlap the stages.
+
+    def process(frame):
+        overlay.composite(frame)
+        return frame
+
+    writer = AsyncWriter(cv2.VideoWriter('output.mp4', fourcc, fps, size))
+    Pipeline(cv2.VideoCapture(0), process, writer=writer).run(on_key)
+"""
+import threading
+import time
+from collections import deque
+
+import cv2
+
+# Frames waiting to be written before the writer makes processing wait
+WRITE_QUEUE = 64
+
+# Frames buffered between capture and processing when no frame may be dropped
+LOSSLESS_QUEUE = 8
+
+
+class FrameQueue:
+    """
+    A bounded queue between two threads. When full, `put` either drops the
+    oldest waiting frame (`drop_oldest`) or waits for room. After `close`,
+    `get` drains what is left and then returns None.
+    """
+
+    def __init__(self, maxsize=1, drop_oldest=True):
+        self.maxsize = maxsize
+        self.drop_oldest = drop_oldest
+        self.dropped = 0
+        self.closed = False
+        self._items = deque()
+        self._condition = threading.Condition()
+
+    def put(self, item):
+        with self._condition:
+            while len(self._items) >= self.maxsize and not self.drop_oldest and not self.closed:
+                self._condition.wait()
+            if self.closed:
+                return
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._condition.notify_all()
+
+    def get(self, timeout=None):
+        """The next item, or None once closed and empty or after `timeout` seconds"""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._items or self.closed, timeout):
+                return None
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._condition.notify_all()
+            return item
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class ThreadedCapture:
+    """
+    Reads a cv2.VideoCapture, or anything with read() and release(), on a
+    background thread. With `latest` only the newest frame is kept, which
+    suits live cameras; otherwise capture waits for processing, so recorded
+    videos lose no frames. `read` works like VideoCapture.read.
+    """
+
+    def __init__(self, capture, latest=True):
+        self.capture = capture
+        self.frames = FrameQueue(1, drop_oldest=True) if latest else FrameQueue(LOSSLESS_QUEUE, drop_oldest=False)
+        self.captured = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='capture', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                ok, frame = self.capture.read()
+                if not ok:
+                    break
+                self.captured += 1
+                self.frames.put(frame)
+        finally:
+            self.frames.close()
+
+    @property
+    def dropped(self):
+        return self.frames.dropped
+
+    def read(self, timeout=None):
+        frame = self.frames.get(timeout)
+        return frame is not None, frame
+
+    def release(self):
+        self._stop.set()
+        self.frames.close()
+        self._thread.join()
+        self.capture.release()
+
+
+class AsyncWriter:
+    """
+    Writes frames to a cv2.VideoWriter, or anything with write() and
+    release(), on a background thread. `write` returns at once unless
+    `maxsize` frames are already waiting, so no frame is lost.
+    """
+
+    def __init__(self, writer, maxsize=WRITE_QUEUE):
+        self.writer = writer
+        self.written = 0
+        self.frames = FrameQueue(maxsize, drop_oldest=False)
+        self._thread = threading.Thread(target=self._run, name='writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            frame = self.frames.get()
+            if frame is None:
+                break
+            self.writer.write(frame)
+            self.written += 1
+
+    def write(self, frame):
+        self.frames.put(frame)
+
+    def release(self):
+        """Finish writing the frames still queued, then release the writer"""
+        self.frames.close()
+        self._thread.join()
+        self.writer.release()
+
+
+class Pipeline:
+    """
+    Frames from `capture` are passed to `process(frame)` on a processing
+    thread; whatever it returns (None skips the frame) is shown in `window`
+    and handed to `writer`. With `window` None nothing is shown and `run`
+    just waits for the capture to end.
+    """
+
+    def __init__(self, capture, process, window='Video Stream', writer=None, latest=True):
+        self.capture = capture if isinstance(capture, ThreadedCapture) else ThreadedCapture(capture, latest)
+        self.process = process
+        self.window = window
+        self.writer = writer
+        self.processed = 0
+        self.shown = 0
+        # Display only ever wants the newest processed frame
+        self._outputs = FrameQueue(1, drop_oldest=True)
+        self._stop = threading.Event()
+        self._error = None
+
+    def _run_processing(self):
+        try:
+            while not self._stop.is_set():
+                ok, frame = self.capture.read(timeout=0.1)
+                if not ok:
+                    if self.capture.frames.closed:
+                        break
+                    continue
+                result = self.process(frame)
+                self.processed += 1
+                if result is None:
+                    continue
+                if self.writer is not None:
+                    self.writer.write(result)
+                if self.window is not None:
+                    self._outputs.put(result)
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._outputs.close()
+
+    def run(self, on_key=None, quit_key='q'):
+        """
+        Run until the capture ends or `quit_key` is pressed. Every other key
+        press is passed to `on_key(key)`; returning False from it also stops.
+        Returns the pipeline's stats.
+        """
+        started = time.perf_counter()
+        worker = threading.Thread(target=self._run_processing, name='process', daemon=True)
+        worker.start()
+        try:
+            while True:
+                if self.window is None:
+                    worker.join(0.1)
+                    if not worker.is_alive():
+                        break
+                    continue
+                frame = self._outputs.get(timeout=0.1)
+                if frame is None:
+                    if self._outputs.closed:
+                        break
+                    key = cv2.waitKey(1) & 0xFF
+                else:
+                    cv2.imshow(self.window, frame)
+                    self.shown += 1
+                    key = cv2.waitKey(1) & 0xFF
+                if key == 0xFF:
+                    continue
+                if key == ord(quit_key):
+                    break
+                if on_key is not None and on_key(key) is False:
+                    break
+        finally:
+            self._stop.set()
+            self.capture.release()
+            worker.join()
+            if self.writer is not None:
+                self.writer.release()
+        if self._error is not None:
+            raise self._error
+        return self.stats(time.perf_counter() - started)
+
+    def stats(self, elapsed):
+        return {'captured': self.capture.captured, 'dropped': self.capture.dropped, 'processed': self.processed,
+                'shown': self.shown, 'seconds': elapsed,
+                'fps': self.processed / elapsed if elapsed > 0 else 0.0}
@@ -0,0 +1,358 @@
+"""
+Compact binary coordinate files (.kpts) that load by memory-mapping.
+
+A .kpts file stores each column separately: integer coordinates as int16 (or
+int32 when they don't fit), other numbers as float32, and text columns such
+as `region` as small integer codes with a label table. Integer columns whose
+consecutive values differ by little are delta-encoded as one signed byte per
+row, with the rare larger steps listed separately. A traced kolam then takes
+two bytes per coordinate instead of the four to ten of a CSV row.
+
+Layout, little-endian:
+
+    header    magic b'KPTS', version u16, column count u16, row count u64
+    columns   per column: name (16 bytes, NUL padded), stored dtype (8 bytes,
+              e.g. '<i2'), encoding u8 (0 raw, 1 delta), 7 bytes padding,
+              data offset u64, exception count u64
+    metadata  u32 length and UTF-8 JSON with the labels of text columns
+    data      each column at an 8-byte aligned offset. Raw columns are the
+              values; delta columns are int8 steps followed by the indices
+              (u8) and full steps (i8) of the exceptions.
+
+Raw columns are views of the mapped file, so only the pages actually read
+are loaded; delta columns are rebuilt with one cumulative sum.
+
+    python -m kolamtools.pointfile convert output.csv output.kpts
+    python -m kolamtools.pointfile info output.kpts
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b'KPTS'
+VERSION = 1
+POINT_FORMATS = ('kpts', 'csv', 'npy')
+
+# Rows per chunk when streaming a file with iter_points
+CHUNK_ROWS = 1 << 20
+
+RAW, DELTA = 0, 1
+_ENCODINGS = {RAW: 'raw', DELTA: 'delta'}
+
+_HEADER = struct.Struct('<4sHHQ')
+_COLUMN = struct.Struct('<16s8sB7xQQ')
+_METADATA = struct.Struct('<I')
+_NAME_BYTES = 16
+_ALIGN = 8
+
+
+class PointFileError(ValueError):
+    """Raised for coordinate files that can't be read or written"""
+
+
+def point_format(path):
+    """File format from the extension: kpts, csv or npy"""
+    fmt = os.path.splitext(path)[1].lower().lstrip('.')
+    if fmt not in POINT_FORMATS:
+        raise PointFileError(f'Unknown coordinate file type {path!r}; expected .kpts, .csv or .npy')
+    return fmt
+
+
+def _as_frame(data):
+    """DataFrame of named columns from a frame, a dict or an (N, 2) x, y array"""
+    if isinstance(data, pd.DataFrame):
+        return data
+    if isinstance(data, dict):
+        return pd.DataFrame(data)
+    points = np.asarray(data)
+    if points.size == 0:
+        points = points.reshape(0, 2)
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise PointFileError(f'Expected x,y pairs, got an array of shape {points.shape}')
+    return pd.DataFrame({'x': points[:, 0], 'y': points[:, 1]})
+
+
+def _storage_dtype(values):
+    """Smallest stored dtype for a numeric column"""
+    if values.dtype.kind in 'biu' or (values.dtype.kind == 'f' and len(values)
+                                       and np.isfinite(values).all() and (values == np.round(values)).all()):
+        low, high = (values.min(), values.max()) if len(values) else (0, 0)
+        for dtype in (np.int16, np.int32):
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return np.dtype(dtype).newbyteorder('<')
+        return np.dtype('<i8')
+    return np.dtype('<f4')
+
+
+def _encode_column(values, dtype):
+    """(encoding, list of arrays to write) for one numeric column"""
+    if dtype.kind != 'i' or len(values) < 2:
+        return RAW, [values.astype(dtype)]
+    steps = np.diff(values.astype(np.int64), prepend=0)
+    large = np.flatnonzero((steps < -127) | (steps > 127))
+    if len(values) + 16 * len(large) >= len(values) * dtype.itemsize:
+        return RAW, [values.astype(dtype)]
+    small = steps.astype(np.int8)
+    small[large] = 0
+    return DELTA, [small, large.astype('<u8'), steps[large].astype('<i8')]
+
+
+def write_kpts(path, data):
+    """Write a frame, dict of columns or (N, 2) array as a .kpts file, to a
+    path or a binary file object"""
+    frame = _as_frame(data)
+    rows = len(frame)
+    columns, metadata = [], {'labels': {}}
+    for name in frame.columns:
+        encoded_name = str(name).encode('utf-8')
+        if len(encoded_name) > _NAME_BYTES:
+            raise PointFileError(f'Column name {name!r} is longer than {_NAME_BYTES} bytes')
+        values = frame[name].to_numpy()
+        if values.dtype.kind in 'OUS' or isinstance(frame[name].dtype, pd.CategoricalDtype):
+            codes, labels = pd.factorize(frame[name])
+            if (codes < 0).any():
+                raise PointFileError(f'Column {name!r} has missing values')
+            metadata['labels'][str(name)] = [str(label) for label in labels]
+            dtype = np.dtype('<u1') if len(labels) <= 256 else np.dtype('<u2')
+            encoding, arrays = RAW, [codes.astype(dtype)]
+        else:
+            try:
+                values = values.astype(np.float64) if values.dtype.kind not in 'biuf' else values
+            except (TypeError, ValueError):
+                raise PointFileError(f'Column {name!r} must be numeric or text')
+            dtype = _storage_dtype(values)
+            encoding, arrays = _encode_column(values, dtype)
+        columns.append((encoded_name, dtype, encoding, arrays))
+
+    meta_bytes = json.dumps(metadata).encode('utf-8')
+    offset = _HEADER.size + _COLUMN.size * len(columns) + _METADATA.size + len(meta_bytes)
+    layout = []
+    for encoded_name, dtype, encoding, arrays in columns:
+        positions = []
+        for array in arrays:
+            offset += -offset % _ALIGN
+            positions.append(offset)
+            offset += array.nbytes
+        layout.append(positions)
+
+    if hasattr(path, 'write'):
+        _write_kpts_layout(path, rows, columns, layout, meta_bytes)
+        return
+    with open(path, 'wb') as f:
+        _write_kpts_layout(f, rows, columns, layout, meta_bytes)
+
+
+def _write_kpts_layout(f, rows, columns, layout, meta_bytes):
+    written = f.write(_HEADER.pack(MAGIC, VERSION, len(columns), rows))
+    for (encoded_name, dtype, encoding, arrays), positions in zip(columns, layout):
+        exceptions = len(arrays[1]) if encoding == DELTA else 0
+        written += f.write(_COLUMN.pack(encoded_name, dtype.str.encode('ascii'), encoding, positions[0], exceptions))
+    written += f.write(_METADATA.pack(len(meta_bytes)))
+    written += f.write(meta_bytes)
+    for (_, _, _, arrays), positions in zip(columns, layout):
+        for array, position in zip(arrays, positions):
+            written += f.write(b'\0' * (position - written))
+            written += f.write(array.tobytes())
+
+
+def _open_kpts(path):
+    """Mapped file, row count, column descriptors and metadata of a .kpts file"""
+    if os.path.getsize(path) < _HEADER.size:
+        raise PointFileError(f'{path} is not a .kpts file')
+    mapped = np.memmap(path, dtype=np.uint8, mode='r')
+    magic, version, count, rows = _HEADER.unpack_from(mapped, 0)
+    if magic != MAGIC:
+        raise PointFileError(f'{path} is not a .kpts file')
+    if version != VERSION:
+        raise PointFileError(f'{path} is .kpts version {version}; this reader handles {VERSION}')
+
+    columns = []
+    for i in range(count):
+        raw_name, raw_dtype, encoding, offset, exceptions = _COLUMN.unpack_from(mapped, _HEADER.size + i * _COLUMN.size)
+        columns.append({'name': raw_name.rstrip(b'\0').decode('utf-8'),
+                        'dtype': np.dtype(raw_dtype.rstrip(b'\0').decode('ascii')),
+                        'encoding': encoding, 'offset': offset, 'exceptions': exceptions})
+    meta_at = _HEADER.size + count * _COLUMN.size
+    (meta_length,) = _METADATA.unpack_from(mapped, meta_at)
+    start = meta_at + _METADATA.size
+    metadata = json.loads(bytes(mapped[start:start + meta_length]).decode('utf-8'))
+    return mapped, rows, columns, metadata
+
+
+def _read_column(mapped, rows, column, start, stop, carry=0):
+    """Rows [start, stop) of one column; `carry` is the value before `start` for delta columns"""
+    offset, dtype = column['offset'], column['dtype']
+    if column['encoding'] != DELTA:
+        return mapped[offset + start * dtype.itemsize:offset + stop * dtype.itemsize].view(dtype)
+    steps = mapped[offset + start:offset + stop].view(np.int8).astype(np.int64)
+    at = offset + rows
+    at += -at % _ALIGN
+    count = column['exceptions']
+    index = mapped[at:at + 8 * count].view('<u8')
+    large = mapped[at + 8 * count:at + 16 * count].view('<i8')
+    first, last = np.searchsorted(index, [start, stop])
+    steps[(index[first:last] - start).astype(np.intp)] = large[first:last]
+    steps[0] += carry
+    return np.cumsum(steps).astype(dtype)
+
+
+def read_kpts(path):
+    """
+    Columns of a .kpts file as a dict of arrays, in file order. Raw columns
+    are read-only views of the memory-mapped file; text columns come back
+    as pandas Categoricals.
+    """
+    mapped, rows, columns, metadata = _open_kpts(path)
+    result = {}
+    for column in columns:
+        values = _read_column(mapped, rows, column, 0, rows)
+        if column['name'] in metadata['labels']:
+            values = pd.Categorical.from_codes(values, metadata['labels'][column['name']])
+        result[column['name']] = values
+    return result
+
+
+def iter_points(path, chunk_rows=CHUNK_ROWS):
+    """
+    x, y coordinates of a file as (N, 2) arrays of at most `chunk_rows` rows,
+    so files of any length can be processed in bounded memory. .kpts and
+    .npy files are read from a memory map, CSV with a chunked reader.
+    """
+    fmt = point_format(path)
+    if fmt == 'kpts':
+        mapped, rows, columns, _ = _open_kpts(path)
+        by_name = {column['name'].lower(): column for column in columns}
+        if 'x' not in by_name or 'y' not in by_name:
+            raise PointFileError(f'{path} has no x and y columns')
+        carry = {'x': 0, 'y': 0}
+        for start in range(0, rows, chunk_rows):
+            stop = min(start + chunk_rows, rows)
+            chunk = np.empty((stop - start, 2), dtype=np.result_type(by_name['x']['dtype'], by_name['y']['dtype']))
+            for i, name in enumerate(('x', 'y')):
+                chunk[:, i] = _read_column(mapped, rows, by_name[name], start, stop, carry[name])
+                carry[name] = chunk[-1, i]
+            yield chunk
+    elif fmt == 'npy':
+        points = np.load(path, mmap_mode='r', allow_pickle=False)
+        if points.ndim != 2 or points.shape[1] != 2:
+            raise PointFileError(f'Expected x,y pairs, got an array of shape {points.shape}')
+        for start in range(0, len(points), chunk_rows):
+            yield np.asarray(points[start:start + chunk_rows])
+    else:
+        header = pd.read_csv(path, nrows=0, skipinitialspace=True).columns
+        names = {str(name).strip().lower(): name for name in header}
+        if 'x' not in names or 'y' not in names:
+            raise PointFileError(f'{path} has no x and y columns')
+        with pd.read_csv(path, usecols=[names['x'], names['y']], chunksize=chunk_rows,
+                         skipinitialspace=True) as reader:
+            for frame in reader:
+                yield frame[[names['x'], names['y']]].to_numpy()
+
+
+def load_points(path, columns=('x', 'y')):
+    """
+    Coordinate file (.kpts, .csv or .npy) as a DataFrame of the requested
+    columns, or all of them when `columns` is None. Column names are matched
+    case-insensitively, so the `X,Y` headers of older exports still load.
+    Integer columns are widened to int64 as `pd.read_csv` would give, so
+    offsets computed from them in the trackers can't overflow int16.
+    """
+    fmt = point_format(path)
+    if fmt == 'kpts':
+        frame = pd.DataFrame({name: values.astype(np.int64) if values.dtype.kind == 'i' else values
+                              for name, values in read_kpts(path).items()}, copy=False)
+    elif fmt == 'npy':
+        frame = _as_frame(np.load(path, mmap_mode='r', allow_pickle=False))
+    else:
+        frame = pd.read_csv(path, skipinitialspace=True)
+    frame.columns = [str(name).strip().lower() for name in frame.columns]
+    if columns is None:
+        return frame
+    missing = [name for name in columns if name not in frame.columns]
+    if missing:
+        raise PointFileError(f'{path} has no {", ".join(missing)} column')
+    return frame[list(columns)]
+
+
+def newest_points_path(path):
+    """
+    The .kpts beside the coordinate file `path` when it was written after
+    `path` (or `path` is gone), otherwise `path`. The trackers read their
+    CSV through this, so a converted .kpts is only used while it is up to
+    date with the CSV.
+    """
+    kpts = os.path.splitext(path)[0] + '.kpts'
+    if kpts == path or not os.path.exists(kpts):
+        return path
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(kpts):
+        return path
+    return kpts
+
+
+def save_points(path, data, fmt=None):
+    """Write coordinates in the format given by the extension of `path`, or
+    by `fmt` when `path` is a binary file object"""
+    fmt = fmt or point_format(path)
+    if fmt == 'kpts':
+        write_kpts(path, data)
+        return
+    frame = _as_frame(data)
+    if fmt == 'npy':
+        np.save(path, frame[['x', 'y']].to_numpy())
+        return
+    if list(frame.columns) == ['x', 'y'] and all(frame[name].dtype.kind in 'iu' for name in frame.columns):
+        # Integer x,y rows formatted in one pass
+        flat = frame.to_numpy().ravel().tolist()
+        text = 'x,y\n' + '%d,%d\n' * len(frame) % tuple(flat)
+    else:
+        text = frame.to_csv(index=False)
+    if hasattr(path, 'write'):
+        path.write(text.encode('utf-8'))
+    else:
+        with open(path, 'w', newline='') as f:
+            f.write(text)
+
+
+def describe(path):
+    """Column names, stored types, encodings and sizes of a .kpts file"""
+    mapped, rows, columns, _ = _open_kpts(path)
+    (version,) = struct.unpack_from('<H', mapped, 4)
+    lines = [f'{path}: {rows} rows, {len(columns)} columns, {len(mapped)} bytes (version {version})']
+    for column in columns:
+        detail = f', {column["exceptions"]} large steps' if column['encoding'] == DELTA else ''
+        lines.append(f'  {column["name"]}: {column["dtype"].str} {_ENCODINGS[column["encoding"]]}{detail}')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert and inspect kolam coordinate files')
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert = commands.add_parser('convert', help='Convert between .kpts, .csv and .npy')
+    convert.add_argument('source')
+    convert.add_argument('destination')
+    info = commands.add_parser('info', help='Describe the columns of a .kpts file')
+    info.add_argument('path')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'convert':
+            frame = load_points(args.source, columns=None)
+            save_points(args.destination, frame)
+            print(f'Wrote {len(frame)} rows to {args.destination} '
+                  f'({os.path.getsize(args.source)} -> {os.path.getsize(args.destination)} bytes)')
+        else:
+            print(describe(args.path))
+    except (OSError, PointFileError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
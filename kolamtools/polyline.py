@@ -0,0 +1,145 @@
+"""
+Kolams drawn on video frames as batched polylines.
+
+The live L-system scripts interpreted the L-system string again on every
+frame. A global pen moved around and each symbol made its own cv2.line,
+cv2.ellipse or cv2.circle call. A PolylineKolam records those calls once
+as int32 point arrays:
+- a line is its two ends;
+- an arc is tessellated the way cv2.ellipse does it, with the offsets
+  cached per radius and angle, kept to SHIFT fractional bits so the
+  pixels come out the same;
+- a filled dot is a point repeated, which a polyline as thick as the
+  dot's diameter draws as exactly the same disc.
+Each frame then makes one cv2.polylines call per colour and thickness.
+Once the whole kolam is showing, it is a single masked copy of a sprite
+rendered once. `draw(frame, count)` draws only the first `count`
+segments, to animate the kolam being drawn.
+
+    kolam = PolylineKolam()
+    kolam.line((320, 240), (330, 240), (0, 0, 0), 10)
+    kolam.arc((330, 240), 10, 90, 0, 90, (0, 0, 0), 10)
+    while True:
+        ret, frame = cap.read()
+        kolam.draw(frame, int((time.perf_counter() - started) * 100))
+"""
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from .overlay import blend
+
+# Fractional bits of the stored points, as cv2.polylines' `shift`
+SHIFT = 8
+_ONE = 1 << SHIFT
+
+
+def arc_step(radius):
+    """Degrees between the points cv2.ellipse puts on an arc of `radius`"""
+    if radius < 3:
+        return 90
+    if radius < 10:
+        return 30
+    if radius < 15:
+        return 18
+    return 5
+
+
+@lru_cache(maxsize=None)
+def arc_offsets(radius, rotation, start, end):
+    """
+    Read-only int32 offsets from the centre of the points cv2.ellipse puts
+    on an arc from `start` to `end` degrees, rotated by `rotation`, with
+    SHIFT fractional bits
+    """
+    angles = np.radians(np.r_[np.arange(start, end, arc_step(radius)), end])
+    turn = np.radians(rotation)
+    x, y = radius * np.cos(angles), radius * np.sin(angles)
+    offsets = np.c_[x * np.cos(turn) - y * np.sin(turn), x * np.sin(turn) + y * np.cos(turn)]
+    offsets = np.rint(offsets * _ONE).astype(np.int32)
+    offsets.flags.writeable = False
+    return offsets
+
+
+class PolylineKolam:
+    """
+    Lines, arcs and dots recorded in drawing order. Segments of the same
+    colour and thickness are drawn in one call, so where segments of
+    different styles cross, the later style is always on top.
+    """
+
+    def __init__(self, line_type=cv2.LINE_8):
+        self.line_type = line_type
+        self._styles = {}
+        self._segments = []
+        self._style_of = []
+        self._batches = None
+        self._sprite = None
+
+    def __len__(self):
+        return len(self._segments)
+
+    def _add(self, points, color, thickness):
+        """Record a segment of int32 points that already carry SHIFT fractional bits"""
+        style = (tuple(int(channel) for channel in color), int(thickness))
+        self._segments.append(np.ascontiguousarray(points, dtype=np.int32).reshape(-1, 2))
+        self._style_of.append(self._styles.setdefault(style, len(self._styles)))
+        self._batches = None
+        self._sprite = None
+
+    def line(self, start, end, color, thickness=1):
+        self._add(np.int32([start, end]) * _ONE, color, thickness)
+
+    def arc(self, centre, radius, rotation, start, end, color, thickness=1):
+        """Like cv2.ellipse with equal axes"""
+        self._add(arc_offsets(int(radius), rotation, start, end) + np.int32(centre) * _ONE, color, thickness)
+
+    def dot(self, centre, radius, color):
+        """Like a filled cv2.circle"""
+        self._add(np.int32([centre, centre]) * _ONE, color, 2 * int(radius))
+
+    def _batch(self):
+        """Per style: its segments in order, and how many of them are among the first k segments"""
+        if self._batches is None:
+            style_of = np.array(self._style_of, dtype=np.int64)
+            self._batches = []
+            for style, index in self._styles.items():
+                mine = style_of == index
+                counts = np.r_[0, np.cumsum(mine)]
+                self._batches.append((style, [self._segments[i] for i in np.flatnonzero(mine)], counts))
+        return self._batches
+
+    def draw(self, frame, count=None):
+        """Draw the first `count` segments (all by default) onto `frame` in place"""
+        if count is None or count >= len(self._segments):
+            return self.composite(frame)
+        count = max(int(count), 0)
+        for (color, thickness), segments, counts in self._batch():
+            shown = counts[count]
+            if shown:
+                cv2.polylines(frame, segments[:shown], False, color, thickness, self.line_type, SHIFT)
+        return frame
+
+    def _render(self, shape):
+        """The whole kolam as a colour layer and mask cropped to where it was drawn"""
+        mask = np.zeros(shape, dtype=np.uint8)
+        layer = np.zeros(shape + (3,), dtype=np.uint8)
+        for (color, thickness), segments, _ in self._batch():
+            cv2.polylines(layer, segments, False, color, thickness, self.line_type, SHIFT)
+            cv2.polylines(mask, segments, False, 255, thickness, self.line_type, SHIFT)
+        box = None
+        x, y, width, height = cv2.boundingRect(mask)
+        if width and height:
+            box = (y, y + height, x, x + width)
+            layer, mask = layer[y:y + height, x:x + width].copy(), mask[y:y + height, x:x + width].copy()
+        self._sprite = (shape, box, layer, mask)
+
+    def composite(self, frame):
+        """Copy the whole kolam onto `frame`, rendering its sprite on first use or a new frame size"""
+        if self._sprite is None or self._sprite[0] != frame.shape[:2]:
+            self._render(frame.shape[:2])
+        _, box, layer, mask = self._sprite
+        if box is not None:
+            blend(frame, box, layer, mask)
+        return frame
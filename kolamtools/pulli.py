@@ -0,0 +1,308 @@
+"""
+Pulli (dot grid) detection in photos of kolams.
+
+The generators start from a dot grid (`grid_size`, `rhombus_size`); this
+recovers that grid from a photo or camera frame. The frame is reduced to a
+working size, thresholded, and the small round connected components are
+kept as dot candidates, so the kolam lines themselves drop out by shape.
+The dots' nearest-neighbour vectors give the lattice: their dominant
+directions are the basis vectors, and the angle between those tells a
+square grid from a rhombic or triangular (idukku) one. A least-squares fit
+of every dot to its lattice index then refines spacing and orientation and
+rejects stray blobs.
+
+    python -m kolamtools.pulli photo.jpg
+    python -m kolamtools.pulli photo.jpg --show detected.png --json grid.json
+    python -m kolamtools.pulli --camera 0
+"""
+import argparse
+import json
+import sys
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from .paths import nearest_neighbours
+
+# Longest side of the frame the dots are found at
+DEFAULT_MAX_SIDE = 1024
+
+# Blob shape limits: smallest area in working pixels, widest bounding-box
+# aspect ratio, least fraction of the bounding box filled (a disc is 0.785)
+MIN_DOT_AREA = 4
+MAX_DOT_ASPECT = 2.0
+MIN_DOT_FILL = 0.5
+
+# Dots are kept within this factor of the median dot area
+DOT_AREA_RANGE = 4.0
+
+# Degrees either side of 90 (square) or 60 (triangular) still counted as such
+ANGLE_TOLERANCE = 8.0
+
+# Largest distance of a dot from its lattice position, in spacings
+MAX_RESIDUAL = 0.3
+
+# Width in steps of the rhombus design at L-system levels 1 to 5; each
+# level roughly doubles it
+RHOMBUS_SPANS = (5.7, 14.4, 31.8, 66.7, 136.3)
+
+# The web app's default canvas, and the ranges its validation accepts
+DESIGN_CANVAS = (800, 600)
+DOT_SIZE_RANGE = (1, 50)
+GRID_SIZE_RANGE = (3, 15)
+
+# Directions of neighbour vectors, in 2 degree bins over half a turn
+_BINS = 90
+
+# Detected grid. `dots` are the (N, 2) x, y centres in frame pixels and
+# `indices` their (N, 2) column, row lattice positions; `matrix` is a
+# rows x cols boolean dot matrix, `basis` the two lattice vectors as rows,
+# `origin` the position of index (0, 0) and `parameters` the matching
+# generator settings
+PulliGrid = namedtuple('PulliGrid', 'lattice spacing orientation basis origin dots indices matrix parameters')
+
+
+class PulliError(ValueError):
+    """Raised when no dot grid can be found"""
+
+
+def _working_gray(frame, max_side):
+    """Grayscale frame reduced to at most `max_side`, and the reduction factor"""
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    factor = max(gray.shape) / max_side
+    if factor <= 1:
+        return gray, 1.0
+    size = (max(1, round(gray.shape[1] / factor)), max(1, round(gray.shape[0] / factor)))
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA), factor
+
+
+def find_dots(gray, color=None, threshold=None):
+    """
+    (N, 2) float centres of the dot-like blobs of a grayscale image. `color`
+    is 'white' or 'black' for the colour of the drawing, or None to take the
+    minority colour; `threshold` defaults to Otsu's.
+    """
+    if threshold is None:
+        threshold, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    else:
+        _, mask = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY)
+    if color == 'black' or (color is None and cv2.countNonZero(mask) * 2 > mask.size):
+        mask = cv2.bitwise_not(mask)
+
+    count, _, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    width, height, area = stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT], stats[1:, cv2.CC_STAT_AREA]
+    aspect = np.maximum(width, height) / np.minimum(width, height)
+    dot_like = ((area >= MIN_DOT_AREA) & (aspect <= MAX_DOT_ASPECT)
+                & (area >= MIN_DOT_FILL * width * height))
+    if not dot_like.any():
+        return np.empty((0, 2))
+    typical = np.median(area[dot_like])
+    dot_like &= (area >= typical / DOT_AREA_RANGE) & (area <= typical * DOT_AREA_RANGE)
+    return centroids[1:][dot_like]
+
+
+def _tilt(vector):
+    """Angle of a vector from horizontal, folded to (-90, 90] degrees"""
+    return (np.degrees(np.arctan2(vector[1], vector[0])) + 90) % 180 - 90
+
+
+def _directions(vectors):
+    """Dominant directions of neighbour vectors as median vectors, strongest first"""
+    angles = np.degrees(np.arctan2(vectors[:, 1], vectors[:, 0])) % 180
+    histogram = np.bincount((angles * _BINS / 180).astype(int) % _BINS, minlength=_BINS).astype(float)
+    histogram = np.roll(histogram, 1) + 2 * histogram + np.roll(histogram, -1)
+    peaks = []
+    for peak in np.argsort(-histogram, kind='stable'):
+        if histogram[peak] < 0.25 * histogram.max():
+            break
+        centre = (peak + 0.5) * 180 / _BINS
+        if all(abs((centre - other + 90) % 180 - 90) > 20 for other, _ in peaks):
+            # Vectors near this direction, all turned to point the same way
+            near = vectors[np.abs((angles - centre + 90) % 180 - 90) < 10]
+            flip = np.sign(near @ [np.cos(np.radians(centre)), np.sin(np.radians(centre))])
+            peaks.append((centre, np.median(near * flip[:, None], axis=0)))
+    return [vector for _, vector in peaks]
+
+
+def _fit_lattice(dots, a, b, spacing):
+    """Indices of the dots on the lattice spanned by a, b and the refined
+    (origin, a, b), keeping only dots close to a lattice position"""
+    centre = dots[np.argmin(np.hypot(*(dots - dots.mean(axis=0)).T))]
+    origin = centre
+    inliers = np.ones(len(dots), dtype=bool)
+    for _ in range(2):
+        basis = np.column_stack([a, b])
+        indices = np.rint(np.linalg.solve(basis, (dots - origin).T).T)
+        residual = np.hypot(*(dots - origin - indices @ basis.T).T)
+        inliers = residual < MAX_RESIDUAL * spacing
+        if inliers.sum() < 3:
+            break
+        design = np.column_stack([np.ones(inliers.sum()), indices[inliers]])
+        solution, *_ = np.linalg.lstsq(design, dots[inliers], rcond=None)
+        origin, a, b = solution
+    return indices.astype(np.int64), inliers, origin, a, b
+
+
+def _clamp(value, limits):
+    return int(min(max(value, limits[0]), limits[1]))
+
+
+def _design_parameters(lattice, orientation, rows, cols):
+    """Generator settings for the grid: axis-aligned square grids are the
+    traditional design's grid_size, diamonds (square grids turned about 45
+    degrees, or rhombic ones) the rhombus design at the level whose width
+    best fits the grid, with the step that fits it on the default canvas"""
+    size = int(max(rows, cols))
+    if lattice == 'square' and abs(orientation) < 22.5:
+        return {'design_type': 'traditional', 'grid_size': _clamp(size, GRID_SIZE_RANGE)}
+    if lattice in ('square', 'rhombic'):
+        # rhombus_size is the L-system level, not a dot count
+        span = max(size - 1, 1)
+        level = int(np.argmin([abs(np.log(width / span)) for width in RHOMBUS_SPANS])) + 1
+        dot_size = 0.8 * min(DESIGN_CANVAS) / RHOMBUS_SPANS[level - 1]
+        return {'design_type': 'rhombus', 'rhombus_size': level, 'dot_size': _clamp(round(dot_size), DOT_SIZE_RANGE)}
+    return {}
+
+
+def detect_pulli(frame, max_side=DEFAULT_MAX_SIDE, color=None, threshold=None):
+    """
+    PulliGrid of the dot grid in a BGR or grayscale frame, in the frame's
+    pixel coordinates. Raises PulliError when too few dots are found to
+    make out a lattice.
+    """
+    gray, factor = _working_gray(frame, max_side)
+    dots = find_dots(gray, color, threshold)
+    if len(dots) < 4:
+        raise PulliError(f'Found {len(dots)} dots; at least 4 are needed for a grid')
+
+    neighbours, distances = nearest_neighbours(dots, k=6)
+    spacing = float(np.median(distances[:, 0][np.isfinite(distances[:, 0])]))
+    close = (neighbours >= 0) & (distances < 1.25 * spacing)
+    vectors = dots[neighbours[close]] - np.repeat(dots, close.sum(axis=1), axis=0)
+    directions = _directions(vectors)
+    if len(directions) < 2:
+        raise PulliError('The dots lie along a single line')
+
+    # The basis vector closest to horizontal first, then the shortest other
+    # direction; angles are folded to at most 90 degrees since b and -b span
+    # the same lattice
+    directions.sort(key=lambda vector: abs(_tilt(vector)))
+    a = directions[0]
+    if a[0] < 0:
+        a = -a
+    b = min(directions[1:], key=lambda vector: np.hypot(*vector))
+    if b[1] < 0:
+        b = -b
+
+    indices, inliers, origin, a, b = _fit_lattice(dots, a, b, spacing)
+    angle = np.degrees(np.arccos(np.clip(abs(a @ b) / np.hypot(*a) / np.hypot(*b), 0, 1)))
+    if abs(angle - 90) <= ANGLE_TOLERANCE:
+        lattice = 'square'
+    elif abs(angle - 60) <= ANGLE_TOLERANCE:
+        lattice = 'triangular'
+    else:
+        lattice = 'rhombic'
+
+    # Index (0, 0) moves to the corner of the dot matrix
+    dots, indices = dots[inliers], indices[inliers]
+    corner = indices.min(axis=0)
+    origin = origin + corner[0] * a + corner[1] * b
+    indices -= corner
+    cols, rows = indices.max(axis=0) + 1
+    matrix = np.zeros((rows, cols), dtype=bool)
+    matrix[indices[:, 1], indices[:, 0]] = True
+    spacing = float(np.hypot(*a) + np.hypot(*b)) / 2 * factor
+    orientation = float(np.degrees(np.arctan2(a[1], a[0])))
+    return PulliGrid(lattice, spacing, orientation, np.array([a, b]) * factor, origin * factor,
+                     dots * factor, indices, matrix,
+                     _design_parameters(lattice, orientation, rows, cols))
+
+
+def draw_pulli(frame, grid, color=(0, 200, 255)):
+    """Mark the detected dots and the two lattice directions on a frame"""
+    radius = max(2, int(grid.spacing / 6))
+    for x, y in np.rint(grid.dots).astype(int):
+        cv2.circle(frame, (x, y), radius, color, 2)
+    start = tuple(np.rint(grid.origin).astype(int))
+    for vector in grid.basis:
+        cv2.arrowedLine(frame, start, tuple(np.rint(grid.origin + vector).astype(int)), (255, 0, 0), 2)
+    return frame
+
+
+def _summary(grid):
+    return {'lattice': grid.lattice, 'spacing': round(grid.spacing, 2), 'orientation': round(grid.orientation, 2),
+            'dots': len(grid.dots), 'rows': grid.matrix.shape[0], 'cols': grid.matrix.shape[1],
+            'basis': np.round(grid.basis, 2).tolist(), 'origin': np.round(grid.origin, 2).tolist(),
+            'matrix': [''.join('o' if dot else '.' for dot in row) for row in grid.matrix],
+            'parameters': grid.parameters}
+
+
+def _run_camera(source, args):
+    cap = cv2.VideoCapture(source)
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        try:
+            grid = detect_pulli(frame, args.max_side, args.color, args.threshold)
+            draw_pulli(frame, grid)
+            label = f'{grid.lattice} {grid.matrix.shape[0]}x{grid.matrix.shape[1]}, {grid.spacing:.0f}px'
+        except PulliError as e:
+            label = str(e)
+        cv2.putText(frame, label, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+        cv2.imshow('Pulli', frame)
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
+    cap.release()
+    cv2.destroyAllWindows()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Find the dot grid (pulli) of a kolam photo')
+    parser.add_argument('image', nargs='?', help='Photo of a kolam')
+    parser.add_argument('--camera', type=int, metavar='INDEX', help='Detect live on this camera instead')
+    parser.add_argument('--max-side', type=int, default=DEFAULT_MAX_SIDE,
+                        help='Longest side the photo is reduced to before detection')
+    parser.add_argument('--color', choices=('white', 'black'),
+                        help='Colour of the dots (default: whichever is rarer)')
+    parser.add_argument('--threshold', type=int, help='Gray level separating dots from background (default: Otsu)')
+    parser.add_argument('--json', help='Write the grid to this JSON file')
+    parser.add_argument('--show', help='Write the photo with the detected grid marked to this image')
+    args = parser.parse_args(argv)
+
+    if args.camera is not None:
+        return _run_camera(args.camera, args)
+    if not args.image:
+        parser.error('give an image or --camera')
+
+    frame = cv2.imread(args.image)
+    if frame is None:
+        print(f'Could not read {args.image}', file=sys.stderr)
+        return 1
+    started = time.perf_counter()
+    try:
+        grid = detect_pulli(frame, args.max_side, args.color, args.threshold)
+    except PulliError as e:
+        print(e, file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - started
+
+    summary = _summary(grid)
+    print(f'{grid.lattice} grid of {len(grid.dots)} dots, {grid.matrix.shape[0]} rows x {grid.matrix.shape[1]} '
+          f'columns, spacing {grid.spacing:.1f}px at {grid.orientation:.1f} degrees ({elapsed * 1000:.0f} ms)')
+    print('\n'.join(summary['matrix']))
+    if grid.parameters:
+        print('Design parameters:', json.dumps(grid.parameters))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+    if args.show:
+        cv2.imwrite(args.show, draw_pulli(frame, grid))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""
+Kolam overlays rendered onto recorded videos in parallel chunks.
+
+The trackers could only write their output live, one camera frame at a
+time. For tutorial videos made from recorded footage, render_video splits
+the recording at its keyframes into chunks, found from the packets
+without decoding anything. Each worker process seeks straight to its
+chunk, draws the kolam and guide dot and encodes the chunk on its own.
+The guide dot is placed by each frame's time in the video rather than the
+wall clock, so the chunks join up seamlessly. The result is also the same
+however fast it was rendered. The chunks are then joined without
+re-encoding:
+- with ffmpeg's concat demuxer when ffmpeg is installed;
+- otherwise each chunk is encoded as Motion JPEG, and the frames are
+  copied into a single AVI (an .mp4 output becomes .avi).
+
+    python -m kolamtools.render recording.mp4 output.kpts -o tutorial.mp4
+    python -m kolamtools.render recording.mp4 output.kpts -o tutorial.mp4 --offset 50 50 --guide-speed 300 -j 8
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from .extract import _init_worker
+from .guide import Guide
+from .overlay import Overlay
+from .pointfile import PointFileError, load_points
+
+# Chunks per worker, so a worker that finishes early picks up another
+CHUNKS_PER_WORKER = 2
+
+JPEG_QUALITY = 90
+
+# RIFF sizes are 32-bit
+MAX_AVI_BYTES = 2 ** 32 - 1
+
+# What is drawn on every frame: circles at the points of `points_file`,
+# moved by `offset`, and with `guide_speed` a guide dot of `guide_radius`
+# moving along them at that many pixels per second of video. With `size`
+# frames are resized to it after drawing.
+Recipe = namedtuple('Recipe', 'points_file radius color thickness offset guide_speed guide_radius guide_color size',
+                    defaults=(10, (0, 0, 255), -1, (0, 0), None, 15, (255, 0, 0), None))
+
+
+class RenderError(ValueError):
+    """Raised for videos that can't be read, rendered or joined"""
+
+
+def keyframes(path):
+    """Indices of the keyframes of a video, read from its packets without decoding; [] if unknown"""
+    capture = cv2.VideoCapture(path)
+    if not capture.set(cv2.CAP_PROP_FORMAT, -1):
+        capture.release()
+        return []
+    keys, index = [], 0
+    while capture.grab():
+        if capture.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+            keys.append(index)
+        index += 1
+    capture.release()
+    return keys
+
+
+def plan_chunks(count, chunks, keys=()):
+    """
+    (start, stop) frame ranges splitting `count` frames into about `chunks`
+    pieces, each starting at the keyframe nearest an even split
+    """
+    starts = {0}
+    for i in range(1, chunks):
+        ideal = count * i // chunks
+        starts.add(min(keys, key=lambda key: abs(key - ideal)) if keys else ideal)
+    starts = sorted(start for start in starts if start < count)
+    return list(zip(starts, starts[1:] + [count]))
+
+
+def _drawer(recipe, fps):
+    """draw(frame, index) for one worker: the recipe's overlay and guide dot on frame `index`"""
+    points = load_points(recipe.points_file)[['x', 'y']].to_numpy()
+    overlay = Overlay(points, recipe.radius, recipe.color, recipe.thickness, offset=recipe.offset)
+    # A clock stopped at zero, so the dot's position is given by the frame's time alone
+    guide = Guide(points, recipe.guide_speed, clock=lambda: 0.0) if recipe.guide_speed else None
+
+    def draw(frame, index):
+        overlay.composite(frame)
+        if guide is not None:
+            cv2.circle(frame, overlay.pixel(guide.position(index / fps)), recipe.guide_radius,
+                       recipe.guide_color, -1)
+        if recipe.size is not None:
+            frame = cv2.resize(frame, recipe.size)
+        return frame
+
+    return draw
+
+
+def _render_chunk(job):
+    """
+    Render frames [start, stop) into `path`: an MPEG-4 video, or with
+    `mjpeg` the JPEG of every frame back to back. Returns the frame size
+    and, per frame, the byte size of its JPEG (0 for MPEG-4).
+    """
+    source, start, stop, path, recipe, fps, mjpeg = job
+    capture = cv2.VideoCapture(source)
+    capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+    draw = _drawer(recipe, fps)
+    sizes, size, writer = [], None, None
+    packets = open(path, 'wb') if mjpeg else None
+    try:
+        for index in range(start, stop):
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frame = draw(frame, index)
+            size = (frame.shape[1], frame.shape[0])
+            if mjpeg:
+                data = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])[1]
+                packets.write(data)
+                sizes.append(len(data))
+                continue
+            if writer is None:
+                writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+            writer.write(frame)
+            sizes.append(0)
+    finally:
+        capture.release()
+        if packets is not None:
+            packets.close()
+        if writer is not None:
+            writer.release()
+    return size, sizes
+
+
+def _riff(fourcc, data):
+    return fourcc + struct.pack('<I', len(data)) + data + b'\0' * (len(data) % 2)
+
+
+def _riff_list(kind, data):
+    return b'LIST' + struct.pack('<I', len(data) + 4) + kind + data
+
+
+def write_avi(path, parts, fps, size):
+    """
+    Join Motion JPEG frames into one AVI without re-encoding. `parts` are
+    (file, sizes) pairs; each file holds JPEGs of those byte sizes back to back.
+    """
+    sizes = [length for _, lengths in parts for length in lengths]
+    frames = len(sizes)
+    width, height = size
+    largest = max(sizes, default=0)
+    scale, rate = 1000, round(fps * 1000)
+
+    # AVIF_HASINDEX; every frame is a keyframe (AVIIF_KEYFRAME)
+    avih = struct.pack('<14I', round(1e6 / fps), 0, 0, 0x10, frames, 0, 1, largest, width, height, 0, 0, 0, 0)
+    strh = b'vidsMJPG' + struct.pack('<IHHIIIIIIiI4h', 0, 0, 0, 0, scale, rate, 0, frames, largest, -1, 0,
+                                     0, 0, width, height)
+    strf = struct.pack('<IiiHH4sIiiII', 40, width, height, 1, 24, b'MJPG', width * height * 3, 0, 0, 0, 0)
+    header = _riff_list(b'hdrl', _riff(b'avih', avih) + _riff_list(b'strl', _riff(b'strh', strh)
+                                                                    + _riff(b'strf', strf)))
+    movi_bytes = 4 + sum(8 + length + length % 2 for length in sizes)
+    riff_bytes = 4 + len(header) + 8 + movi_bytes + 8 + 16 * frames
+    if riff_bytes > MAX_AVI_BYTES:
+        raise RenderError('The video is over 4 GB as an AVI; install ffmpeg to join the chunks as MPEG-4')
+    with open(path, 'wb') as out:
+        out.write(b'RIFF' + struct.pack('<I', riff_bytes) + b'AVI ' + header)
+        out.write(b'LIST' + struct.pack('<I', movi_bytes) + b'movi')
+        index, offset = [], 4
+        for part, lengths in parts:
+            with open(part, 'rb') as packets:
+                for length in lengths:
+                    out.write(_riff(b'00dc', packets.read(length)))
+                    index.append(struct.pack('<4sIII', b'00dc', 0x10, offset, length))
+                    offset += 8 + length + length % 2
+        out.write(b'idx1' + struct.pack('<I', 16 * frames) + b''.join(index))
+
+
+def concat_ffmpeg(paths, output):
+    """Join MPEG-4 chunks with ffmpeg's concat demuxer, copying the streams"""
+    listing = output + '.chunks.txt'
+    with open(listing, 'w') as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    try:
+        subprocess.run(['ffmpeg', '-v', 'error', '-y', '-f', 'concat', '-safe', '0', '-i', listing,
+                        '-c', 'copy', output], check=True)
+    except subprocess.CalledProcessError as e:
+        raise RenderError(f'ffmpeg could not join the chunks (exit status {e.returncode})')
+    finally:
+        os.remove(listing)
+
+
+def render_video(source, output, recipe, workers=None, chunks=None):
+    """
+    Draw `recipe` on every frame of the video `source` in parallel chunks
+    and join them into `output`. Returns the path written (an .avi when
+    ffmpeg isn't available) and the number of frames.
+    """
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise RenderError(f'Cannot open {source}')
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+    if count <= 0:
+        raise RenderError(f'{source} has no frames')
+
+    mjpeg = shutil.which('ffmpeg') is None
+    if mjpeg:
+        output = os.path.splitext(output)[0] + '.avi'
+    workers = workers or os.cpu_count() or 1
+    ranges = plan_chunks(count, chunks or workers * CHUNKS_PER_WORKER, keyframes(source))
+
+    directory = os.path.dirname(os.path.abspath(output))
+    with tempfile.TemporaryDirectory(prefix='.kolam-chunks-', dir=directory) as scratch:
+        paths = [os.path.join(scratch, f'{i:05d}' + ('.jpegs' if mjpeg else '.mp4')) for i in range(len(ranges))]
+        jobs = [(source, start, stop, path, recipe, fps, mjpeg) for (start, stop), path in zip(ranges, paths)]
+        if workers > 1 and len(jobs) > 1:
+            # Forked workers don't run the calling script again, which for
+            # the camera scripts would open the camera
+            context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+                results = list(pool.map(_render_chunk, jobs))
+        else:
+            results = [_render_chunk(job) for job in jobs]
+
+        rendered = [(path, sizes) for path, (_, sizes) in zip(paths, results) if sizes]
+        if not rendered:
+            raise RenderError(f'No frames could be read from {source}')
+        size = next(frame_size for frame_size, sizes in results if sizes)
+        if mjpeg:
+            write_avi(output, rendered, fps, size)
+        else:
+            concat_ffmpeg([path for path, _ in rendered], output)
+    return output, sum(len(sizes) for _, sizes in rendered)
+
+
+def _frame_size(text):
+    width, _, height = text.lower().partition('x')
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Draw a kolam and guide dot on a recorded video, in parallel')
+    parser.add_argument('video', help='Recorded video')
+    parser.add_argument('points', help='Coordinate file (.kpts, .csv or .npy)')
+    parser.add_argument('-o', '--output', default='rendered.mp4', help='Video to write')
+    parser.add_argument('--radius', type=int, default=10, help='Circle radius')
+    parser.add_argument('--thickness', type=int, default=-1, help='Circle outline thickness (-1 fills them)')
+    parser.add_argument('--offset', type=float, nargs=2, default=(0, 0), metavar=('X', 'Y'),
+                        help='Shift of the points in pixels')
+    parser.add_argument('--guide-speed', type=float, help='Draw a guide dot moving at this many pixels a second')
+    parser.add_argument('--size', type=_frame_size, help='Resize the output to WxH')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (default: one per CPU)')
+    parser.add_argument('--chunks', type=int, help=f'Chunks to split the video into (default: {CHUNKS_PER_WORKER} '
+                                                   'per worker)')
+    args = parser.parse_args(argv)
+
+    recipe = Recipe(args.points, args.radius, thickness=args.thickness, offset=tuple(args.offset),
+                    guide_speed=args.guide_speed, guide_radius=args.radius + 5, size=args.size)
+    started = time.perf_counter()
+    try:
+        output, frames = render_video(args.video, args.output, recipe, args.workers, args.chunks)
+    except (OSError, PointFileError, RenderError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - started
+    print(f'Rendered {frames} frames into {output} in {elapsed:.2f}s ({frames / elapsed:.1f} fps)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
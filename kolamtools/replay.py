@@ -0,0 +1,232 @@
+"""
+Recorded videos, image sequences and synthetic clips in place of a camera.
+
+Every camera script opened cv2.VideoCapture(0), so none of them could run
+on a machine without a webcam. A ReplayCapture reads a video file, a
+folder or glob of images, or a list of frames through the same read(),
+get() and release() calls. With `realtime` it releases frames at the
+source's frame rate and skips the ones a slow reader would have missed,
+as a camera does. Otherwise it goes as fast as frames are read.
+open_capture takes a camera index or a path, so scripts accept either.
+
+synthetic_clip writes a reproducible test video: a dark sheet with a pulli
+grid and kolam loops, drifting and tilting over a textured floor. It
+exercises the overlay, anchoring and dot-detection pipelines.
+
+    cap = open_capture(sys.argv[1] if len(sys.argv) > 1 else 0)
+    python -m kolamtools.replay --synthetic clip.mp4 --size 1920x1080 --frames 300
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+# Frame rate of image sequences and frame lists unless given
+DEFAULT_FPS = 30.0
+
+
+class ReplayError(ValueError):
+    """Raised for replay sources that can't be opened"""
+
+
+def _image_paths(source):
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        paths = glob.glob(source)
+    return sorted(path for path in paths if path.lower().endswith(IMAGE_EXTENSIONS))
+
+
+class ReplayCapture:
+    """
+    Frames from a video file, an image folder or glob, or a sequence of
+    arrays, read like a cv2.VideoCapture. `fps` overrides the source's frame
+    rate; `loop` starts the source over when it ends.
+    """
+
+    def __init__(self, source, realtime=False, loop=False, fps=None):
+        self.realtime = realtime
+        self.loop = loop
+        self.skipped = 0
+        self.decode_seconds = 0.0
+        self._video = None
+        self._images = None
+        self._frames = None
+        self._position = 0
+        if isinstance(source, (str, os.PathLike)) and os.path.isfile(source) \
+                and not str(source).lower().endswith(IMAGE_EXTENSIONS):
+            self._video = cv2.VideoCapture(str(source))
+            if not self._video.isOpened():
+                raise ReplayError(f'Cannot open {source}')
+            self.fps = fps or self._video.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+            self.count = int(self._video.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.size = (int(self._video.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                         int(self._video.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        else:
+            if isinstance(source, (str, os.PathLike)):
+                self._images = _image_paths(str(source))
+                if not self._images:
+                    raise ReplayError(f'No video or images found at {source}')
+                first = cv2.imread(self._images[0])
+                self.count = len(self._images)
+            else:
+                self._frames = source
+                self.count = len(source)
+                first = source[0] if self.count else None
+            if first is None:
+                raise ReplayError('The replay source has no frames')
+            self.fps = fps or DEFAULT_FPS
+            self.size = (first.shape[1], first.shape[0])
+        self._started = None
+
+    def isOpened(self):
+        return self.count > 0 or self._video is not None
+
+    def _next(self, decode=True):
+        """The next frame, or None at the end; without `decode` it is only skipped"""
+        if self._position >= self.count and self._video is None:
+            if not self.loop:
+                return None
+            self._position = 0
+        started = time.perf_counter()
+        if self._video is not None:
+            ok = self._video.grab()
+            if not ok and self.loop and self._position:
+                self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                self._position = 0
+                ok = self._video.grab()
+            frame = (self._video.retrieve()[1] if decode else True) if ok else None
+        elif self._images is not None:
+            frame = cv2.imread(self._images[self._position]) if decode else True
+        else:
+            frame = np.array(self._frames[self._position]) if decode else True
+        self._position += 1
+        self.decode_seconds += time.perf_counter() - started
+        return frame
+
+    def read(self):
+        if self.realtime:
+            now = time.perf_counter()
+            if self._started is None:
+                self._started = now - self._position / self.fps
+            due = self._started + self._position / self.fps
+            if due > now:
+                time.sleep(due - now)
+            else:
+                # Frames whose time has passed are gone, as they would be from a camera
+                behind = int((now - due) * self.fps)
+                for _ in range(behind):
+                    if self._next(decode=False) is None:
+                        return False, None
+                    self.skipped += 1
+        frame = self._next()
+        return frame is not None, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.size[0])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.size[1])
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.count)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._position)
+        return 0.0
+
+    def set(self, prop, value):
+        # A recording's size and rate are fixed; scripts asking for others get what was recorded
+        return False
+
+    def release(self):
+        if self._video is not None:
+            self._video.release()
+
+
+def open_capture(source=0, realtime=True, loop=False):
+    """A camera for an index (or a string of digits), otherwise a ReplayCapture"""
+    if isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+        return cv2.VideoCapture(int(source))
+    return ReplayCapture(source, realtime=realtime, loop=loop)
+
+
+def synthetic_frames(size=(1280, 720), frames=150, seed=0):
+    """
+    Yield a reproducible clip: a dark sheet with a 5x5 pulli grid and kolam
+    loops over a textured floor, still for the first third, then drifting
+    and tilting, then still again.
+    """
+    width, height = size
+    rng = np.random.default_rng(seed)
+    floor = cv2.GaussianBlur(rng.integers(70, 150, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+
+    side = 1000
+    sheet = np.full((side, side, 3), 40, dtype=np.uint8)
+    spacing = side // 6
+    for i in range(1, 6):
+        for j in range(1, 6):
+            centre = (i * spacing, j * spacing)
+            cv2.ellipse(sheet, centre, (spacing * 2 // 5, spacing * 2 // 5), 45 * ((i + j) % 2), 30, 300,
+                        (225, 225, 225), 8, cv2.LINE_AA)
+            cv2.circle(sheet, centre, 12, (240, 240, 240), -1, cv2.LINE_AA)
+    square = np.float32([[0, 0], [side, 0], [side, side], [0, side]])
+    outline = np.full((side, side), 255, dtype=np.uint8)
+
+    scale = min(width, height) * 0.6
+    base = np.float32([[-0.5, -0.5], [0.5, -0.45], [0.55, 0.5], [-0.5, 0.45]]) * scale
+    for index in range(frames):
+        phase = min(max((index - frames / 3) / (frames / 3), 0.0), 1.0)
+        angle = np.radians(12 * phase)
+        turn = np.float32([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+        centre = np.float32([width / 2 + width * 0.12 * phase, height / 2 + height * 0.05 * phase])
+        corners = (base @ turn.T + centre).astype(np.float32)
+        matrix = cv2.getPerspectiveTransform(square, corners)
+        frame = floor.copy()
+        warped = cv2.warpPerspective(sheet, matrix, size)
+        mask = cv2.warpPerspective(outline, matrix, size, flags=cv2.INTER_NEAREST)
+        cv2.copyTo(warped, mask, frame)
+        noise = rng.integers(0, 6, (height, width, 1), dtype=np.uint8)
+        yield cv2.add(frame, np.repeat(noise, 3, axis=2))
+
+
+def synthetic_clip(path, size=(1280, 720), frames=150, fps=30.0, seed=0):
+    """Write the synthetic clip to `path` (reusing it if already there) and return the path"""
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    for frame in synthetic_frames(size, frames, seed):
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def _frame_size(text):
+    width, _, height = text.lower().partition('x')
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a synthetic test clip for the camera pipelines')
+    parser.add_argument('--synthetic', required=True, metavar='PATH', help='Video to write')
+    parser.add_argument('--size', type=_frame_size, default=(1280, 720), help='Frame size, WxH')
+    parser.add_argument('--frames', type=int, default=150)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    if os.path.exists(args.synthetic):
+        os.remove(args.synthetic)
+    synthetic_clip(args.synthetic, args.size, args.frames, args.fps, args.seed)
+    print(f'Wrote {args.frames} frames of {args.size[0]}x{args.size[1]} to {args.synthetic}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
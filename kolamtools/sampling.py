@@ -0,0 +1,152 @@
+"""
+Spatially uniform (blue-noise) subsampling of stroke coordinates.
+
+Uniform random picks leave clumps and gaps along thin strokes. Poisson-disk
+sampling keeps points at least `spacing` apart while still covering every
+stroke, so far fewer points give the same visual coverage.
+
+The sampler is the grid-based parallel variant of dart throwing. Points are
+hashed into cells of spacing/sqrt(2), so a cell holds at most one sample and
+conflicts can only come from the 5x5 block of cells around it. Cells whose
+coordinates agree modulo 3 are too far apart to conflict, so each of the
+nine phases tests one candidate for all its cells in a single vectorized
+pass. Every step is a sort or a gather, so the cost is close to linear in
+the number of points.
+"""
+import numpy as np
+
+# Candidates tried per cell before an empty cell is given up
+DEFAULT_ATTEMPTS = 4
+
+# Spacing searches stop once the sample is within this fraction under the budget
+BUDGET_TOLERANCE = 0.05
+MAX_BUDGET_ROUNDS = 8
+
+_NEIGHBOUR_OFFSETS = np.array([(dx, dy) for dx in range(-2, 3) for dy in range(-2, 3)
+                               if (dx, dy) != (0, 0) and abs(dx) + abs(dy) < 4])
+
+
+def poisson_disk_sample(points, spacing, attempts=DEFAULT_ATTEMPTS, seed=None):
+    """
+    Indices of a subset of `points` ((N, 2) array) in which no two points are
+    closer than `spacing`, with no gaps much wider than it. The indices are
+    sorted, so the subset keeps the order of the input.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if spacing <= 0 or len(points) < 2:
+        return np.arange(len(points))
+
+    rng = np.random.default_rng(seed)
+    cell_size = spacing / np.sqrt(2)
+    cells = np.floor((points - points.min(axis=0)) / cell_size).astype(np.int64)
+    span = int(cells[:, 1].max()) + 5
+    keys = (cells[:, 0] + 2) * span + cells[:, 1] + 2
+
+    # The spatial hash: points grouped by cell in random order within each cell
+    shuffle = rng.permutation(len(points))
+    order = shuffle[np.argsort(keys[shuffle], kind='stable')]
+    sorted_keys = keys[order]
+    first = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    cell_keys = sorted_keys[first]
+    cell_counts = np.diff(np.r_[first, len(points)])
+    cell_x, cell_y = np.divmod(cell_keys, span)
+    phase = (cell_x % 3) * 3 + cell_y % 3
+    phases = np.argsort(phase, kind='stable')
+    phase_bounds = np.searchsorted(phase[phases], np.arange(10))
+
+    # Sample held by each occupied cell, by index into `points`
+    occupant = np.full(len(cell_keys), -1, dtype=np.int64)
+    offsets = _NEIGHBOUR_OFFSETS[:, 0] * span + _NEIGHBOUR_OFFSETS[:, 1]
+
+    xs = np.ascontiguousarray(points[:, 0])
+    ys = np.ascontiguousarray(points[:, 1])
+    limit = spacing * spacing
+    for attempt in range(min(attempts, int(cell_counts.max()))):
+        for current in range(9):
+            cell = phases[phase_bounds[current]:phase_bounds[current + 1]]
+            cell = cell[(occupant[cell] < 0) & (cell_counts[cell] > attempt)]
+            if not len(cell):
+                continue
+            candidate = order[first[cell] + attempt]
+            nearby_keys = cell_keys[cell, None] + offsets
+            nearby = np.searchsorted(cell_keys, nearby_keys).clip(max=len(cell_keys) - 1)
+            held = np.where(cell_keys[nearby] == nearby_keys, occupant[nearby], -1)
+            taken = held >= 0
+            held = held[taken]
+            dx = xs[held] - np.broadcast_to(xs[candidate, None], taken.shape)[taken]
+            dy = ys[held] - np.broadcast_to(ys[candidate, None], taken.shape)[taken]
+            too_close = np.zeros(taken.shape, dtype=bool)
+            too_close[taken] = dx * dx + dy * dy < limit
+            accepted = ~too_close.any(axis=1)
+            occupant[cell[accepted]] = candidate[accepted]
+    return np.sort(occupant[occupant >= 0])
+
+
+def blue_noise_sample(points, spacing=None, budget=None, attempts=DEFAULT_ATTEMPTS, seed=None):
+    """
+    Indices of well-spaced points, either `spacing` apart or at most `budget`
+    of them. With only a budget the spacing is searched for: the count scales
+    roughly with a power of the spacing (1 along strokes, 2 over filled
+    areas), which a few secant steps in log space pin down.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if spacing is None and budget is None:
+        raise ValueError('Give a spacing, a point budget or both')
+    if spacing is not None:
+        indices = poisson_disk_sample(points, spacing, attempts, seed)
+        return indices if budget is None or len(indices) <= budget else _thin(indices, budget, seed)
+    if len(points) <= budget:
+        return np.arange(len(points))
+    if budget <= 0:
+        return np.arange(0)
+
+    # First guess: the points spread over a filled area
+    extent = np.ptp(points, axis=0) + 1
+    spacing = float(np.sqrt(extent[0] * extent[1] / budget))
+    tried = []
+    under = over = None
+    low, high = 0.0, np.inf
+    for _ in range(MAX_BUDGET_ROUNDS):
+        indices = poisson_disk_sample(points, spacing, attempts, seed)
+        count = len(indices)
+        tried.append((spacing, count))
+        if count <= budget:
+            high = min(high, spacing)
+            if under is None or count > len(under):
+                under = indices
+            if count >= budget * (1 - BUDGET_TOLERANCE):
+                return under
+        else:
+            low = max(low, spacing)
+            if over is None or count < len(over):
+                over = indices
+        # On pixel coordinates the count jumps at spacings like sqrt(10), so
+        # the budget may sit between two neighbouring spacings
+        if high / max(low, 1e-12) < 1 + BUDGET_TOLERANCE:
+            break
+        spacing = _next_spacing(tried, budget)
+        if not low < spacing < high:
+            spacing = float(np.sqrt(low * high)) if np.isfinite(high) and low else spacing
+    if under is not None and (over is None or len(under) >= budget * (1 - BUDGET_TOLERANCE)):
+        return under
+    # Randomly thinning a denser blue-noise sample keeps it close to uniform
+    return _thin(over, budget, seed)
+
+
+def _next_spacing(tried, budget):
+    spacing, count = tried[-1]
+    if len(tried) > 1 and tried[-2][1] != count and tried[-2][0] != spacing:
+        previous_spacing, previous_count = tried[-2]
+        exponent = -np.log(count / previous_count) / np.log(spacing / previous_spacing)
+        exponent = float(np.clip(exponent, 0.5, 2.5))
+    else:
+        exponent = 1.0
+    # Aim slightly under the budget so the sample fits
+    target = budget * (1 - BUDGET_TOLERANCE / 2)
+    return spacing * (max(count, 1) / target) ** (1 / exponent)
+
+
+def _thin(indices, budget, seed):
+    """Drop random samples down to the budget"""
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(indices, budget, replace=False))
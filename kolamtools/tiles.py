@@ -0,0 +1,269 @@
+"""
+Out-of-core stroke extraction for very large kolam scans.
+
+Panoramas of festival street kolams run past 100 MP, too big to threshold in
+one piece as convert_image_to_binary does. Here the image is memory-mapped
+and cut into horizontal strips; worker processes threshold one strip at a
+time and return its stroke pixels in global coordinates. Strips are merged
+in order, so the points come out in the same row-major order as a
+whole-image pass, while each worker only ever holds one strip.
+
+Uncompressed rasters are mapped directly: .npy, binary PGM/PPM and
+uncompressed BMP. Colour is converted to gray with the same fixed-point
+weights cv2.imread uses, so the points match a cv2.imread(IMREAD_GRAYSCALE)
+pass. Other formats (PNG, JPEG, TIFF) can't be read in part: they are
+decoded whole into memory once, by cv2.imread, into a temporary grayscale
+.npy next to the output that the workers map.
+
+    python -m kolamtools.tiles panorama.pgm -o panorama.kpts --color white
+    python -m kolamtools.tiles street.jpg -o street.kpts --mask street-mask.pgm -j 8
+"""
+import argparse
+import os
+import struct
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from .extract import SAMPLE_MODES, _init_worker, limit_points, stroke_mask
+from .paths import order_points
+from .pointfile import save_points
+
+# Source bytes per strip when --strip-rows isn't given
+STRIP_BYTES = 32 * 1024 * 1024
+
+# A memory-mappable raster: `rows` rows of `stride` bytes starting at
+# `offset`, of which the first width * channels hold pixels. `layout` is
+# 'gray', 'bgr', 'rgb' or 'bgra'; `lut` maps palette indices to gray.
+Raster = namedtuple('Raster', 'path offset rows stride width layout bottom_up lut')
+
+_CHANNELS = {'gray': 1, 'bgr': 3, 'rgb': 3, 'bgra': 4}
+
+# Weights of blue, green and red, out of 1 << GRAY_SHIFT, that cv2.imread
+# uses to read colour BMP, PPM and TIFF as grayscale. cv2.cvtColor rounds
+# differently and lands a grey level off on some pixels.
+GRAY_WEIGHTS = (1868, 9617, 4899)
+GRAY_SHIFT = 14
+
+
+class TileError(ValueError):
+    """Raised for images that can't be mapped or decoded"""
+
+
+def _npy_raster(path):
+    array = np.load(path, mmap_mode='r', allow_pickle=False)
+    if array.dtype != np.uint8 or not array.flags.c_contiguous:
+        raise TileError(f'{path}: only C-ordered uint8 arrays can be mapped')
+    if array.ndim == 2:
+        layout = 'gray'
+    elif array.ndim == 3 and array.shape[2] in (3, 4):
+        # Arrays saved from OpenCV images are in BGR order
+        layout = 'bgr' if array.shape[2] == 3 else 'bgra'
+    else:
+        raise TileError(f'{path}: expected a 2-D gray or 3-D colour array, got shape {array.shape}')
+    width = array.shape[1]
+    return Raster(path, array.offset, array.shape[0], width * _CHANNELS[layout], width, layout, False, None)
+
+
+def _pnm_raster(path):
+    with open(path, 'rb') as f:
+        head = f.read(1024)
+    tokens, position = [], 0
+    while len(tokens) < 4:
+        while position < len(head) and head[position:position + 1].isspace():
+            position += 1
+        if head[position:position + 1] == b'#':
+            position = head.index(b'\n', position)
+            continue
+        end = position
+        while end < len(head) and not head[end:end + 1].isspace():
+            end += 1
+        tokens.append(head[position:end])
+        position = end
+    magic, width, height, maxval = tokens[0], int(tokens[1]), int(tokens[2]), int(tokens[3])
+    if magic not in (b'P5', b'P6') or maxval > 255:
+        raise TileError(f'{path}: only binary 8-bit PGM (P5) and PPM (P6) can be mapped')
+    layout = 'gray' if magic == b'P5' else 'rgb'
+    # A single whitespace byte separates the header from the pixels
+    return Raster(path, position + 1, height, width * _CHANNELS[layout], width, layout, False, None)
+
+
+def _bmp_raster(path):
+    with open(path, 'rb') as f:
+        head = f.read(54 + 1024)
+    magic, offset = struct.unpack_from('<2s8xI', head, 0)
+    header_size, width, height, _, bits, compression = struct.unpack_from('<IiiHHI', head, 14)
+    if magic != b'BM' or compression != 0 or bits not in (8, 24, 32):
+        raise TileError(f'{path}: only uncompressed 8, 24 and 32-bit BMP can be mapped')
+    lut = None
+    if bits == 8:
+        (colours,) = struct.unpack_from('<I', head, 46)
+        palette = np.frombuffer(head, dtype=np.uint8, count=4 * (colours or 256), offset=14 + header_size)
+        palette = np.ascontiguousarray(palette.reshape(-1, 4)[:, :3]).reshape(1, -1, 3)
+        lut = np.zeros(256, dtype=np.uint8)
+        lut[:palette.shape[1]] = _to_gray(palette, 'bgr').ravel()
+    layout = {8: 'gray', 24: 'bgr', 32: 'bgra'}[bits]
+    stride = (width * bits + 31) // 32 * 4
+    # Positive heights store the bottom row first
+    return Raster(path, offset, abs(height), stride, width, layout, height > 0, lut)
+
+
+def open_raster(path):
+    """Raster describing how to map `path`, or None when it has to be decoded"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.npy':
+        return _npy_raster(path)
+    if extension in ('.pgm', '.ppm', '.pnm'):
+        return _pnm_raster(path)
+    if extension == '.bmp':
+        return _bmp_raster(path)
+    return None
+
+
+def _to_gray(pixels, layout):
+    """Colour pixels in `layout` as gray, the way cv2.imread(path, IMREAD_GRAYSCALE) converts them"""
+    blue, red = (2, 0) if layout == 'rgb' else (0, 2)
+    gray = (pixels[..., blue] * np.uint32(GRAY_WEIGHTS[0]) + pixels[..., 1] * np.uint32(GRAY_WEIGHTS[1])
+            + pixels[..., red] * np.uint32(GRAY_WEIGHTS[2]) + np.uint32(1 << (GRAY_SHIFT - 1)))
+    return (gray >> GRAY_SHIFT).astype(np.uint8)
+
+
+def _read_strip(raster, start, stop):
+    """Rows [start, stop) of a raster as a grayscale array"""
+    mapped = np.memmap(raster.path, dtype=np.uint8, mode='r', offset=raster.offset,
+                       shape=(raster.rows, raster.stride))
+    if raster.bottom_up:
+        rows = mapped[raster.rows - stop:raster.rows - start][::-1]
+    else:
+        rows = mapped[start:stop]
+    channels = _CHANNELS[raster.layout]
+    pixels = np.ascontiguousarray(rows[:, :raster.width * channels])
+    if raster.layout == 'gray':
+        return raster.lut[pixels] if raster.lut is not None else pixels
+    return _to_gray(pixels.reshape(stop - start, raster.width, channels), raster.layout)
+
+
+def _threshold_strip(job):
+    raster, start, stop, color, threshold, mask = job
+    strokes = stroke_mask(_read_strip(raster, start, stop), color, threshold)
+    if mask is not None:
+        path, offset = mask
+        out = np.memmap(path, dtype=np.uint8, mode='r+', offset=offset, shape=(raster.rows, raster.width))
+        out[start:stop] = strokes * np.uint8(255)
+        out.flush()
+        del out
+    ys, xs = np.nonzero(strokes)
+    return xs.astype(np.int32), (ys + start).astype(np.int32)
+
+
+def _create_mask(path, width, height):
+    """Empty binary PGM of the image size; returns the pixel offset"""
+    header = f'P5\n{width} {height}\n255\n'.encode('ascii')
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.truncate(len(header) + width * height)
+    return len(header)
+
+
+def threshold_tiled(raster, color='white', threshold=127, strip_rows=None, workers=None, mask_path=None):
+    """
+    (N, 2) int32 x, y stroke pixels of a mapped raster in row-major order,
+    thresholded strip by strip across `workers` processes. With `mask_path`
+    the binary image is also written there as a PGM.
+    """
+    if strip_rows is None:
+        strip_rows = max(1, STRIP_BYTES // raster.stride)
+    mask = None
+    if mask_path:
+        mask = (mask_path, _create_mask(mask_path, raster.width, raster.rows))
+    jobs = [(raster, start, min(start + strip_rows, raster.rows), color, threshold, mask)
+            for start in range(0, raster.rows, strip_rows)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            strips = list(pool.map(_threshold_strip, jobs))
+    else:
+        strips = [_threshold_strip(job) for job in jobs]
+
+    if not strips:
+        return np.empty((0, 2), dtype=np.int32)
+    points = np.empty((sum(len(xs) for xs, _ in strips), 2), dtype=np.int32)
+    at = 0
+    for xs, ys in strips:
+        points[at:at + len(xs), 0] = xs
+        points[at:at + len(xs), 1] = ys
+        at += len(xs)
+    return points
+
+
+def _decode_to_cache(path, directory):
+    """Decode a compressed image once into a temporary grayscale .npy"""
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise TileError(f'Could not read {path}')
+    handle, cache = tempfile.mkstemp(suffix='.npy', prefix='.kolam-gray-', dir=directory)
+    with os.fdopen(handle, 'wb') as f:
+        np.save(f, gray)
+    return cache
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Extract stroke coordinates from very large images in strips')
+    parser.add_argument('image', help='Image to threshold. .npy, .pgm/.ppm and uncompressed .bmp are '
+                                      'memory-mapped; JPEG, PNG and TIFF are decoded whole into memory once '
+                                      'first, so they need RAM for the full grayscale image')
+    parser.add_argument('-o', '--output', required=True, help='Coordinate file (.kpts, .csv or .npy)')
+    parser.add_argument('--mask', help='Also write the binary image to this .pgm')
+    parser.add_argument('--color', choices=('white', 'black'), default='white',
+                        help='Colour of the strokes in the image')
+    parser.add_argument('--threshold', type=int, default=127,
+                        help='Gray level separating strokes from background')
+    parser.add_argument('--strip-rows', type=int, help='Rows per strip (default: about 32 MB of image)')
+    parser.add_argument('--max-points', type=int, help='Limit the points written')
+    parser.add_argument('--sample', choices=SAMPLE_MODES, default='first',
+                        help='Which points to keep when limiting')
+    parser.add_argument('--spacing', type=float, help='Minimum distance in pixels between blue-noise points')
+    parser.add_argument('--seed', type=int, help='Seed for random sampling')
+    parser.add_argument('--order', action='store_true',
+                        help='Reorder the points along the strokes instead of scan order')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help='Worker processes (default: one per CPU)')
+    args = parser.parse_args(argv)
+
+    if args.mask and not args.mask.lower().endswith('.pgm'):
+        parser.error('--mask must be a .pgm file')
+    if args.spacing and args.sample != 'blue-noise':
+        parser.error('--spacing needs --sample blue-noise')
+
+    started = time.perf_counter()
+    cache = None
+    try:
+        raster = open_raster(args.image)
+        if raster is None:
+            cache = _decode_to_cache(args.image, os.path.dirname(os.path.abspath(args.output)))
+            raster = open_raster(cache)
+        points = threshold_tiled(raster, args.color, args.threshold, args.strip_rows, args.workers, args.mask)
+    except (OSError, TileError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        if cache:
+            os.remove(cache)
+
+    points = limit_points(points, args.max_points, args.sample, args.seed, args.spacing)
+    if args.order:
+        points = points[order_points(points)[0]]
+    save_points(args.output, points)
+    print(f'Extracted {len(points)} coordinates from a {raster.width}x{raster.rows} image '
+          f'into {args.output} in {time.perf_counter() - started:.2f}s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""
+Streaming coordinate transforms for fitting kolams to a camera frame.
+
+scalekolam.py and scatran.py divide every coordinate by a fixed divisor and
+round, which maps many neighbouring pixels onto the same output pixel; all
+of those duplicates used to be kept and redrawn on every frame. Here a chain
+of scale, translate, rotate and fit-to-frame steps is composed into one
+affine matrix, points are streamed through it a chunk at a time, rounded to
+whole pixels, and every pixel is written once, in order of first
+appearance. A pyramid writes several halvings of the result in the same pass.
+
+Steps apply in the order given:
+
+    python -m kolamtools.transform output_coordinates.kpts -o output.kpts --scale 1/22
+    python -m kolamtools.transform output_coordinates.kpts -o output.kpts --translate 40 45 --scale 1/2
+    python -m kolamtools.transform kolam.kpts -o frame.kpts --rotate 30 --fit 1280x720 --margin 40
+    python -m kolamtools.transform kolam.kpts -o frame.kpts --fit 1920x1080 --levels 4
+"""
+import argparse
+import os
+import sys
+from fractions import Fraction
+
+import numpy as np
+
+from .pointfile import CHUNK_ROWS, PointFileError, iter_points, save_points
+
+# Largest output extent deduplicated with a dense bitmap (five bytes a
+# cell); wider ones keep a sorted array of the pixels seen so far
+MAX_BITMAP_CELLS = 1 << 25
+
+
+def scale(sx, sy=None):
+    """Matrix scaling by `sx` (and `sy`, default the same) about the origin"""
+    return np.diag([sx, sx if sy is None else sy, 1.0])
+
+
+def translate(dx, dy):
+    return np.array([[1.0, 0.0, dx], [0.0, 1.0, dy], [0.0, 0.0, 1.0]])
+
+
+def rotate(degrees, cx=0.0, cy=0.0):
+    """Matrix rotating by `degrees` about (cx, cy); positive turns x towards y,
+    which is clockwise on screen"""
+    theta = np.radians(degrees)
+    cos, sin = np.cos(theta), np.sin(theta)
+    turn = np.array([[cos, -sin, 0.0], [sin, cos, 0.0], [0.0, 0.0, 1.0]])
+    return translate(cx, cy) @ turn @ translate(-cx, -cy)
+
+
+def fit(bounds, width, height, margin=0.0):
+    """Matrix scaling `bounds` (xmin, ymin, xmax, ymax) uniformly to fill a
+    `width` x `height` frame less `margin` on each side, centred"""
+    xmin, ymin, xmax, ymax = bounds
+    span_x, span_y = max(xmax - xmin, 1e-12), max(ymax - ymin, 1e-12)
+    factor = min((width - 2 * margin) / span_x, (height - 2 * margin) / span_y)
+    return (translate(width / 2, height / 2) @ scale(factor)
+            @ translate(-(xmin + xmax) / 2, -(ymin + ymax) / 2))
+
+
+def apply(matrix, points):
+    """Points (N, 2) mapped through an affine matrix, as float64"""
+    points = np.asarray(points, dtype=np.float64)
+    return points @ matrix[:2, :2].T + matrix[:2, 2]
+
+
+def bounds(path, matrix=None, chunk_rows=CHUNK_ROWS):
+    """(xmin, ymin, xmax, ymax) of a coordinate file, after `matrix` if given"""
+    low = np.full(2, np.inf)
+    high = np.full(2, -np.inf)
+    for chunk in iter_points(path, chunk_rows):
+        if not len(chunk):
+            continue
+        if matrix is not None:
+            chunk = apply(matrix, chunk)
+        low = np.minimum(low, chunk.min(axis=0))
+        high = np.maximum(high, chunk.max(axis=0))
+    if not np.isfinite(low).all():
+        raise PointFileError(f'{path} has no points')
+    return (*low, *high)
+
+
+def _corner_bounds(matrix, box):
+    """Bounds of an input box after an affine matrix: the box's corners
+    bound every point inside it"""
+    xmin, ymin, xmax, ymax = box
+    corners = apply(matrix, [(xmin, ymin), (xmax, ymin), (xmin, ymax), (xmax, ymax)])
+    return (*corners.min(axis=0), *corners.max(axis=0))
+
+
+class Deduplicator:
+    """
+    Keeps the first occurrence of every integer point across a stream of
+    chunks. Within the bounds a bitmap marks the pixels already written and
+    a scratch array picks each pixel's first point in a chunk without
+    sorting; extents too large for them fall back to a sorted array of
+    seen keys.
+    """
+
+    def __init__(self, box):
+        xmin, ymin, xmax, ymax = box
+        self.origin = np.array([int(np.floor(xmin)) - 1, int(np.floor(ymin)) - 1], dtype=np.int64)
+        self.width = int(np.ceil(xmax)) + 2 - int(self.origin[0])
+        height = int(np.ceil(ymax)) + 2 - int(self.origin[1])
+        cells = self.width * height
+        if cells <= MAX_BITMAP_CELLS:
+            self.seen = np.zeros(cells, dtype=bool)
+            self.first = np.empty(cells, dtype=np.int32)
+        else:
+            self.seen = None
+            self.keys = np.empty(0, dtype=np.int64)
+
+    def filter(self, points):
+        """The points of an (N, 2) integer chunk not seen before, in order"""
+        shifted = points.astype(np.int64) - self.origin
+        keys = shifted[:, 1] * self.width + shifted[:, 0]
+        if self.seen is not None:
+            candidates = np.flatnonzero(~self.seen[keys]).astype(np.int32)
+            candidate_keys = keys[candidates]
+            # Written back to front, each pixel ends up holding its first index
+            self.first[candidate_keys[::-1]] = candidates[::-1]
+            fresh = candidates[self.first[candidate_keys] == candidates]
+            self.seen[keys[fresh]] = True
+            return points[fresh]
+
+        _, first = np.unique(keys, return_index=True)
+        first.sort()
+        keys = keys[first]
+        position = np.searchsorted(self.keys, keys).clip(max=max(len(self.keys) - 1, 0))
+        fresh = (self.keys[position] != keys) if len(self.keys) else np.ones(len(keys), dtype=bool)
+        self.keys = np.union1d(self.keys, keys[fresh])
+        return points[first[fresh]]
+
+
+def transform_file(source, outputs, dedup=True, chunk_rows=CHUNK_ROWS):
+    """
+    Stream `source` through each matrix of `outputs` ({path: matrix}), round
+    to whole pixels and write every output. Returns the number of points
+    read and {path: points written}.
+    """
+    box = bounds(source, chunk_rows=chunk_rows)
+    states = {}
+    for path, matrix in outputs.items():
+        states[path] = {'matrix': matrix, 'parts': [],
+                        'dedup': Deduplicator(_corner_bounds(matrix, box)) if dedup else None}
+
+    total = 0
+    for chunk in iter_points(source, chunk_rows):
+        total += len(chunk)
+        for state in states.values():
+            points = np.rint(apply(state['matrix'], chunk)).astype(np.int32)
+            if state['dedup'] is not None:
+                points = state['dedup'].filter(points)
+            state['parts'].append(points)
+
+    written = {}
+    for path, state in states.items():
+        points = np.concatenate(state['parts']) if state['parts'] else np.empty((0, 2), dtype=np.int32)
+        save_points(path, points)
+        written[path] = len(points)
+    return total, written
+
+
+def level_path(path, level):
+    """Output path of one pyramid level: kolam.kpts -> kolam_level2.kpts"""
+    stem, extension = os.path.splitext(path)
+    return f'{stem}_level{level}{extension}'
+
+
+def _number(text):
+    """Floats and fractions such as 1/22"""
+    return float(Fraction(text)) if '/' in text else float(text)
+
+
+def _frame_size(text):
+    width, _, height = text.lower().partition('x')
+    return int(width), int(height)
+
+
+class _Step(argparse.Action):
+    """Collect transform steps in command-line order"""
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        steps = getattr(namespace, 'steps', None) or []
+        steps.append((self.dest, values))
+        namespace.steps = steps
+
+
+def build_matrix(source, steps, margin=0.0, chunk_rows=CHUNK_ROWS):
+    """Compose command-line steps into one matrix; rotate and fit look at the
+    bounds of the points as transformed so far"""
+    matrix = np.eye(3)
+    for name, values in steps:
+        if name == 'scale':
+            matrix = scale(*values) @ matrix
+        elif name == 'translate':
+            matrix = translate(*values) @ matrix
+        elif name == 'rotate':
+            xmin, ymin, xmax, ymax = bounds(source, matrix, chunk_rows)
+            matrix = rotate(values, (xmin + xmax) / 2, (ymin + ymax) / 2) @ matrix
+        elif name == 'fit':
+            matrix = fit(bounds(source, matrix, chunk_rows), *values, margin) @ matrix
+    return matrix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Scale, move, rotate or fit kolam coordinates, dropping duplicate pixels')
+    parser.add_argument('source', help='Coordinate file (.kpts, .csv or .npy)')
+    parser.add_argument('-o', '--output', required=True, help='Output coordinate file')
+    parser.set_defaults(steps=[])
+    parser.add_argument('--scale', dest='scale', action=_Step, nargs='+', type=_number, metavar='S',
+                        help='Scale by S (or SX SY); fractions like 1/22 are accepted')
+    parser.add_argument('--translate', dest='translate', action=_Step, nargs=2, type=float,
+                        metavar=('DX', 'DY'), help='Move by DX, DY')
+    parser.add_argument('--rotate', dest='rotate', action=_Step, type=float, metavar='DEGREES',
+                        help='Rotate about the centre of the points, clockwise on screen')
+    parser.add_argument('--fit', dest='fit', action=_Step, type=_frame_size, metavar='WxH',
+                        help='Scale and centre the points to fill a WxH frame')
+    parser.add_argument('--margin', type=float, default=0.0, help='Border left by --fit, in pixels')
+    parser.add_argument('--levels', type=int, default=1,
+                        help='Also write this many successive halvings as <output>_level<N>')
+    parser.add_argument('--keep-duplicates', action='store_true',
+                        help='Keep points that round to an already written pixel')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='Points per streamed chunk')
+    args = parser.parse_args(argv)
+
+    if any(name == 'scale' and len(values) > 2 for name, values in args.steps):
+        parser.error('--scale takes one or two factors')
+    if args.levels < 1:
+        parser.error('--levels must be at least 1')
+
+    try:
+        matrix = build_matrix(args.source, args.steps, args.margin, args.chunk_rows)
+        outputs = {args.output: matrix}
+        for level in range(1, args.levels):
+            outputs[level_path(args.output, level)] = scale(0.5 ** level) @ matrix
+        total, written = transform_file(args.source, outputs, not args.keep_duplicates, args.chunk_rows)
+    except (OSError, PointFileError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    for path, count in written.items():
+        print(f'{path}: {count} of {total} points')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
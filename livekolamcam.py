@@ -1,39 +1,42 @@
+import sys
+
 import cv2
-import numpy as np
-import pandas as pd
 
-# Load CSV data
-csv_file = '/home/josva/kollamms turtle/latest-correct-code-colour-kolam-kolamsingleknot/output_coordinates.csv'  # Path to your CSV file
-data = pd.read_csv(csv_file)
+from kolamtools.overlay import Overlay
+from kolamtools.pipeline import Pipeline
+from kolamtools.pointfile import load_points, newest_points_path
+from kolamtools.replay import open_capture
+
+# Load coordinate data: the memory-mapped .kpts beside the CSV when it is newer, else the CSV
+points_file = newest_points_path('/home/josva/kollamms turtle/latest-correct-code-colour-kolam-kolamsingleknot/output_coordinates.csv')  # Path to your coordinate file
+data = load_points(points_file)
 
-# Initialize video capture
-cap = cv2.VideoCapture(0)  # Change to the appropriate video source if needed
+# Initialize video capture: a camera index, or a video or image folder to replay
+cap = open_capture(sys.argv[1] if len(sys.argv) > 1 else 0)
 
 # Initialize circle parameters
 circle_radius = 10
 circle_thickness = 2
 circle_color = (0, 0, 255)  # Red color (BGR format)
 
+# All points are drawn once into an overlay layer, then copied onto each frame
+overlay = Overlay(data, circle_radius, circle_color, circle_thickness)
+
 # Initialize current row index
 current_row = 0
 
-while True:
-    # Read frame from video stream
-    ret, frame = cap.read()
-    if not ret:
-        break
-    
-    # Get current X, Y coordinates from the CSV data
-    for x, y in data.values:
-        # Draw big red circle at the specified coordinates
-        cv2.circle(frame, (x, y), circle_radius, circle_color, circle_thickness)
-
-    # Show the frame
-    cv2.imshow('Video Stream', frame)
-    
-    # Wait for key press
-    key = cv2.waitKey(1) & 0xFF
-    
+
+def process(frame):
+    # Draw the red circles at every coordinate
+    overlay.composite(frame)
+
+    # Shown by the pipeline
+    return frame
+
+
+def on_key(key):
+    global current_row
+
     # Check if 'n' key is pressed to move the point
     if key == ord('n'):
         # Increase current row index
@@ -43,14 +46,9 @@ while True:
         if current_row >= len(data):
             current_row = 0
 
-    # Break the loop if 'q' key is pressed
-    if key == ord('q'):
-        break
 
-    # Resize the screen
-    cv2.resize(frame, (1280, 720))
+# Capture and drawing run on their own threads; 'q' quits
+Pipeline(cap, process, 'Video Stream').run(on_key)
 
-# Release video capture and close windows
-cap.release()
+# Close windows (the pipeline releases the capture)
 cv2.destroyAllWindows()
-
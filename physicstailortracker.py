@@ -1,10 +1,17 @@
+import sys
+
 import cv2
-import numpy as np
-import pandas as pd
 
-# Load CSV data
-csv_file = 'output.csv'  # Path to your CSV file
-data = pd.read_csv(csv_file)
+from kolamtools.guide import Guide
+from kolamtools.overlay import Overlay
+from kolamtools.pipeline import AsyncWriter, Pipeline
+from kolamtools.pointfile import load_points, newest_points_path
+from kolamtools.render import Recipe, render_video
+from kolamtools.replay import open_capture
+
+# Load coordinate data: the memory-mapped .kpts beside the CSV when it is newer, else the CSV
+points_file = newest_points_path('output.csv')  # Path to your coordinate file
+data = load_points(points_file)
 
 # Calculate the farthest points in x and y directions
 max_x = data['x'].max()
@@ -16,79 +23,66 @@ min_y = data['y'].min()
 width = int(max_x - min_x) + 100  # Add some padding
 height = int(max_y - min_y) + 100  # Add some padding
 
-# Initialize video capture
-cap = cv2.VideoCapture(0)  # Change to the appropriate video source if needed
+# Initialize circle parameters
+circle_radius = 10
+circle_thickness = -1  # Filled circle
+circle_color = (0, 0, 255)  # Red color (BGR format)
+
+# All points are drawn once into an overlay layer, shifted by the minimum and padding
+overlay = Overlay(data, circle_radius, circle_color, -1, offset=(50 - min_x, 50 - min_y))
+
+# The moving point follows the kolam at a steady speed in real time, whatever the frame rate
+guide_speed = 300  # Pixels per second along the kolam (can be adjusted by the user)
+guide = Guide(data, guide_speed)
+
+# Render a recording offline instead, in parallel chunks far faster than real time:
+#     python physicstailortracker.py recording.mp4 --render
+if '--render' in sys.argv[2:]:
+    recipe = Recipe(points_file, circle_radius, circle_color, circle_thickness, offset=(50 - min_x, 50 - min_y),
+                    guide_speed=guide_speed, guide_radius=circle_radius + 5)
+    output, frames = render_video(sys.argv[1], 'output.mp4', recipe)
+    print(f'Rendered {frames} frames into {output}')
+    sys.exit(0)
+
+# Initialize video capture: a camera index, or a video or image folder to replay
+cap = open_capture(sys.argv[1] if len(sys.argv) > 1 else 0)
 
 # Video dimensions and frame rate
 cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
 cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
 fps = 30.0
 
-# Initialize video writer
+# Initialize video writer; frames are written on a background thread
 fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-out = cv2.VideoWriter('output.mp4', fourcc, fps, (width, height))
-
-# Initialize circle parameters
-circle_radius = 10
-circle_thickness = -1  # Filled circle
-circle_color = (0, 0, 255)  # Red color (BGR format)
-
-# Initialize current row index and movement speed
-current_row = 0
-movement_speed = 100  # Default speed (can be adjusted by the user)
+out = AsyncWriter(cv2.VideoWriter('output.mp4', fourcc, fps, (width, height)))
 
 # ...
 
-while True:
-    # Read frame from video stream
-    ret, frame = cap.read()
-    if not ret:
-        break
 
+def process(frame):
     # Plot all points as small red circles
-    for point in data.values:
-        x = int(point[0]) - min_x + 50  # Adjust x-coordinate based on the minimum x value and padding
-        y = int(point[1]) - min_y + 50  # Adjust y-coordinate based on the minimum y value and padding
-        cv2.circle(frame, (x, y), circle_radius, (0, 0, 255), -1)
+    overlay.composite(frame)
 
-    # Calculate the current position of the moving point
-    current_x = int(data.values[current_row][0]) - min_x + 50
-    current_y = int(data.values[current_row][1]) - min_y + 50
+    # Calculate the current position of the moving point, wrapping round at the end
+    current_x, current_y = overlay.pixel(guide.position())
 
     # Draw thick blue circle for the moving point
     cv2.circle(frame, (current_x, current_y), circle_radius + 5, (255, 0, 0), circle_thickness)
 
-    # Show the frame
-    cv2.imshow('Video Stream', frame)
+    # Shown and written to the output video file by the pipeline
+    return frame
 
-    # Write the frame to the output video file
-    out.write(frame)
-
-    # Increment the current row index based on the movement speed
-    current_row += movement_speed
-
-    # Wrap around to the start or end of the CSV data if the index goes beyond the range
-    if current_row >= len(data):
-        current_row = 0
-    elif current_row < 0:
-        current_row = len(data) - 1
-
-    # Wait for key press
-    key = cv2.waitKey(1) & 0xFF
 
+def on_key(key):
     # Adjust the movement speed based on user input
     if key == ord('f'):
-        movement_speed *= 2  # Double the movement speed
+        guide.set_rate(guide.rate * 2)  # Double the movement speed
     elif key == ord('s'):
-        movement_speed //= 2  # Halve the movement speed
+        guide.set_rate(guide.rate / 2)  # Halve the movement speed
 
-    # Break the loop if 'q' key is pressed
-    if key == ord('q'):
-        break
 
-# Release video capture and close windows
-cap.release()
-out.release()
-cv2.destroyAllWindows()
+# Capture, drawing and writing run on their own threads; 'q' quits
+Pipeline(cap, process, 'Video Stream', writer=out).run(on_key)
 
-    #
+# Close windows (the pipeline releases the capture and the writer)
+cv2.destroyAllWindows()
@@ -1,6 +1,10 @@
+import time
+
 import cv2
 import numpy as np
 
+from kolamtools.polyline import PolylineKolam
+
 # L-System parameters
 axiom = "FBFBFBFB"  # Initiator
 rules = {
@@ -16,65 +20,82 @@ def expand_lsystem_string(axiom, rules, iterations):
         result = "".join([rules.get(ch, ch) for ch in result])
     return result
 
-# Function to interpret the L-System string and draw the SUZHI Kolam pattern
-def draw_suzhi_kolam(lsystem_string, dot_size, img):
+# Function to interpret the L-System string into the SUZHI Kolam's segments, once
+def build_suzhi_kolam(lsystem_string, dot_size, start):
+    global x, y
+    x, y = start
+    kolam = PolylineKolam()
+
     # Interpret the L-System string
     for symbol in lsystem_string:
         if symbol == "F":
-            draw_line(dot_size, img)
+            draw_line(dot_size, kolam)
         elif symbol == "A":
-            draw_arc(dot_size, 90, img)
+            draw_arc(dot_size, 90, kolam)
         elif symbol == "B":
             forward_units = 5 / (2 ** 0.5)
-            draw_line(forward_units, img)
-            draw_arc(forward_units, 270, img)
-            cv2.circle(img, (int(x), int(y)), dot_size // 2, (0, 0, 0), -1)
+            draw_line(forward_units, kolam)
+            draw_arc(forward_units, 270, kolam)
+            kolam.dot((int(x), int(y)), dot_size // 2, (0, 0, 0))
+    return kolam
 
-# Function to draw a line segment
-def draw_line(length, img):
-    global x, y, angle
+# Function to record a line segment
+def draw_line(length, kolam):
+    global x, y
     x2 = x + length * np.cos(np.radians(angle))
     y2 = y - length * np.sin(np.radians(angle))
-    cv2.line(img, (int(x), int(y)), (int(x2), int(y2)), (0, 0, 0), thickness=dot_size)
+    kolam.line((int(x), int(y)), (int(x2), int(y2)), (0, 0, 0), dot_size)
     x, y = x2, y2
 
-# Function to draw an arc
-def draw_arc(radius, angle, img):
-    global x, y, angle
+# Function to record an arc
+def draw_arc(radius, angle, kolam):
+    global x, y
     x2 = x + radius * np.cos(np.radians(angle + 90))
     y2 = y - radius * np.sin(np.radians(angle + 90))
-    cv2.ellipse(img, (int(x), int(y)), (int(radius), int(radius)), angle, 0, 90, (0, 0, 0), thickness=dot_size)
+    kolam.arc((int(x), int(y)), int(radius), angle, 0, 90, (0, 0, 0), dot_size)
     x, y = x2, y2
 
 # Set the dot size and number of iterations
 dot_size = 10
 iterations = 2
 
+# Draw the kolam progressively, this many segments a second (None shows it whole)
+segments_per_second = 40
+
 # Expand the L-System string
 lsystem_string = expand_lsystem_string(axiom, rules, iterations)
 
 # Initialize video capture
 video_capture = cv2.VideoCapture(0)
 
-while True:
-    # Read a frame from the video stream
-    ret, frame = video_capture.read()
+# Read the first frame to find where the pattern starts
+ret, frame = video_capture.read()
 
-    # Initialize the starting position for drawing the SUZHI Kolam pattern
-    x, y = frame.shape[1] // 2, frame.shape[0] // 2
-    angle = 0
+# Convert the SUZHI Kolam pattern to polylines once, starting from the centre of the frame
+angle = 0
+kolam = build_suzhi_kolam(lsystem_string, dot_size, (frame.shape[1] // 2, frame.shape[0] // 2))
+started = time.perf_counter()
 
-    # Draw the SUZHI Kolam pattern on the current frame
-    draw_suzhi_kolam(lsystem_string, dot_size, frame)
+while ret:
+    # Draw the SUZHI Kolam pattern on the current frame, as far as it has got
+    count = None
+    if segments_per_second is not None:
+        count = int((time.perf_counter() - started) * segments_per_second)
+    kolam.draw(frame, count)
 
     # Display the frame
     cv2.imshow('Live Video', frame)
 
-    # Break the loop when 'q' key is pressed
-    if cv2.waitKey(1) & 0xFF == ord('q'):
+    # Break the loop when 'q' key is pressed; 'r' starts the drawing over
+    key = cv2.waitKey(1) & 0xFF
+    if key == ord('q'):
         break
+    if key == ord('r'):
+        started = time.perf_counter()
+
+    # Read a frame from the video stream
+    ret, frame = video_capture.read()
 
 # Release the video capture and close OpenCV windows
 video_capture.release()
 cv2.destroyAllWindows()
-
@@ -0,0 +1,22 @@
+import pytest
+
+from kolamtools.arclength import GeometryError, svg_geometry, total_length
+
+
+def _svg(d):
+    return f'<svg xmlns="http://www.w3.org/2000/svg"><path stroke="red" fill="none" d="{d}"/></svg>'
+
+
+def test_closed_path():
+    geometry = svg_geometry(_svg('M 0 0 L 10 0 L 10 10 Z'))
+    assert total_length(geometry) == pytest.approx(20 + 200 ** 0.5)
+
+
+def test_closed_path_then_new_subpath():
+    geometry = svg_geometry(_svg('M 0 0 L 10 0 Z M 20 0 L 30 0'))
+    assert total_length(geometry) == pytest.approx(30)
+
+
+def test_stray_number_after_close_is_rejected():
+    with pytest.raises(GeometryError):
+        svg_geometry(_svg('M 0 0 L 10 10 Z 3 3'))
@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+from kolamtools.paths import order_points
+
+
+@pytest.mark.parametrize('points', [
+    [[1, 1], [2, 2], [3, 3]],
+    [[0, 0], [1, 0], [1, 1], [0, 1]],
+])
+def test_small_inputs(points):
+    order, path_ids = order_points(points)
+    assert sorted(order.tolist()) == list(range(len(points)))
+    assert len(path_ids) == len(points)
+
+
+def test_window_too_small_for_any_move():
+    points = np.c_[np.arange(10.0), np.zeros(10)]
+    order, _ = order_points(points, window=1)
+    assert sorted(order.tolist()) == list(range(10))
@@ -0,0 +1,21 @@
+import pytest
+
+from kolamtools.pulli import DOT_SIZE_RANGE, GRID_SIZE_RANGE, RHOMBUS_SPANS, _design_parameters
+
+
+@pytest.mark.parametrize('dots', [2, 5, 9, 13, 40, 400])
+def test_rhombus_parameters_are_in_range(dots):
+    parameters = _design_parameters('rhombic', 30.0, dots, dots)
+    assert 1 <= parameters['rhombus_size'] <= len(RHOMBUS_SPANS)
+    assert DOT_SIZE_RANGE[0] <= parameters['dot_size'] <= DOT_SIZE_RANGE[1]
+
+
+def test_rhombus_level_grows_with_the_grid():
+    levels = [_design_parameters('square', 45.0, dots, dots)['rhombus_size'] for dots in (5, 15, 33, 68)]
+    assert levels == [1, 2, 3, 4]
+
+
+@pytest.mark.parametrize('dots', [2, 7, 30])
+def test_grid_size_is_in_range(dots):
+    parameters = _design_parameters('square', 0.0, dots, dots)
+    assert GRID_SIZE_RANGE[0] <= parameters['grid_size'] <= GRID_SIZE_RANGE[1]
@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
-import csv
+from kolamtools.extract import limit_points
+from kolamtools.paths import order_points
+from kolamtools.pointfile import save_points
 
 def convert_image_to_binary(image_path):
     # Read the image
@@ -11,31 +13,30 @@ def convert_image_to_binary(image_path):
 
     return binary_image
 
-def export_coordinates(binary_image, output_csv, max_points=10000):
+def export_coordinates(binary_image, output_file, max_points=10000, spacing=None, sample='random', ordered=True):
     # Find white pixel coordinates
     white_pixels = np.where(binary_image == 255)
 
-    # Limit the number of points to export
-    if len(white_pixels[0]) > max_points:
-        indices = np.random.choice(len(white_pixels[0]), max_points, replace=False)
-        white_pixels = (white_pixels[0][indices], white_pixels[1][indices])
+    # Limit the number of points to export: a random subset, or with
+    # sample='blue-noise' spread evenly along the strokes
+    points = limit_points(np.column_stack([white_pixels[1], white_pixels[0]]), max_points, sample, spacing=spacing)
 
-    # Write coordinates to CSV
-    with open(output_csv, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(['x', 'y'])
-        for x, y in zip(white_pixels[1], white_pixels[0]):
-            writer.writerow([x, y])
+    # Put the points in drawing order so a guide dot follows the strokes
+    if ordered:
+        points = points[order_points(points)[0]]
+
+    # Write coordinates as .kpts (or .csv / .npy, by extension)
+    save_points(output_file, points)
 
 # Path to input image
 image_path = '/home/josva/kollamms turtle/correct-code-colour-kolam-kolamsingleknot/binary_image.png'
 
-# Path to output CSV file
-output_csv = 'output_coordinates.csv'
+# Path to output coordinate file
+output_file = 'output_coordinates.kpts'
 
 # Convert image to binary
 binary_image = convert_image_to_binary(image_path)
 
-# Export coordinates to CSV
-export_coordinates(binary_image, output_csv)
+# Export coordinates
+export_coordinates(binary_image, output_file)
 